@@ -0,0 +1,170 @@
+from collections import Counter
+
+from sob_demanda import ModuloSobDemanda
+
+pd = ModuloSobDemanda("pandas")
+
+# Dimensões com contagem de ideias e soma de ganho/investimento por valor
+DIMENSOES = ["Área", "Local", "Turno do operador que deu a ideia", "Metodologia"]
+
+
+def _valor(numero):
+    return 0.0 if pd.isna(numero) else float(numero)
+
+
+def _mes(data):
+    return None if pd.isna(data) else data.strftime("%Y-%m")
+
+
+def _categoria(valor):
+    return "(vazio)" if pd.isna(valor) or str(valor) == "" else str(valor)
+
+
+def _somar(contador, chave, valor):
+    contador[chave] += valor
+    if abs(contador[chave]) < 1e-9:
+        del contador[chave]
+
+
+def _roi(ganho, investimento):
+    """(ganho - investimento) / investimento, em %; None sem investimento."""
+    return (ganho - investimento) / investimento * 100 if investimento > 0 else None
+
+
+class AgregadosIdeias:
+    """Totais usados pelo painel de análises, mantidos por diferença.
+
+    São calculados uma vez por carga de dados (groupby) e depois só somam ou
+    subtraem a contribuição de cada ideia incluída, editada ou excluída.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.ganho = 0.0
+        self.investimento = 0.0
+        self.contagem = {dimensao: Counter() for dimensao in DIMENSOES}
+        self.ganho_por = {dimensao: Counter() for dimensao in DIMENSOES}
+        self.investimento_por = {dimensao: Counter() for dimensao in DIMENSOES}
+        self.funil = Counter()
+        self.status_por_mes = Counter()
+        self.concluidas_por_mes = Counter()
+        self.dias_por_mes = Counter()
+
+    @classmethod
+    def de_dataframe(cls, df):
+        agregados = cls()
+        if df.empty:
+            return agregados
+        ganho = pd.to_numeric(df.get("Ganho financeiro"), errors="coerce").fillna(0.0)
+        investimento = pd.to_numeric(df.get("Investimento"), errors="coerce").fillna(0.0)
+        agregados.total = len(df)
+        agregados.ganho = float(ganho.sum())
+        agregados.investimento = float(investimento.sum())
+        for dimensao in DIMENSOES:
+            if dimensao not in df.columns:
+                continue
+            chaves = df[dimensao].astype(str).replace("", "(vazio)").to_numpy()
+            grupos = pd.DataFrame({"chave": chaves, "ganho": ganho.to_numpy(), "investimento": investimento.to_numpy()})
+            somas = grupos.groupby("chave").agg(n=("ganho", "size"), ganho=("ganho", "sum"),
+                                                investimento=("investimento", "sum"))
+            agregados.contagem[dimensao].update(somas["n"].to_dict())
+            agregados.ganho_por[dimensao].update({k: v for k, v in somas["ganho"].items() if v})
+            agregados.investimento_por[dimensao].update({k: v for k, v in somas["investimento"].items() if v})
+        status = df["Status"].astype(str).replace("", "(vazio)")
+        agregados.funil.update(status.value_counts().to_dict())
+        if "Data ideia" in df.columns:
+            meses = df["Data ideia"].dt.strftime("%Y-%m")
+            validos = meses.notna()
+            pares = pd.DataFrame({"mes": meses[validos], "status": status[validos]})
+            agregados.status_por_mes.update(pares.value_counts().to_dict())
+            if "Data conclusão" in df.columns:
+                dias = (df["Data conclusão"] - df["Data ideia"]).dt.days
+                fim = df["Data conclusão"].dt.strftime("%Y-%m")
+                concluidas = dias.notna()
+                agregados.concluidas_por_mes.update(fim[concluidas].value_counts().to_dict())
+                agregados.dias_por_mes.update(dias[concluidas].groupby(fim[concluidas]).sum().to_dict())
+        return agregados
+
+    def _aplicar(self, registro, sinal):
+        ganho = _valor(pd.to_numeric(registro.get("Ganho financeiro"), errors="coerce"))
+        investimento = _valor(pd.to_numeric(registro.get("Investimento"), errors="coerce"))
+        self.total += sinal
+        self.ganho += sinal * ganho
+        self.investimento += sinal * investimento
+        for dimensao in DIMENSOES:
+            chave = _categoria(registro.get(dimensao))
+            _somar(self.contagem[dimensao], chave, sinal)
+            if ganho:
+                _somar(self.ganho_por[dimensao], chave, sinal * ganho)
+            if investimento:
+                _somar(self.investimento_por[dimensao], chave, sinal * investimento)
+        status = _categoria(registro.get("Status"))
+        _somar(self.funil, status, sinal)
+        data_ideia = pd.to_datetime(registro.get("Data ideia"), errors="coerce")
+        mes = _mes(data_ideia)
+        if mes is not None:
+            _somar(self.status_por_mes, (mes, status), sinal)
+            data_conclusao = pd.to_datetime(registro.get("Data conclusão"), errors="coerce")
+            fim = _mes(data_conclusao)
+            if fim is not None:
+                _somar(self.concluidas_por_mes, fim, sinal)
+                _somar(self.dias_por_mes, fim, sinal * (data_conclusao - data_ideia).days)
+
+    def adicionar(self, registro):
+        self._aplicar(registro, 1)
+
+    def remover(self, registro):
+        self._aplicar(registro, -1)
+
+    def unir(self, outro):
+        """Novos agregados com as ideias dos dois (ex.: partição ativa + arquivo)."""
+        unidos = AgregadosIdeias()
+        for agregados in (self, outro):
+            unidos.total += agregados.total
+            unidos.ganho += agregados.ganho
+            unidos.investimento += agregados.investimento
+            for dimensao in DIMENSOES:
+                unidos.contagem[dimensao].update(agregados.contagem[dimensao])
+                unidos.ganho_por[dimensao].update(agregados.ganho_por[dimensao])
+                unidos.investimento_por[dimensao].update(agregados.investimento_por[dimensao])
+            unidos.funil.update(agregados.funil)
+            unidos.status_por_mes.update(agregados.status_por_mes)
+            unidos.concluidas_por_mes.update(agregados.concluidas_por_mes)
+            unidos.dias_por_mes.update(agregados.dias_por_mes)
+        return unidos
+
+    def resumo(self):
+        """Cópia dos agregados em tabelas pequenas, pronta para exibir."""
+        dimensoes = {}
+        for dimensao in DIMENSOES:
+            tabela = pd.DataFrame({
+                "Ideias": pd.Series(self.contagem[dimensao], dtype="int64"),
+                "Ganho financeiro": pd.Series(self.ganho_por[dimensao], dtype="float64"),
+                "Investimento": pd.Series(self.investimento_por[dimensao], dtype="float64"),
+            }).fillna(0.0)
+            tabela["Ideias"] = tabela["Ideias"].astype("int64")
+            tabela["ROI (%)"] = [_roi(g, i) for g, i in zip(tabela["Ganho financeiro"], tabela["Investimento"])]
+            dimensoes[dimensao] = tabela.sort_values("Ideias", ascending=False)
+
+        status_mes = pd.Series(self.status_por_mes, dtype="int64")
+        if status_mes.empty:
+            funil_mes = pd.DataFrame()
+        else:
+            funil_mes = status_mes.unstack(fill_value=0).sort_index()
+        lead_time = pd.DataFrame({
+            "Concluídas": pd.Series(self.concluidas_por_mes, dtype="int64"),
+            "Dias (soma)": pd.Series(self.dias_por_mes, dtype="float64"),
+        }).fillna(0).sort_index()
+        lead_time["Lead time médio (dias)"] = lead_time["Dias (soma)"] / lead_time["Concluídas"].where(
+            lead_time["Concluídas"] > 0)
+
+        return {
+            "total": self.total,
+            "ganho": self.ganho,
+            "investimento": self.investimento,
+            "roi": _roi(self.ganho, self.investimento),
+            "dimensoes": dimensoes,
+            "funil": pd.Series(self.funil, dtype="int64").sort_values(ascending=False),
+            "funil_por_mes": funil_mes,
+            "lead_time_por_mes": lead_time.drop(columns="Dias (soma)"),
+        }
@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+from contextlib import closing
+
+from sob_demanda import ModuloSobDemanda
+
+_utils_gspread = ModuloSobDemanda("gspread.utils")
+_erros_gspread = ModuloSobDemanda("gspread.exceptions")
+
+
+class SequenciaSQLite:
+    """Sequência de IDs numa tabela SQLite, segura entre processos da mesma máquina.
+
+    Aceita reservas de qualquer tamanho; `tamanho_bloco` é só o bloco que o
+    AlocadorIds reserva por vez.
+    """
+
+    def __init__(self, caminho, valor_inicial, tamanho_bloco=10, nome="ideias"):
+        self.caminho = caminho
+        self.nome = nome
+        self.valor_inicial = valor_inicial
+        self.tamanho_bloco = tamanho_bloco
+        with closing(sqlite3.connect(self.caminho, timeout=30)) as conexao, conexao:
+            conexao.execute("CREATE TABLE IF NOT EXISTS sequencia (nome TEXT PRIMARY KEY, proximo INTEGER NOT NULL)")
+
+    def reservar(self, quantidade):
+        """Reserva `quantidade` IDs consecutivos e retorna o primeiro."""
+        conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        with closing(conexao):
+            # BEGIN IMMEDIATE trava a escrita: dois processos nunca leem o mesmo valor
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                linha = conexao.execute("SELECT proximo FROM sequencia WHERE nome = ?", (self.nome,)).fetchone()
+                inicio = linha[0] if linha else int(self.valor_inicial())
+                conexao.execute("INSERT OR REPLACE INTO sequencia (nome, proximo) VALUES (?, ?)",
+                                (self.nome, inicio + quantidade))
+                conexao.execute("COMMIT")
+            except Exception:
+                conexao.execute("ROLLBACK")
+                raise
+        return inicio
+
+
+class SequenciaPlanilha:
+    """Sequência de IDs guardada numa aba de controle da Planilha Google.
+
+    A célula A1 guarda o primeiro ID da sequência e B1 o tamanho do bloco.
+    Cada bloco reservado anexa uma linha à aba; como a API serializa os appends,
+    o número da linha devolvido é único e define o bloco: a linha n reserva os
+    IDs A1 + (n - 2) * B1 até A1 + (n - 1) * B1 - 1.
+
+    `tamanho_bloco` só vale ao criar a aba: depois disso o bloco é sempre o
+    de B1, mesmo que a configuração mude.
+    """
+
+    def __init__(self, aba, valor_inicial, tamanho_bloco):
+        self.aba = aba
+        cabecalho = aba.row_values(1)
+        if len(cabecalho) < 2 or not str(cabecalho[0]).strip():
+            cabecalho = [int(valor_inicial()), tamanho_bloco]
+            aba.update("A1:B1", [cabecalho])
+        self.inicio = int(cabecalho[0])
+        self.tamanho_bloco = int(cabecalho[1])
+
+    def reservar(self, quantidade):
+        if quantidade <= 0 or quantidade % self.tamanho_bloco:
+            raise ValueError(f"A aba de controle reserva múltiplos de {self.tamanho_bloco} IDs.")
+        # Vários blocos numa só chamada: as linhas anexadas são consecutivas, e os IDs também
+        blocos = quantidade // self.tamanho_bloco
+        resposta = self.aba.append_rows([["reserva", self.tamanho_bloco]] * blocos, table_range="A1")
+        intervalo = _utils_gspread.get_a1_from_absolute_range(resposta["updates"]["updatedRange"])
+        linha, _ = _utils_gspread.a1_to_rowcol(intervalo.split(":")[0])
+        return self.inicio + (linha - 2) * self.tamanho_bloco
+
+
+def abrir_aba_controle(planilha, titulo):
+    """Retorna a aba de controle da planilha, criando-a se ainda não existir."""
+    try:
+        return planilha.worksheet(titulo)
+    except _erros_gspread.WorksheetNotFound:
+        try:
+            return planilha.add_worksheet(titulo, rows=1000, cols=2)
+        except _erros_gspread.APIError:
+            # Outro processo criou a aba ao mesmo tempo
+            return planilha.worksheet(titulo)
+
+
+class AlocadorIds:
+    """Entrega IDs únicos sem ler os dados, reservando blocos da sequência.
+
+    Cada processo reserva um bloco da sequência (`sequencia.tamanho_bloco`
+    IDs) de uma vez e o distribui em memória; IDs de um bloco não usado até o
+    processo encerrar ficam vagos.
+    """
+
+    def __init__(self, sequencia):
+        self.sequencia = sequencia
+        self.tamanho_bloco = sequencia.tamanho_bloco
+        self._proximo = 0
+        self._fim = 0
+        self._lock = threading.Lock()
+
+    def proximo_id(self):
+        with self._lock:
+            if self._proximo >= self._fim:
+                self._proximo = self.sequencia.reservar(self.tamanho_bloco)
+                self._fim = self._proximo + self.tamanho_bloco
+            novo_id = self._proximo
+            self._proximo += 1
+            return novo_id
+
+    def reservar(self, quantidade):
+        """Entrega `quantidade` IDs de uma vez (importação em lote).
+
+        Usa o que resta do bloco atual e reserva o restante em blocos
+        inteiros, numa única chamada à sequência.
+        """
+        with self._lock:
+            ids = list(range(self._proximo, min(self._fim, self._proximo + quantidade)))
+            self._proximo += len(ids)
+            faltam = quantidade - len(ids)
+            if faltam > 0:
+                blocos = -(-faltam // self.tamanho_bloco)
+                inicio = self.sequencia.reservar(blocos * self.tamanho_bloco)
+                ids.extend(range(inicio, inicio + faltam))
+                self._proximo = inicio + faltam
+                self._fim = inicio + blocos * self.tamanho_bloco
+            return ids
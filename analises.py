@@ -0,0 +1,63 @@
+import streamlit as st
+from agregados import DIMENSOES
+from esquema import formatar_moeda
+from utils import medir_pagina, resumo_analises
+
+# Tempo de cada execução da página (métricas)
+cronometro = medir_pagina("analises")
+
+hide_streamlit_style = """
+    <style>
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+    [data-testid="stToolbar"] {visibility: hidden;}
+    </style>
+"""
+st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+
+
+st.set_page_config(layout="wide", page_title="Análises de Ideias")
+
+st.title("📊 Análises das Ideias")
+
+# Tudo vem dos agregados mantidos pelo cache: nenhum groupby sobre a planilha a cada interação
+# O arquivo (ideias encerradas há tempo) é lido uma vez e fica em cache; só a soma é refeita
+incluir_arquivo = st.checkbox("Incluir ideias arquivadas", value=True)
+resumo = resumo_analises(incluir_arquivo)
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Ideias", resumo["total"])
+c2.metric("Ganho financeiro", formatar_moeda(resumo["ganho"]))
+c3.metric("Investimento", formatar_moeda(resumo["investimento"]))
+c4.metric("ROI", f"{resumo['roi']:.1f}%" if resumo["roi"] is not None else "—")
+
+st.subheader("Funil de status")
+if resumo["funil"].empty:
+    st.info("Nenhuma ideia registrada.")
+else:
+    st.bar_chart(resumo["funil"])
+
+st.subheader("Ideias por dimensão")
+dimensao = st.selectbox("Agrupar por", DIMENSOES)
+tabela = resumo["dimensoes"][dimensao]
+st.bar_chart(tabela["Ideias"])
+st.dataframe(tabela, use_container_width=True,
+             column_config={"Ganho financeiro": st.column_config.NumberColumn(format="R$ %.2f"),
+                            "Investimento": st.column_config.NumberColumn(format="R$ %.2f"),
+                            "ROI (%)": st.column_config.NumberColumn(format="%.1f%%")})
+
+st.subheader("Status por mês da ideia")
+if resumo["funil_por_mes"].empty:
+    st.info("Sem ideias com data registrada.")
+else:
+    st.bar_chart(resumo["funil_por_mes"])
+
+st.subheader("Lead time (Data ideia → Data conclusão) por mês de conclusão")
+if resumo["lead_time_por_mes"].empty:
+    st.info("Sem ideias concluídas com as duas datas preenchidas.")
+else:
+    st.line_chart(resumo["lead_time_por_mes"]["Lead time médio (dias)"])
+    st.dataframe(resumo["lead_time_por_mes"], use_container_width=True)
+
+cronometro.encerrar()
@@ -0,0 +1,569 @@
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+
+from esquema import COLUNA_VERSAO
+from sob_demanda import ModuloSobDemanda
+
+# O gspread só é importado quando a planilha é usada de fato
+_utils_gspread = ModuloSobDemanda("gspread.utils")
+_erros_gspread = ModuloSobDemanda("gspread.exceptions")
+
+logger = logging.getLogger(__name__)
+
+
+# Colunas indexadas no SQLite (as usadas nos filtros e buscas dos painéis)
+COLUNAS_INDEXADAS = ["ID", "Status", "Área", "Matrícula"]
+
+
+def _chave_id(valor):
+    """ID normalizado para comparar (a planilha devolve int ou texto, o SQLite int); None se vazio."""
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+class BackendArmazenamento:
+    """Interface comum aos backends de armazenamento das ideias.
+
+    As linhas são endereçadas pelo índice do DataFrame retornado por
+    carregar_dados() (0 = primeira ideia), como já fazem as páginas.
+    """
+
+    def ler_registros(self):
+        """Retorna todas as ideias como uma lista de dicionários."""
+        raise NotImplementedError
+
+    def anexar_linha(self, valores):
+        """Adiciona uma linha (valores na ordem de get_column_order())."""
+        raise NotImplementedError
+
+    def anexar_linhas(self, linhas):
+        """Adiciona várias linhas de uma vez."""
+        for valores in linhas:
+            self.anexar_linha(valores)
+
+    def atualizar_linha(self, indice, valores):
+        """Sobrescreve a linha na posição indicada."""
+        raise NotImplementedError
+
+    def atualizar_celula(self, indice, coluna, valor):
+        """Sobrescreve uma única célula da linha na posição indicada."""
+        raise NotImplementedError
+
+    def atualizar_celulas(self, indice, alteracoes, versao_esperada):
+        """Grava só as células alteradas ({coluna: valor}) e avança a versão da linha.
+
+        Não grava nada (e retorna False) se a versão da linha não é mais
+        `versao_esperada`; retorna True se gravou.
+        """
+        return not self.atualizar_celulas_em_lote([(indice, alteracoes, versao_esperada)])
+
+    def atualizar_celulas_em_lote(self, edicoes):
+        """Grava as células alteradas de várias linhas: [(posição, {coluna: valor}, versão esperada)].
+
+        Cada linha gravada avança a sua versão; as que não estão mais na versão
+        esperada ficam de fora. Retorna as posições que não foram gravadas.
+        """
+        raise NotImplementedError
+
+    def excluir_linha(self, indice):
+        """Remove a linha na posição indicada."""
+        raise NotImplementedError
+
+    def excluir_linhas(self, indices):
+        """Remove várias linhas (posições antes da remoção)."""
+        for indice in sorted(indices, reverse=True):
+            self.excluir_linha(indice)
+
+    def ler_ids(self):
+        """Retorna só a coluna ID, na ordem das linhas (checagem barata de alterações)."""
+        raise NotImplementedError
+
+    def ler_coluna(self, coluna):
+        """Retorna os valores de uma coluna, na ordem das linhas."""
+        raise NotImplementedError
+
+    def ler_colunas(self, colunas):
+        """{coluna: valores} de várias colunas, na ordem das linhas."""
+        return {coluna: self.ler_coluna(coluna) for coluna in colunas}
+
+    def ler_id_da_linha(self, indice):
+        """Lê apenas o ID da linha na posição indicada (None se ela não existe)."""
+        raise NotImplementedError
+
+    def ler_linha(self, indice):
+        """Lê a linha inteira na posição indicada como {coluna: valor} (None se ela não existe)."""
+        raise NotImplementedError
+
+    def ler_linhas_desde(self, inicio):
+        """Retorna as ideias a partir da posição `inicio` (linhas anexadas depois)."""
+        raise NotImplementedError
+
+    def ler_linhas_gravadas(self, indices):
+        """{posição: valores na ordem das colunas} como estão gravados, sem conversão de tipos.
+
+        Posições que não existem ficam de fora.
+        """
+        raise NotImplementedError
+
+    def versao(self):
+        """Marca que muda sempre que os dados mudam; None se não for possível saber."""
+        return None
+
+    def tipar_valores(self, valores):
+        """Converte valores escritos para os tipos que ler_registros() devolveria."""
+        return list(valores)
+
+
+class BackendPlanilha(BackendArmazenamento):
+    """Backend original: a aba "Ideias" da Planilha Google."""
+
+    def __init__(self, worksheet, colunas):
+        self.worksheet = worksheet
+        self.colunas = list(colunas)
+        self._cabecalho_versao = False
+
+    def _ultima_coluna(self):
+        return _utils_gspread.rowcol_to_a1(1, len(self.colunas)).rstrip("0123456789")
+
+    def ler_registros(self):
+        return self.worksheet.get_all_records()
+
+    def anexar_linha(self, valores):
+        self.worksheet.append_row(valores)
+
+    def anexar_linhas(self, linhas):
+        # Uma única chamada à API para o lote inteiro
+        self.worksheet.append_rows(linhas)
+
+    def atualizar_linha(self, indice, valores):
+        # +2: a linha 1 é o cabeçalho e a planilha começa em 1
+        linha = int(indice) + 2
+        self.worksheet.update(f'A{linha}:{self._ultima_coluna()}{linha}', [valores])
+
+    def atualizar_celulas_em_lote(self, edicoes):
+        # A planilha não tem compare-and-set: a conferência das versões é a leitura
+        # feita logo antes (ler_linha/ler_colunas); todas as células vão numa única batch_update
+        rowcol_to_a1 = _utils_gspread.rowcol_to_a1
+        coluna_versao = self.colunas.index(COLUNA_VERSAO) + 1
+        dados = []
+        for indice, alteracoes, versao_esperada in edicoes:
+            linha = int(indice) + 2
+            dados += [{"range": rowcol_to_a1(linha, self.colunas.index(coluna) + 1), "values": [[valor]]}
+                      for coluna, valor in alteracoes.items()]
+            dados.append({"range": rowcol_to_a1(linha, coluna_versao), "values": [[versao_esperada + 1]]})
+        if not dados:
+            return []
+        if not self._cabecalho_versao:
+            # Planilhas antigas não têm o título da coluna de versão
+            dados.append({"range": rowcol_to_a1(1, coluna_versao), "values": [[COLUNA_VERSAO]]})
+        self.worksheet.batch_update(dados)
+        self._cabecalho_versao = True
+        return []
+
+    def atualizar_celula(self, indice, coluna, valor):
+        self.worksheet.update_cell(int(indice) + 2, self.colunas.index(coluna) + 1, valor)
+
+    def excluir_linha(self, indice):
+        self.worksheet.delete_rows(int(indice) + 2)
+
+    def excluir_linhas(self, indices):
+        # Uma única chamada batch_update; os trechos contíguos são removidos de
+        # baixo para cima para que as posições dos demais não mudem no meio do lote
+        requisicoes = []
+        for inicio, fim in reversed(_trechos_contiguos(indices)):
+            requisicoes.append({"deleteDimension": {"range": {
+                "sheetId": self.worksheet.id, "dimension": "ROWS",
+                "startIndex": inicio + 1, "endIndex": fim + 2,
+            }}})
+        if requisicoes:
+            self.worksheet.spreadsheet.batch_update({"requests": requisicoes})
+
+    def ler_ids(self):
+        # Uma única coluna em vez das 23: descarta o cabeçalho
+        return self.worksheet.col_values(1)[1:]
+
+    def ler_coluna(self, coluna):
+        return self.worksheet.col_values(self.colunas.index(coluna) + 1)[1:]
+
+    def ler_colunas(self, colunas):
+        # Uma única chamada (batch_get) para todas as colunas
+        letras = [_utils_gspread.rowcol_to_a1(1, self.colunas.index(c) + 1).rstrip("0123456789") for c in colunas]
+        intervalos = self.worksheet.batch_get([f"{letra}2:{letra}" for letra in letras])
+        return {coluna: [linha[0] if linha else "" for linha in intervalo]
+                for coluna, intervalo in zip(colunas, intervalos)}
+
+    def ler_id_da_linha(self, indice):
+        return self.worksheet.cell(int(indice) + 2, 1).value
+
+    def ler_linha(self, indice):
+        linha = int(indice) + 2
+        valores = self.worksheet.get_values(f"A{linha}:{self._ultima_coluna()}{linha}")
+        if not valores or not any(valores[0]):
+            return None
+        valores = valores[0] + [""] * (len(self.colunas) - len(valores[0]))
+        return dict(zip(self.colunas, self.tipar_valores(valores)))
+
+    def ler_linhas_gravadas(self, indices):
+        # Uma única chamada (batch_get), com um intervalo por trecho de linhas consecutivas
+        trechos = _trechos_contiguos(indices)
+        if not trechos:
+            return {}
+        intervalos = self.worksheet.batch_get(
+            [f"A{inicio + 2}:{self._ultima_coluna()}{fim + 2}" for inicio, fim in trechos])
+        linhas = {}
+        for (inicio, _), valores in zip(trechos, intervalos):
+            for deslocamento, valores_linha in enumerate(valores):
+                if any(valores_linha):
+                    faltam = len(self.colunas) - len(valores_linha)
+                    linhas[inicio + deslocamento] = list(valores_linha) + [""] * faltam
+        return linhas
+
+    def substituir_linhas(self, linhas):
+        """Regrava todas as ideias abaixo do cabeçalho com `linhas` e remove as que sobrarem."""
+        total = len(self.ler_ids())
+        if linhas:
+            self.worksheet.update(f"A2:{self._ultima_coluna()}{len(linhas) + 1}", [list(v) for v in linhas])
+        if total > len(linhas):
+            self.excluir_linhas(range(len(linhas), total))
+
+    def ler_linhas_desde(self, inicio):
+        primeira = int(inicio) + 2
+        linhas = self.worksheet.get_values(f"A{primeira}:{self._ultima_coluna()}")
+        return [dict(zip(self.colunas, self.tipar_valores(linha))) for linha in linhas if any(linha)]
+
+    def versao(self):
+        # Data de modificação do arquivo no Drive: uma chamada leve, sem ler células
+        try:
+            return self.worksheet.spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            logger.warning("Não foi possível ler a data de modificação da planilha: %s", e)
+            return None
+
+    def tipar_valores(self, valores):
+        # get_all_records() devolve números como int/float
+        return [_utils_gspread.numericise(str(v)) if v is not None else "" for v in valores]
+
+
+class BackendSQLite(BackendArmazenamento):
+    """Backend local em SQLite, com índices em ID, Status, Área e Matrícula.
+
+    Opcionalmente espelha cada escrita em outro backend (normalmente a
+    Planilha Google), que passa a ser apenas um destino de sincronização.
+    As linhas do espelho são localizadas pelo ID antes de cada escrita; se
+    uma escrita falha, o espelho fica marcado como desatualizado (no próprio
+    banco, vale entre reinícios) e é regravado por inteiro na escrita seguinte.
+    """
+
+    def __init__(self, caminho, colunas, espelho=None):
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        self.espelho = espelho
+        self._lock = threading.Lock()
+        self._lock_espelho = threading.Lock()
+        self._criar_tabela()
+        if espelho is not None and self._contar() == 0:
+            try:
+                self.importar_registros(espelho.ler_registros())
+            except Exception as e:
+                # Sem a planilha (ex.: sem rede) o app abre mesmo assim, com o banco local vazio
+                logger.warning("Não foi possível copiar as ideias do espelho para o banco local: %s", e)
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        return conexao
+
+    @staticmethod
+    def _q(coluna):
+        return '"' + coluna.replace('"', '""') + '"'
+
+    def _criar_tabela(self):
+        def definicao(coluna):
+            return f"{self._q(coluna)} INTEGER" if coluna in ("ID", COLUNA_VERSAO) else f"{self._q(coluna)} TEXT"
+
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute("CREATE TABLE IF NOT EXISTS ideias (rowid INTEGER PRIMARY KEY, "
+                            f"{', '.join(definicao(c) for c in self.colunas)})")
+            # Bancos criados antes de uma coluna nova (ex.: a de versão) ganham a coluna vazia
+            existentes = {linha[1] for linha in conexao.execute("PRAGMA table_info(ideias)")}
+            for coluna in self.colunas:
+                if coluna not in existentes:
+                    conexao.execute(f"ALTER TABLE ideias ADD COLUMN {definicao(coluna)}")
+            conexao.execute("CREATE TABLE IF NOT EXISTS controle (chave TEXT PRIMARY KEY, valor INTEGER)")
+            conexao.execute("INSERT OR IGNORE INTO controle (chave, valor) VALUES ('versao', 0)")
+            conexao.execute("INSERT OR IGNORE INTO controle (chave, valor) VALUES ('espelho_desatualizado', 0)")
+            for i, coluna in enumerate(COLUNAS_INDEXADAS):
+                if coluna in self.colunas:
+                    conexao.execute(f"CREATE INDEX IF NOT EXISTS idx_ideias_{i} ON ideias ({self._q(coluna)})")
+
+    def _contar(self):
+        with closing(self._conectar()) as conexao:
+            return conexao.execute("SELECT COUNT(*) FROM ideias").fetchone()[0]
+
+    def _rowid_da_posicao(self, conexao, indice):
+        linha = conexao.execute("SELECT rowid FROM ideias ORDER BY rowid LIMIT 1 OFFSET ?",
+                                (int(indice),)).fetchone()
+        if linha is None:
+            raise IndexError(f"Linha {indice} não existe no banco local.")
+        return linha[0]
+
+    @staticmethod
+    def _incrementar_versao(conexao):
+        conexao.execute("UPDATE controle SET valor = valor + 1 WHERE chave = 'versao'")
+
+    def _ids_das_posicoes(self, conexao, indices):
+        """{posição: ID} das linhas locais nas posições indicadas."""
+        ids = [linha[0] for linha in conexao.execute('SELECT "ID" FROM ideias ORDER BY rowid')]
+        return {int(i): ids[int(i)] for i in indices}
+
+    def espelho_desatualizado(self):
+        with closing(self._conectar()) as conexao:
+            return bool(conexao.execute(
+                "SELECT valor FROM controle WHERE chave = 'espelho_desatualizado'").fetchone()[0])
+
+    def _marcar_espelho(self, desatualizado):
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute("UPDATE controle SET valor = ? WHERE chave = 'espelho_desatualizado'",
+                            (int(desatualizado),))
+
+    def _posicoes_no_espelho(self, ids):
+        """{posição local: posição no espelho} das linhas com os IDs `ids` ({posição local: ID}).
+
+        Uma linha só confere a própria célula de ID; várias leem a coluna ID
+        inteira. Levanta LookupError se alguma não está (uma única vez) no espelho.
+        """
+        if len(ids) == 1:
+            (indice, id_ideia), = ids.items()
+            chave = _chave_id(id_ideia)
+            if chave is not None and _chave_id(self.espelho.ler_id_da_linha(indice)) == chave:
+                return {indice: indice}
+        posicoes = {}
+        for posicao, valor in enumerate(self.espelho.ler_ids()):
+            chave = _chave_id(valor)
+            posicoes[chave] = None if chave in posicoes else posicao
+        resultado = {}
+        for indice, id_ideia in ids.items():
+            posicao = posicoes.get(_chave_id(id_ideia))
+            if _chave_id(id_ideia) is None or posicao is None:
+                raise LookupError(f"ideia {id_ideia} não encontrada (ou repetida) no espelho")
+            resultado[indice] = posicao
+        return resultado
+
+    def _espelhar(self, operacao, escrever, ids=None):
+        """Repete a escrita no espelho; falhas não bloqueiam o banco local.
+
+        `escrever` recebe {posição local: posição no espelho} das linhas `ids`
+        ({posição local: ID}), localizadas pelo ID. Com o espelho desatualizado,
+        ele é regravado por inteiro em vez de receber a escrita.
+        """
+        if self.espelho is None:
+            return
+        if self.espelho_desatualizado():
+            self.sincronizar_espelho()
+            return
+        with self._lock_espelho:
+            try:
+                escrever(self._posicoes_no_espelho(ids) if ids else {})
+            except Exception as e:
+                logger.warning("Falha ao sincronizar '%s' com o espelho (será regravado por inteiro): %s",
+                               operacao, e)
+                self._marcar_espelho(True)
+
+    def sincronizar_espelho(self):
+        """Regrava o espelho inteiro a partir do banco local; retorna True se conseguiu."""
+        if self.espelho is None:
+            return True
+        with self._lock_espelho:
+            try:
+                self.espelho.substituir_linhas([[registro[c] for c in self.colunas]
+                                                for registro in self.ler_registros()])
+            except Exception as e:
+                logger.warning("Falha ao regravar o espelho: %s", e)
+                self._marcar_espelho(True)
+                return False
+            self._marcar_espelho(False)
+            return True
+
+    def importar_registros(self, registros):
+        """Insere vários registros de uma vez (usado para semear o banco)."""
+        linhas = [[registro.get(c, "") for c in self.colunas] for registro in registros]
+        if not linhas:
+            return
+        marcadores = ", ".join("?" for _ in self.colunas)
+        nomes = ", ".join(self._q(c) for c in self.colunas)
+        with self._lock, closing(self._conectar()) as conexao, conexao:
+            conexao.executemany(f"INSERT INTO ideias ({nomes}) VALUES ({marcadores})", linhas)
+            self._incrementar_versao(conexao)
+
+    def ler_registros(self):
+        return self.ler_linhas_desde(0)
+
+    def ler_id_da_linha(self, indice):
+        with closing(self._conectar()) as conexao:
+            linha = conexao.execute('SELECT "ID" FROM ideias ORDER BY rowid LIMIT 1 OFFSET ?',
+                                    (int(indice),)).fetchone()
+        return linha[0] if linha else None
+
+    def ler_linha(self, indice):
+        nomes = ", ".join(self._q(c) for c in self.colunas)
+        with closing(self._conectar()) as conexao:
+            linha = conexao.execute(f"SELECT {nomes} FROM ideias ORDER BY rowid LIMIT 1 OFFSET ?",
+                                    (int(indice),)).fetchone()
+        return dict(zip(self.colunas, ["" if v is None else v for v in linha])) if linha else None
+
+    def ler_linhas_desde(self, inicio):
+        nomes = ", ".join(self._q(c) for c in self.colunas)
+        with closing(self._conectar()) as conexao:
+            linhas = conexao.execute(f"SELECT {nomes} FROM ideias ORDER BY rowid LIMIT -1 OFFSET ?",
+                                     (int(inicio),)).fetchall()
+        return [dict(zip(self.colunas, ["" if v is None else v for v in linha])) for linha in linhas]
+
+    def ler_linhas_gravadas(self, indices):
+        nomes = ", ".join(self._q(c) for c in self.colunas)
+        linhas = {}
+        with closing(self._conectar()) as conexao:
+            for inicio, fim in _trechos_contiguos(indices):
+                trecho = conexao.execute(f"SELECT {nomes} FROM ideias ORDER BY rowid LIMIT ? OFFSET ?",
+                                         (fim - inicio + 1, inicio)).fetchall()
+                for deslocamento, linha in enumerate(trecho):
+                    linhas[inicio + deslocamento] = ["" if v is None else v for v in linha]
+        return linhas
+
+    def versao(self):
+        with closing(self._conectar()) as conexao:
+            return conexao.execute("SELECT valor FROM controle WHERE chave = 'versao'").fetchone()[0]
+
+    def anexar_linha(self, valores):
+        self.anexar_linhas([valores])
+
+    def anexar_linhas(self, linhas):
+        marcadores = ", ".join("?" for _ in self.colunas)
+        nomes = ", ".join(self._q(c) for c in self.colunas)
+        with self._lock, closing(self._conectar()) as conexao, conexao:
+            conexao.executemany(f"INSERT INTO ideias ({nomes}) VALUES ({marcadores})", [list(v) for v in linhas])
+            self._incrementar_versao(conexao)
+        # Anexar não depende de posição: vai sempre para o fim do espelho
+        self._espelhar("anexar_linhas", lambda _: self.espelho.anexar_linhas(linhas))
+
+    def atualizar_linha(self, indice, valores):
+        atribuicoes = ", ".join(f"{self._q(c)} = ?" for c in self.colunas)
+        with self._lock, closing(self._conectar()) as conexao, conexao:
+            rowid = self._rowid_da_posicao(conexao, indice)
+            ids = self._ids_das_posicoes(conexao, [indice])
+            conexao.execute(f"UPDATE ideias SET {atribuicoes} WHERE rowid = ?", list(valores) + [rowid])
+            self._incrementar_versao(conexao)
+        self._espelhar("atualizar_linha", lambda posicoes: self.espelho.atualizar_linha(posicoes[indice], valores),
+                       ids)
+
+    def atualizar_celula(self, indice, coluna, valor):
+        with self._lock, closing(self._conectar()) as conexao, conexao:
+            rowid = self._rowid_da_posicao(conexao, indice)
+            ids = self._ids_das_posicoes(conexao, [indice])
+            conexao.execute(f"UPDATE ideias SET {self._q(coluna)} = ? WHERE rowid = ?", (valor, rowid))
+            self._incrementar_versao(conexao)
+        self._espelhar("atualizar_celula",
+                       lambda posicoes: self.espelho.atualizar_celula(posicoes[indice], coluna, valor), ids)
+
+    def atualizar_celulas_em_lote(self, edicoes):
+        versao = self._q(COLUNA_VERSAO)
+        gravadas, recusadas = [], []
+        with self._lock, closing(self._conectar()) as conexao, conexao:
+            for indice, alteracoes, versao_esperada in edicoes:
+                atribuicoes = ", ".join([f"{self._q(c)} = ?" for c in alteracoes] + [f"{versao} = ?"])
+                rowid = self._rowid_da_posicao(conexao, indice)
+                # Compare-and-set: só grava se ninguém avançou a versão desde a leitura
+                cursor = conexao.execute(
+                    f"UPDATE ideias SET {atribuicoes} WHERE rowid = ? AND COALESCE(NULLIF({versao}, ''), 0) = ?",
+                    list(alteracoes.values()) + [versao_esperada + 1, rowid, versao_esperada])
+                (gravadas if cursor.rowcount else recusadas).append((indice, alteracoes, versao_esperada))
+            if gravadas:
+                self._incrementar_versao(conexao)
+                ids = self._ids_das_posicoes(conexao, [indice for indice, _, _ in gravadas])
+        if gravadas:
+            self._espelhar("atualizar_celulas_em_lote", lambda posicoes: self.espelho.atualizar_celulas_em_lote(
+                [(posicoes[int(indice)], alteracoes, versao) for indice, alteracoes, versao in gravadas]), ids)
+        return [indice for indice, _, _ in recusadas]
+
+    def excluir_linha(self, indice):
+        self.excluir_linhas([indice])
+
+    def excluir_linhas(self, indices):
+        with self._lock, closing(self._conectar()) as conexao, conexao:
+            rowids = [linha[0] for linha in conexao.execute("SELECT rowid FROM ideias ORDER BY rowid")]
+            ids = self._ids_das_posicoes(conexao, indices)
+            conexao.executemany("DELETE FROM ideias WHERE rowid = ?", [(rowids[int(i)],) for i in indices])
+            self._incrementar_versao(conexao)
+        self._espelhar("excluir_linhas", lambda posicoes: self.espelho.excluir_linhas(list(posicoes.values())), ids)
+
+    def ler_ids(self):
+        return self.ler_coluna("ID")
+
+    def ler_coluna(self, coluna):
+        with closing(self._conectar()) as conexao:
+            return [linha[0] for linha in conexao.execute(f"SELECT {self._q(coluna)} FROM ideias ORDER BY rowid")]
+
+
+def _trechos_contiguos(indices):
+    """Agrupa posições em trechos (início, fim) consecutivos, em ordem crescente."""
+    trechos = []
+    for indice in sorted(set(int(i) for i in indices)):
+        if trechos and indice == trechos[-1][1] + 1:
+            trechos[-1][1] = indice
+        else:
+            trechos.append([indice, indice])
+    return [tuple(trecho) for trecho in trechos]
+
+
+def criar_backend(config, colunas, worksheet=None):
+    """Cria o backend escolhido na configuração ("sheets" ou "sqlite")."""
+    tipo = str(config.get("backend", "sheets")).lower()
+    if tipo == "sqlite":
+        espelho = None
+        if config.get("espelhar_planilha") and worksheet is not None:
+            espelho = BackendPlanilha(worksheet, colunas)
+        return BackendSQLite(config.get("caminho_sqlite", "ideias.db"), colunas, espelho=espelho)
+    if tipo != "sheets":
+        raise ValueError(f"Backend de armazenamento desconhecido: {tipo}")
+    if worksheet is None:
+        return None
+    return BackendPlanilha(worksheet, colunas)
+
+
+def _abrir_aba(planilha, titulo, colunas):
+    """Retorna a aba da planilha, criando-a (com o cabeçalho) se ainda não existir."""
+    try:
+        return planilha.worksheet(titulo)
+    except _erros_gspread.WorksheetNotFound:
+        try:
+            aba = planilha.add_worksheet(titulo, rows=1000, cols=len(colunas))
+        except _erros_gspread.APIError:
+            # Outro processo criou a aba ao mesmo tempo
+            return planilha.worksheet(titulo)
+        aba.update(f"A1:{_utils_gspread.rowcol_to_a1(1, len(colunas))}", [list(colunas)])
+        return aba
+
+
+def criar_backend_arquivo(config, colunas, worksheet=None):
+    """Cria o backend do arquivo de ideias encerradas (None se desativado).
+
+    Por padrão segue o backend principal: uma aba "Arquivo" na mesma planilha
+    ou um segundo banco SQLite (espelhado nessa aba, se o principal é espelhado).
+    """
+    tipo = str(config.get("arquivo", config.get("backend", "sheets"))).lower()
+    if tipo in ("", "nenhum"):
+        return None
+    titulo = config.get("aba_arquivo", "Arquivo")
+    if tipo == "sqlite":
+        espelho = None
+        if config.get("espelhar_planilha") and worksheet is not None:
+            espelho = BackendPlanilha(_abrir_aba(worksheet.spreadsheet, titulo, colunas), colunas)
+        return BackendSQLite(config.get("caminho_arquivo", "ideias_arquivo.db"), colunas, espelho=espelho)
+    if tipo != "sheets":
+        raise ValueError(f"Backend de arquivo desconhecido: {tipo}")
+    if worksheet is None:
+        return None
+    return BackendPlanilha(_abrir_aba(worksheet.spreadsheet, titulo, colunas), colunas)
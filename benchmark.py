@@ -0,0 +1,182 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Arquivo (na raiz do repositório) onde cada execução é anexada como uma linha JSON
+ARQUIVO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_resultados.jsonl")
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _medir(planilha, funcao, repeticoes, preparar=None):
+    tempos, erros = [], 0
+    chamadas_antes = planilha.total_chamadas()
+    for _ in range(repeticoes):
+        argumento = preparar() if preparar is not None else None
+        inicio = time.perf_counter()
+        try:
+            funcao(argumento) if preparar is not None else funcao()
+        except Exception:
+            erros += 1
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        "mediana_ms": round(statistics.median(tempos) * 1000, 3),
+        "min_ms": round(min(tempos) * 1000, 3),
+        "chamadas_api": round((planilha.total_chamadas() - chamadas_antes) / repeticoes, 2),
+        "erros": erros,
+    }
+
+
+def executar(tamanho, latencia, prob_429, repeticoes):
+    """Mede as operações principais do app sobre uma planilha falsa com `tamanho` ideias."""
+    import utils
+    from armazenamento import BackendPlanilha
+    from esquema import get_column_order, registro_como_texto
+    from planilha_falsa import criar_aba_ideias, linha_aleatoria
+
+    aba = criar_aba_ideias(tamanho, semente=tamanho)
+    planilha = aba.spreadsheet
+    # O app passa a falar com a planilha falsa
+    utils.worksheet = aba
+    utils.backend = BackendPlanilha(aba, get_column_order())
+    utils.CAMINHO_SNAPSHOT = ""
+    utils.obter_alocador.clear()
+    cache = utils.obter_cache()
+    cache.invalidar()
+    cache.usar_snapshot = False
+    # A latência e os erros só valem para as medições, não para a montagem
+    planilha.latencia, planilha.prob_429 = latencia, prob_429
+    gerador = random.Random(tamanho)
+    poucas = max(1, repeticoes // 4) if tamanho >= 100000 else repeticoes
+
+    def carregar_frio():
+        cache.invalidar()
+        utils.carregar_dados()
+
+    def reconstruir_filtros():
+        cache._filtros = None
+        utils.obter_indice_filtros()
+
+    def consultar_filtros():
+        # Mesmo caminho do consulta_.py: índice pronto + seleções da barra lateral
+        indice = utils.obter_indice_filtros()
+        indice.filtrar({"Status": ["Concluída", "Aprovada"], "Área": ["Cobre", "Zinco"],
+                        "Matrícula": indice.opcoes("Matrícula")[:50]})
+
+    def nova_ideia():
+        valores = linha_aleatoria(0, gerador)
+        return dict(zip(get_column_order(), valores))
+
+    def salvar(ideia):
+        ideia["ID"] = utils.proximo_id()
+        utils.salvar_ideia(ideia)
+
+    def ideia_existente():
+        df = utils.carregar_dados()
+        id_ideia = int(df['ID'].iloc[gerador.randrange(len(df))])
+        posicao, linha = utils.localizar_ideia(id_ideia)
+        return posicao, registro_como_texto(linha)
+
+    def editar(alvo):
+        posicao, dados = alvo
+        dados["Status"] = gerador.choice(["Aprovada", "Concluída"])
+        utils.editar_ideia(posicao, dados)
+
+    def excluir(alvo):
+        posicao, dados = alvo
+        utils.excluir_ideia(posicao, dados["ID"])
+
+    resultados = {
+        "carregar_dados (frio)": _medir(planilha, carregar_frio, poucas),
+        "carregar_dados (cache)": _medir(planilha, utils.carregar_dados, repeticoes),
+        "filtros: montar índice": _medir(planilha, reconstruir_filtros, poucas),
+        "filtros: consulta": _medir(planilha, consultar_filtros, repeticoes),
+        "salvar_ideia": _medir(planilha, salvar, repeticoes, preparar=nova_ideia),
+        "editar_ideia": _medir(planilha, editar, repeticoes, preparar=ideia_existente),
+        "excluir_ideia": _medir(planilha, excluir, repeticoes, preparar=ideia_existente),
+    }
+    resultados["erros_429_injetados"] = planilha.erros_429
+    return resultados
+
+
+def _anterior(parametros):
+    """Última execução gravada com os mesmos parâmetros (para comparar)."""
+    if not os.path.exists(ARQUIVO_RESULTADOS):
+        return None
+    ultima = None
+    with open(ARQUIVO_RESULTADOS, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            registro = json.loads(linha)
+            if registro.get("parametros") == parametros:
+                ultima = registro
+    return ultima
+
+
+def _imprimir(resultados, anterior):
+    referencia = (anterior or {}).get("resultados", {})
+    cabecalho = f"{'tamanho':>8}  {'operação':<24} {'mediana (ms)':>13} {'chamadas':>9} {'erros':>6}"
+    if anterior:
+        cabecalho += f"  {'vs ' + str(anterior.get('commit')):>14}"
+    print(cabecalho)
+    for tamanho, medidas in resultados.items():
+        for nome, medida in medidas.items():
+            if not isinstance(medida, dict):
+                continue
+            linha = (f"{tamanho:>8}  {nome:<24} {medida['mediana_ms']:>13.2f} {medida['chamadas_api']:>9.2f} "
+                     f"{medida['erros']:>6}")
+            antes = referencia.get(tamanho, {}).get(nome)
+            if antes and antes["mediana_ms"]:
+                linha += f"  {(medida['mediana_ms'] / antes['mediana_ms'] - 1) * 100:>+13.1f}%"
+            print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do app sobre uma planilha simulada (sem rede).")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por chamada à API simulada")
+    parser.add_argument("--prob-429", type=float, default=0.0, help="chance de cada chamada falhar com 429")
+    parser.add_argument("--repeticoes", type=int, default=8)
+    parser.add_argument("--nao-gravar", action="store_true", help="não anexa o resultado ao arquivo")
+    args = parser.parse_args()
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # Arquivos locais do app (fila, índices, snapshot) ficam num diretório temporário
+    os.chdir(tempfile.mkdtemp(prefix="benchmark_ideias_"))
+
+    parametros = {"tamanhos": args.tamanhos, "latencia": args.latencia, "prob_429": args.prob_429,
+                  "repeticoes": args.repeticoes}
+    resultados = {str(tamanho): executar(tamanho, args.latencia, args.prob_429, args.repeticoes)
+                  for tamanho in args.tamanhos}
+    anterior = _anterior(parametros)
+    _imprimir(resultados, anterior)
+
+    if not args.nao_gravar:
+        import pandas as pd
+        registro = {
+            "commit": _commit_atual(), "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "pandas": pd.__version__, "maquina": platform.machine(),
+            "parametros": parametros, "resultados": resultados,
+        }
+        with open(ARQUIVO_RESULTADOS, "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        print(f"\nResultado anexado a {ARQUIVO_RESULTADOS}")
+
+
+if __name__ == "__main__":
+    main()
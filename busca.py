@@ -0,0 +1,127 @@
+import bisect
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from sob_demanda import ModuloSobDemanda
+
+pd = ModuloSobDemanda("pandas")
+
+# Campos de texto indexados e o peso de cada um no ranking
+CAMPOS_BUSCA = {"Nome da ideia": 2.0, "Descrição de problema": 1.0, "Descrição da solução": 1.0}
+
+# Palavras muito comuns em português que não ajudam a distinguir ideias
+STOPWORDS = {
+    "a", "as", "o", "os", "um", "uma", "uns", "umas", "de", "da", "das", "do", "dos", "e", "em", "na", "nas",
+    "no", "nos", "para", "pra", "por", "pela", "pelo", "com", "sem", "que", "se", "ao", "aos", "ou", "mais",
+    "muito", "foi", "ser", "ter", "como", "sua", "seu", "isso", "esta", "este", "essa", "esse",
+}
+
+_NAO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: "Àrea Àcida" -> "area acida"."""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return sem_acentos.lower()
+
+
+def tokenizar(texto):
+    """Quebra o texto normalizado em termos, descartando stopwords."""
+    return [t for t in _NAO_ALFANUMERICO.split(normalizar(texto)) if t and t not in STOPWORDS]
+
+
+class IndiceBusca:
+    """Índice invertido (termo -> {ID da ideia: peso}) com ranking BM25.
+
+    É montado uma vez por carga de dados e atualizado ideia a ideia nas
+    escritas (adicionar/remover), então a consulta só visita as listas dos
+    termos pesquisados.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.postagens = {}
+        self.termos_por_doc = {}
+        self.tamanhos = {}
+        self._soma_tamanhos = 0.0
+        self._vocabulario = None
+
+    @classmethod
+    def de_dataframe(cls, df):
+        indice = cls()
+        campos = [c for c in CAMPOS_BUSCA if c in df.columns]
+        for registro in df[['ID'] + campos].itertuples(index=False, name=None):
+            if not pd.isna(registro[0]):
+                indice.adicionar(int(registro[0]), dict(zip(campos, registro[1:])))
+        return indice
+
+    def adicionar(self, id_ideia, campos):
+        """Indexa (ou reindexa) uma ideia a partir de {campo: texto}."""
+        if id_ideia in self.termos_por_doc:
+            self.remover(id_ideia)
+        pesos = Counter()
+        for campo, texto in campos.items():
+            if pd.isna(texto):
+                continue
+            for termo in tokenizar(texto):
+                pesos[termo] += CAMPOS_BUSCA.get(campo, 1.0)
+        self.termos_por_doc[id_ideia] = pesos
+        self.tamanhos[id_ideia] = sum(pesos.values())
+        self._soma_tamanhos += self.tamanhos[id_ideia]
+        for termo, peso in pesos.items():
+            if termo not in self.postagens:
+                self.postagens[termo] = {}
+                self._vocabulario = None
+            self.postagens[termo][id_ideia] = peso
+
+    def remover(self, id_ideia):
+        for termo in self.termos_por_doc.pop(id_ideia, {}):
+            documentos = self.postagens.get(termo)
+            if documentos is not None:
+                documentos.pop(id_ideia, None)
+                if not documentos:
+                    del self.postagens[termo]
+                    self._vocabulario = None
+        self._soma_tamanhos -= self.tamanhos.pop(id_ideia, 0.0)
+
+    def _expandir(self, termo):
+        """Termos do índice que começam com `termo` (busca enquanto digita)."""
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self.postagens)
+        inicio = bisect.bisect_left(self._vocabulario, termo)
+        fim = bisect.bisect_left(self._vocabulario, termo + "\uffff")
+        return self._vocabulario[inicio:fim]
+
+    def buscar(self, consulta, limite=None):
+        """Retorna [(ID, pontuação)] das ideias com todos os termos, da mais relevante para a menor.
+
+        O último termo da consulta também casa como prefixo.
+        """
+        termos = tokenizar(consulta)
+        if not termos or not self.tamanhos:
+            return []
+        total_docs = len(self.tamanhos)
+        tamanho_medio = max(self._soma_tamanhos / total_docs, 1.0)
+        pontuacao = None
+        for posicao, termo in enumerate(termos):
+            variantes = self._expandir(termo) if posicao == len(termos) - 1 else [termo]
+            pontos_termo = Counter()
+            for variante in variantes:
+                documentos = self.postagens.get(variante, {})
+                idf = math.log(1 + (total_docs - len(documentos) + 0.5) / (len(documentos) + 0.5))
+                for id_ideia, tf in documentos.items():
+                    norma = self.K1 * (1 - self.B + self.B * self.tamanhos[id_ideia] / tamanho_medio)
+                    pontos_termo[id_ideia] = max(pontos_termo[id_ideia], idf * tf * (self.K1 + 1) / (tf + norma))
+            if pontuacao is None:
+                pontuacao = pontos_termo
+            else:
+                # Todos os termos precisam aparecer na ideia
+                pontuacao = Counter({i: p + pontos_termo[i] for i, p in pontuacao.items() if i in pontos_termo})
+            if not pontuacao:
+                return []
+        return pontuacao.most_common(limite)
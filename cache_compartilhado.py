@@ -0,0 +1,116 @@
+import logging
+import sqlite3
+import time
+from contextlib import closing
+
+from snapshot import desserializar_dataframe, serializar_dataframe
+
+logger = logging.getLogger(__name__)
+
+
+class CacheCompartilhado:
+    """DataFrame das ideias compartilhado entre processos (réplicas) num arquivo SQLite.
+
+    Guarda a última carga serializada (Arrow) junto de um número de versão que
+    só cresce. Cada réplica confere versao() — uma consulta de uma linha — a
+    cada execução e só lê o DataFrame quando ela mudou; assim a planilha é lida
+    uma vez por mudança, e não uma vez por réplica.
+
+    Uma versão sem conteúdo significa "invalidado": quem ler depois recarrega
+    do backend e publica de novo.
+    """
+
+    def __init__(self, caminho, colunas):
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS dados ("
+                "id INTEGER PRIMARY KEY CHECK (id = 1), versao INTEGER NOT NULL, conteudo BLOB, "
+                "publicado_em REAL NOT NULL)"
+            )
+            conexao.execute("INSERT OR IGNORE INTO dados (id, versao, publicado_em) VALUES (1, 0, 0)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS tarefas (nome TEXT PRIMARY KEY, executada_em REAL NOT NULL)")
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        return conexao
+
+    def versao(self):
+        """Versão atual dos dados compartilhados (0 = nada publicado ainda)."""
+        with closing(self._conectar()) as conexao:
+            return conexao.execute("SELECT versao FROM dados WHERE id = 1").fetchone()[0]
+
+    def ler(self):
+        """(DataFrame, versão do backend, versão) publicados, ou None se vazio/invalidado."""
+        with closing(self._conectar()) as conexao:
+            versao, conteudo = conexao.execute("SELECT versao, conteudo FROM dados WHERE id = 1").fetchone()
+        if conteudo is None:
+            return None
+        try:
+            df, versao_backend, _ = desserializar_dataframe(conteudo, self.colunas)
+        except Exception as e:
+            logger.warning("Cache compartilhado em %s ignorado: %s", self.caminho, e)
+            return None
+        return df, versao_backend, versao
+
+    def publicar(self, df, versao_backend, versao_base):
+        """Publica o DataFrame se ninguém publicou depois de `versao_base`.
+
+        Retorna a nova versão, ou None se outra réplica publicou antes (nesse
+        caso nada é gravado).
+        """
+        conteudo = serializar_dataframe(df, versao_backend, self.colunas)
+        with closing(self._conectar()) as conexao:
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                atual = conexao.execute("SELECT versao FROM dados WHERE id = 1").fetchone()[0]
+                if atual != versao_base:
+                    return None
+                conexao.execute("UPDATE dados SET versao = ?, conteudo = ?, publicado_em = ? WHERE id = 1",
+                                (atual + 1, sqlite3.Binary(conteudo), time.time()))
+                return atual + 1
+            finally:
+                conexao.execute("COMMIT")
+
+    def invalidar(self):
+        """Descarta o conteúdo e avança a versão, para que todas as réplicas recarreguem."""
+        with closing(self._conectar()) as conexao:
+            conexao.execute("UPDATE dados SET versao = versao + 1, conteudo = NULL, publicado_em = ? WHERE id = 1",
+                            (time.time(),))
+
+    def reivindicar(self, nome, intervalo):
+        """Reserva a tarefa periódica `nome` para esta réplica.
+
+        Retorna True se ninguém a executou nos últimos `intervalo` segundos;
+        as demais réplicas recebem False até o intervalo vencer de novo.
+        """
+        agora = time.time()
+        with closing(self._conectar()) as conexao:
+            cursor = conexao.execute(
+                "INSERT INTO tarefas (nome, executada_em) VALUES (?, ?) "
+                "ON CONFLICT (nome) DO UPDATE SET executada_em = excluded.executada_em "
+                "WHERE tarefas.executada_em <= ?",
+                (nome, agora, agora - intervalo),
+            )
+            return cursor.rowcount > 0
+
+    def reivindicar_recarga(self, versao, prazo):
+        """Reserva para esta réplica a recarga da invalidação `versao`.
+
+        Cada invalidação tem a sua reserva: uma nova pode ser recarregada na
+        hora, mesmo com a de uma anterior em andamento. Se quem reservou não
+        publicar em `prazo` segundos, outra réplica pode reservar.
+        """
+        nome = f"recarga:{versao}"
+        with closing(self._conectar()) as conexao:
+            # Reservas de invalidações anteriores não valem mais
+            conexao.execute("DELETE FROM tarefas WHERE nome LIKE 'recarga:%' "
+                            "AND CAST(substr(nome, 9) AS INTEGER) < ?", (versao,))
+        return self.reivindicar(nome, prazo)
+
+    def liberar(self, nome):
+        """Desfaz a reserva de `nome`: a próxima réplica que pedir a tarefa a recebe na hora."""
+        with closing(self._conectar()) as conexao:
+            conexao.execute("DELETE FROM tarefas WHERE nome = ?", (nome,))
@@ -0,0 +1,161 @@
+import os
+import tempfile
+
+import streamlit as st
+from esquema import COLUNAS_CONTROLE, get_column_order
+from exportacao import FORMATOS_EXPORTACAO, exportar
+from sob_demanda import ModuloSobDemanda
+from utils import reexecutar
+
+pd = ModuloSobDemanda("pandas")
+
+# Quantidade máxima de ideias listadas no seletor de uma vez
+LIMITE_OPCOES_SELETOR = 100
+# Quantidade máxima de ideias na grade de edição em lote
+LIMITE_LINHAS_EDICAO = 500
+
+
+def _chave_ordenacao(coluna):
+    """Coluna pronta para argsort (colunas de texto misturam str e números)."""
+    if pd.api.types.is_numeric_dtype(coluna) or pd.api.types.is_datetime64_any_dtype(coluna):
+        return coluna.to_numpy()
+    return coluna.astype(str).str.lower().to_numpy()
+
+
+def tabela_paginada(df, chave, tamanhos_pagina=(25, 50, 100, 200), coluna_padrao=None):
+    """Mostra o DataFrame paginado: só a fatia da página atual vai para o navegador."""
+    colunas = list(df.columns)
+    c1, c2, c3, c4 = st.columns([2, 2, 1, 2])
+    with c1:
+        coluna_ordem = st.selectbox("Ordenar por", colunas,
+                                    index=colunas.index(coluna_padrao) if coluna_padrao in colunas else 0,
+                                    key=f"{chave}_ordem_{coluna_padrao or ''}")
+    with c2:
+        decrescente = st.toggle("Ordem decrescente", value=True, key=f"{chave}_desc")
+    with c3:
+        tamanho = st.selectbox("Por página", tamanhos_pagina, index=1, key=f"{chave}_tamanho")
+    total_paginas = max(1, -(-len(df) // tamanho))
+    with c4:
+        pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1,
+                                 step=1, key=f"{chave}_pagina")
+
+    inicio = (int(pagina) - 1) * tamanho
+    if coluna_ordem is None or df.empty:
+        fatia = df.iloc[inicio:inicio + tamanho]
+    else:
+        ordem = _chave_ordenacao(df[coluna_ordem]).argsort(kind="stable")
+        if decrescente:
+            ordem = ordem[::-1]
+        fatia = df.iloc[ordem[inicio:inicio + tamanho]]
+
+    st.dataframe(fatia.reset_index(drop=True), use_container_width=True)
+    st.caption(f"Mostrando {len(fatia)} de {len(df)} ideias.")
+
+
+def rotulos_ideias(df):
+    """Rótulos "ID - Nome da ideia" montados de forma vetorizada."""
+    ids = pd.to_numeric(df['ID'], errors='coerce').astype('Int64').astype(str)
+    return ids + " - " + df['Nome da ideia'].astype(str)
+
+
+def seletor_ideia(df, rotulo, chave):
+    """Seletor com busca: filtra por ID ou nome e lista no máximo LIMITE_OPCOES_SELETOR ideias.
+
+    Retorna o ID escolhido (int) ou None.
+    """
+    busca = st.text_input(f"🔎 {rotulo} (busque por ID ou nome)", key=f"{chave}_busca")
+    rotulos = rotulos_ideias(df)
+    if busca:
+        rotulos = rotulos[rotulos.str.contains(busca.strip(), case=False, regex=False)]
+    if len(rotulos) > LIMITE_OPCOES_SELETOR:
+        st.caption(f"{len(rotulos)} ideias encontradas; mostrando as {LIMITE_OPCOES_SELETOR} primeiras. "
+                   "Refine a busca para ver as demais.")
+    opcoes = rotulos.iloc[:LIMITE_OPCOES_SELETOR].tolist()
+    if not opcoes:
+        st.info("Nenhuma ideia encontrada para essa busca.")
+        return None
+    escolhida = st.selectbox(rotulo, options=opcoes, key=chave)
+    try:
+        return int(escolhida.split(" - ")[0])
+    except ValueError:
+        return None
+
+
+def exportacao_ideias(df, chave):
+    """Exporta o DataFrame filtrado (CSV, Excel ou Parquet) gravando o arquivo em blocos."""
+    with st.expander("⬇️ Exportar ideias filtradas"):
+        formato = st.selectbox("Formato", list(FORMATOS_EXPORTACAO), key=f"{chave}_formato")
+        extensao, mime = FORMATOS_EXPORTACAO[formato]
+        if st.button(f"Gerar arquivo ({len(df)} ideias)", key=f"{chave}_gerar"):
+            anterior = st.session_state.pop(f"{chave}_arquivo", None)
+            if anterior and os.path.exists(anterior[1]):
+                os.remove(anterior[1])
+            with tempfile.NamedTemporaryFile(suffix=f".{extensao}", delete=False) as temporario:
+                caminho = temporario.name
+            try:
+                exportar(df, formato, caminho)
+                st.session_state[f"{chave}_arquivo"] = (formato, caminho)
+            except ImportError as e:
+                os.remove(caminho)
+                st.error(str(e))
+        gerado = st.session_state.get(f"{chave}_arquivo")
+        if gerado and gerado[0] == formato and os.path.exists(gerado[1]):
+            with open(gerado[1], "rb") as arquivo:
+                st.download_button(f"📥 Baixar {formato}", data=arquivo, file_name=f"ideias.{extensao}", mime=mime,
+                                   key=f"{chave}_baixar")
+
+
+def aviso_conflito(conflito, meus_dados, originais, chave):
+    """Mostra a edição feita por outra pessoa e pergunta o que fazer.
+
+    Retorna "sobrescrever", "descartar" ou None (nenhum botão clicado).
+    """
+    st.warning(f"⚠️ {conflito}")
+    linhas = [{"Campo": coluna, "Quando você abriu": originais.get(coluna, ""),
+               "Agora na planilha": conflito.atual.get(coluna, ""), "Sua versão": meus_dados.get(coluna, "")}
+              for coluna in conflito.alteradas]
+    if linhas:
+        st.dataframe(pd.DataFrame(linhas), use_container_width=True, hide_index=True)
+    c1, c2 = st.columns(2)
+    if c1.button("Gravar as minhas alterações mesmo assim", key=f"{chave}_sobrescrever"):
+        return "sobrescrever"
+    if c2.button("Descartar as minhas e recarregar", key=f"{chave}_descartar"):
+        return "descartar"
+    return None
+
+
+def edicao_em_lote(df, chave, salvar):
+    """Grade editável sobre o DataFrame; um botão grava todas as células alteradas de uma vez.
+
+    `salvar(originais, editados)` recebe o DataFrame mostrado e o editado e
+    devolve o resumo de salvar_edicoes_em_lote() (None sem armazenamento).
+    """
+    resumo = st.session_state.pop(f"{chave}_resumo", None)
+    if resumo is not None:
+        if resumo["linhas"]:
+            st.success(f"✅ {resumo['celulas']} células atualizadas em {resumo['linhas']} ideias.")
+        if resumo["conflitos"]:
+            st.warning("⚠️ Ideias alteradas por outra pessoa depois de carregadas (não gravadas; confira e "
+                       f"edite de novo): {', '.join(map(str, resumo['conflitos']))}")
+        if resumo["nao_encontradas"]:
+            st.warning(f"Ideias não encontradas na planilha: {', '.join(map(str, resumo['nao_encontradas']))}")
+        if not (resumo["linhas"] or resumo["conflitos"] or resumo["nao_encontradas"]):
+            st.info("Nenhuma alteração para salvar.")
+
+    if len(df) > LIMITE_LINHAS_EDICAO:
+        st.caption(f"{len(df)} ideias filtradas; a grade mostra as {LIMITE_LINHAS_EDICAO} primeiras. "
+                   "Refine os filtros para editar as demais.")
+    originais = df.iloc[:LIMITE_LINHAS_EDICAO]
+    # Trocar a chave depois de salvar descarta as edições já gravadas da grade
+    rodada = st.session_state.get(f"{chave}_rodada", 0)
+    bloqueadas = [c for c in originais.columns if c in COLUNAS_CONTROLE or c not in get_column_order()]
+    editados = st.data_editor(originais, key=f"{chave}_{rodada}", disabled=bloqueadas, hide_index=True,
+                              use_container_width=True)
+    if st.button("💾 Salvar alterações da grade", key=f"{chave}_salvar"):
+        resumo = salvar(originais, editados)
+        if resumo is None:
+            st.error("Sem conexão com o armazenamento.")
+            return
+        st.session_state[f"{chave}_resumo"] = resumo
+        st.session_state[f"{chave}_rodada"] = rodada + 1
+        reexecutar()
@@ -0,0 +1,48 @@
+import threading
+import time
+
+
+class ErroConexao(Exception):
+    """Não foi possível abrir a conexão (credenciais, rede ou planilha inacessível)."""
+
+
+class ConexaoPreguicosa:
+    """Objeto caro de criar (ex.: a aba do gspread) criado só no primeiro uso real.
+
+    Repassa os atributos ao objeto criado, então pode ser entregue no lugar
+    dele (ex.: a BackendPlanilha) sem que a página espere pela rede ao
+    importar. É criado uma única vez mesmo com várias sessões ao mesmo tempo.
+    Se a criação falha, as chamadas seguintes falham na hora com ErroConexao
+    durante `espera` segundos, em vez de cada rerun esperar pelo mesmo timeout.
+    """
+
+    def __init__(self, fabrica, espera=30.0):
+        self._fabrica = fabrica
+        self._espera = espera
+        self._alvo = None
+        self._erro = None
+        self._falhou_em = 0.0
+        self._lock = threading.Lock()
+
+    def obter(self):
+        """O objeto criado, criando-o se preciso; ErroConexao se não foi possível."""
+        alvo = self._alvo
+        if alvo is not None:
+            return alvo
+        with self._lock:
+            if self._alvo is None:
+                if self._erro is not None and time.monotonic() - self._falhou_em < self._espera:
+                    raise ErroConexao(str(self._erro)) from self._erro
+                try:
+                    self._alvo = self._fabrica()
+                except Exception as e:
+                    self._erro, self._falhou_em = e, time.monotonic()
+                    raise ErroConexao(str(e)) from e
+                self._erro = None
+            return self._alvo
+
+    def conectada(self):
+        return self._alvo is not None
+
+    def __getattr__(self, nome):
+        return getattr(self.obter(), nome)
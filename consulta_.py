@@ -1,6 +1,28 @@
 import streamlit as st
-import pandas as pd
-from utils import carregar_dados, editar_ideia, excluir_ideia, get_column_order
+from componentes import edicao_em_lote, exportacao_ideias, seletor_ideia, tabela_paginada
+from esquema import registro_como_texto
+from sob_demanda import ModuloSobDemanda
+from utils import (
+    carregar_dados,
+    editar_ideia,
+    excluir_ideia,
+    get_column_order,
+    limpar_cache,
+    compactar_excluidas,
+    arquivar_ideias,
+    ARQUIVAR_APOS_DIAS,
+    obter_indice_filtros,
+    buscar_ideias,
+    localizar_ideia,
+    medir_pagina,
+    reexecutar,
+    salvar_edicoes_em_lote
+)
+
+pd = ModuloSobDemanda("pandas")
+
+# Tempo de cada execução da página (métricas)
+cronometro = medir_pagina("consulta")
 
 hide_streamlit_style = """
     <style>
@@ -18,54 +40,76 @@ st.set_page_config(layout="wide", page_title="Painel de Ideias")
 st.title("💡 Painel de Consulta de Ideias")
 st.write("Use os filtros na barra lateral para encontrar ideias específicas.")
 
+# Busca textual (ignora acentos e maiúsculas) no nome, problema e solução
+consulta = st.text_input("🔎 Buscar no nome, no problema ou na solução", placeholder="ex.: area acida vazamento")
+
 # Carrega todos os dados uma vez
 df = carregar_dados()
 
 # sidebar
 st.sidebar.header("🔍 Filtros do Painel")
 
-# Filtro por Status
-if 'Status' in df.columns:
-    status_disponiveis = ["Todos"] + df["Status"].unique().tolist()
-    status_selecionado = st.sidebar.selectbox("Filtrar por Status", status_disponiveis)
-else:
-    status_selecionado = "Todos"
+# O arquivo (ideias encerradas há tempo) só é lido quando pedido, e fica em cache depois
+incluir_arquivo = st.sidebar.checkbox("Incluir ideias arquivadas", value=False,
+                                      help=f"Concluídas ou rejeitadas há mais de {ARQUIVAR_APOS_DIAS} dias "
+                                           "(somente consulta).")
+
+# Opções e posições de cada filtro vêm prontas do índice (refeito só quando os dados mudam)
+indice_filtros = obter_indice_filtros(incluir_arquivo)
+
+# Filtro por Status (vazio = todos)
+status_selecionados = st.sidebar.multiselect("Filtrar por Status", indice_filtros.opcoes("Status"),
+                                             placeholder="Todos")
 
 # Filtro por Área
-if 'Área' in df.columns:
-    areas_disponiveis = ["Todos"] + df["Área"].unique().tolist()
-    area_selecionada = st.sidebar.selectbox("Filtrar por Área da Ideia", areas_disponiveis)
-else:
-    area_selecionada = "Todos"
+areas_selecionadas = st.sidebar.multiselect("Filtrar por Área da Ideia", indice_filtros.opcoes("Área"),
+                                            placeholder="Todas")
 
 # Filtro por matrícula
-if "Matrícula" in df.columns:
-    matriculas_disponiveis = ["Todos"] + df["Matrícula"].unique().tolist()
-    matriculas_selecionadas = st.sidebar.selectbox("Filtrar por matrícula", matriculas_disponiveis)
-else:
-    matriculas_disponiveis = "Todos"
+matriculas_selecionadas = st.sidebar.multiselect("Filtrar por matrícula", indice_filtros.opcoes("Matrícula"),
+                                                 placeholder="Todas")
 
 # Botão para limpar o cache na barra lateral
 if st.sidebar.button("🔄 Limpar Cache e Recarregar Dados"):
-    st.cache_data.clear()
-    st.rerun()
-
-# Aplica os filtros ao DataFrame
-df_filtrado = df.copy()
-if status_selecionado != "Todos" and 'Status' in df_filtrado.columns:
-    df_filtrado = df_filtrado[df_filtrado["Status"] == status_selecionado]
-
-if area_selecionada != "Todos" and 'Área' in df_filtrado.columns:
-    df_filtrado = df_filtrado[df_filtrado["Área"] == area_selecionada]
-
-if matriculas_selecionadas != "Todos" and 'Matrícula' in df_filtrado.columns:
-    df_filtrado = df_filtrado[df_filtrado["Matrícula"] == matriculas_selecionadas]
+    limpar_cache()
+    reexecutar()
+
+# Remove de vez as ideias excluídas (lápides) numa única chamada à planilha
+if st.sidebar.button("🧹 Compactar Ideias Excluídas"):
+    removidas = compactar_excluidas()
+    st.sidebar.success(f"{removidas} ideia(s) excluída(s) removida(s) da planilha.")
+
+# Move as ideias encerradas há tempo para o arquivo, deixando a partição ativa pequena
+if st.sidebar.button("🗄️ Arquivar Ideias Encerradas"):
+    with st.spinner("Arquivando ideias..."):
+        arquivadas = arquivar_ideias()
+    st.sidebar.success(f"{arquivadas} ideia(s) movida(s) para o arquivo.")
+
+# Aplica os filtros ao DataFrame (interseção das posições de cada filtro)
+df_filtrado = indice_filtros.filtrar({
+    "Status": status_selecionados,
+    "Área": areas_selecionadas,
+    "Matrícula": matriculas_selecionadas,
+})
+
+# Restringe ao resultado da busca, com a pontuação de relevância como coluna
+if consulta:
+    relevancia = pd.Series(dict(buscar_ideias(consulta, incluir_arquivo=incluir_arquivo)), dtype=float)
+    df_filtrado = df_filtrado[df_filtrado['ID'].isin(relevancia.index)]
+    df_filtrado = df_filtrado.assign(Relevância=df_filtrado['ID'].map(relevancia).round(2))
 
 # --- PAINEL DE IDEIAS REGISTRADAS ---
 st.header("📊 Ideias Registradas")
 
 if not df_filtrado.empty:
-    st.dataframe(df_filtrado.reset_index(drop=True), use_container_width=True)
+    # Só a página visível vai para o navegador
+    tabela_paginada(df_filtrado, chave="painel", coluna_padrao="Relevância" if consulta else None)
+    exportacao_ideias(df_filtrado, chave="exportar")
+    # Ideias arquivadas (índice negativo) são somente consulta
+    df_editavel = df_filtrado[df_filtrado.index >= 0] if incluir_arquivo else df_filtrado
+    # Revisões semanais mudam dezenas de ideias: todas as células vão numa única gravação
+    with st.expander("✏️ Editar várias ideias de uma vez"):
+        edicao_em_lote(df_editavel, chave="grade_edicao", salvar=salvar_edicoes_em_lote)
     st.markdown("---")
 
     # --- GERENCIAMENTO DE IDEIAS ---
@@ -74,18 +118,16 @@ if not df_filtrado.empty:
 
     with col_edit:
         st.subheader("✏️ Alterar Ideia")
-        lista_ideias_filtrada = [f"{row['ID']} - {row['Nome da ideia']}" for index, row in df_filtrado.iterrows()]
+        # Seletor com busca: as opções são montadas de forma vetorizada e limitadas
+        id_selecionado = seletor_ideia(df_editavel, "Selecione a ideia para editar", chave="editor_idx")
 
-        if lista_ideias_filtrada:
-            ideia_selecionada_str = st.selectbox("Selecione a ideia para editar", options=lista_ideias_filtrada,
-                                                 key="editor_idx")
-            id_selecionado = int(ideia_selecionada_str.split(" - ")[0])
+        if id_selecionado is not None:
 
             with st.expander("Clique para carregar e editar os dados"):
-                ideia_para_editar_linha = df[df['ID'] == id_selecionado]
-                if not ideia_para_editar_linha.empty:
-                    indice_real = ideia_para_editar_linha.index[0]
-                    ideia_para_editar = ideia_para_editar_linha.iloc[0]
+                indice_real, ideia_para_editar = localizar_ideia(id_selecionado)
+                if ideia_para_editar is not None:
+                    # O formulário trabalha com o texto da planilha (datas dd/mm/aaaa, valores em R$)
+                    ideia_para_editar = registro_como_texto(ideia_para_editar)
 
                     # Bloco de exibição de imagem foi removido daqui
 
@@ -122,18 +164,14 @@ if not df_filtrado.empty:
 
     with col_delete:
         st.subheader("🗑️ Excluir Ideia")
-        if 'lista_ideias_filtrada' in locals() and lista_ideias_filtrada:
-            ideia_excluir_str = st.selectbox("Selecione a ideia para excluir", options=lista_ideias_filtrada,
-                                             key="excluir_idx")
+        id_excluir = seletor_ideia(df_editavel, "Selecione a ideia para excluir", chave="excluir_idx")
+        if id_excluir is not None:
             if st.button("❌ Excluir Ideia Selecionada"):
-                id_excluir = int(ideia_excluir_str.split(" - ")[0])
-                linha_excluir = df[df['ID'] == id_excluir]
-                if not linha_excluir.empty:
-                    indice_real_excluir = linha_excluir.index[0]
-                    excluir_ideia(indice_real_excluir)
-                    st.success(f"Ideia '{ideia_excluir_str.split(' - ')[1]}' excluída com sucesso!")
-                    st.rerun()
+                indice_real_excluir, ideia_excluir = localizar_ideia(id_excluir)
+                if indice_real_excluir is not None and excluir_ideia(indice_real_excluir, id_excluir):
+                    st.success(f"Ideia '{ideia_excluir['Nome da ideia']}' excluída com sucesso!")
+                    reexecutar()
 else:
     st.info("Nenhuma ideia encontrada com os filtros selecionados ou nenhuma ideia foi cadastrada ainda.")
 
-
+cronometro.encerrar()
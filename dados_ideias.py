@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import time
+import tomllib
+
+from armazenamento import BackendPlanilha, criar_backend, criar_backend_arquivo
+from conexao import ConexaoPreguicosa, ErroConexao
+from esquema import aplicar_tipos, concatenar, get_column_order
+from filtros import IndiceFiltros
+from snapshot import carregar_snapshot, salvar_snapshot
+from sob_demanda import ModuloSobDemanda
+
+pd = ModuloSobDemanda("pandas")
+
+logger = logging.getLogger(__name__)
+
+URL_PLANILHA = "https://docs.google.com/spreadsheets/d/1CEu8e_LgTq4NQxm8SWpSsLXYWcGjwJd4YseNUsXm0RQ/edit?usp=sharing"
+# Sheets + metadados do Drive (data de modificação usada na sincronização incremental)
+ESCOPOS = ["https://www.googleapis.com/auth/spreadsheets",
+           "https://www.googleapis.com/auth/drive.metadata.readonly"]
+
+# Status gravado como lápide: a linha fica na planilha até a compactação
+STATUS_EXCLUIDA = "Excluída"
+
+# Arquivo no formato do secrets.toml do app (seções [armazenamento], [gcp_service_account] ...)
+CAMINHO_CONFIGURACAO = os.path.join(".streamlit", "secrets.toml")
+# Caminho do JSON da conta de serviço, ou o próprio JSON
+VARIAVEL_CREDENCIAIS = "CONSO_CREDENCIAIS"
+
+# Dimensões dos relatórios -> coluna do DataFrame ("Mês" é derivada da data da ideia)
+DIMENSOES_RELATORIO = {"status": "Status", "area": "Área", "matricula": "Matrícula", "mes": "Mês"}
+
+
+def ler_configuracao(caminho=CAMINHO_CONFIGURACAO):
+    """Lê um arquivo no formato do secrets.toml ({} se ele não existe)."""
+    if not caminho or not os.path.exists(caminho):
+        return {}
+    with open(caminho, "rb") as arquivo:
+        return tomllib.load(arquivo)
+
+
+def ler_credenciais(configuracao=None, caminho=None):
+    """Dados da conta de serviço (None se não houver).
+
+    Procura, nesta ordem: o arquivo `caminho`, a variável CONSO_CREDENCIAIS
+    (caminho ou JSON), GOOGLE_APPLICATION_CREDENTIALS e a seção
+    [gcp_service_account] da configuração.
+    """
+    valor = caminho or os.environ.get(VARIAVEL_CREDENCIAIS) or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if valor:
+        if valor.lstrip().startswith("{"):
+            return json.loads(valor)
+        with open(valor, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    secao = (configuracao or {}).get("gcp_service_account")
+    return dict(secao) if secao else None
+
+
+def abrir_aba_ideias(credenciais, envolver_cliente=None):
+    """Autentica com a conta de serviço e abre a aba "Ideias".
+
+    `envolver_cliente` recebe o cliente do gspread e devolve o objeto a usar
+    no lugar dele (o app passa as métricas e o limitador por aqui).
+    """
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    cliente = gspread.authorize(Credentials.from_service_account_info(credenciais, scopes=ESCOPOS))
+    if envolver_cliente is not None:
+        cliente = envolver_cliente(cliente)
+    return cliente.open_by_url(URL_PLANILHA).worksheet("Ideias")
+
+
+def dataframe_de_registros(registros):
+    """DataFrame tipado (ver esquema.py) com as ideias lidas de um backend."""
+    df = pd.DataFrame(registros)
+    if df.empty:
+        df = pd.DataFrame(columns=get_column_order())
+    for coluna in get_column_order():
+        # Planilhas antigas ainda sem a coluna de versão
+        if coluna not in df.columns:
+            df[coluna] = ""
+    return aplicar_tipos(df)
+
+
+def _mes(df):
+    return df["Data ideia"].dt.strftime("%Y-%m")
+
+
+def filtrar(df, status=None, areas=None, matriculas=None, de=None, ate=None):
+    """Ideias que atendem a todos os filtros; meses `de`/`ate` no formato AAAA-MM (inclusive)."""
+    indice = IndiceFiltros(df)
+    selecoes = {}
+    for coluna, escolhidos in (("Status", status), ("Área", areas), ("Matrícula", matriculas)):
+        if escolhidos:
+            # Valores da linha de comando chegam como texto; a coluna pode ser numérica
+            textos = {str(valor) for valor in escolhidos}
+            # (sem nenhum valor existente, os textos ficam na seleção e nada é encontrado)
+            selecoes[coluna] = [valor for valor in indice.opcoes(coluna) if str(valor) in textos] or sorted(textos)
+    df = indice.filtrar(selecoes)
+    if de or ate:
+        meses = _mes(df)
+        manter = meses.notna()
+        if de:
+            manter &= meses >= de
+        if ate:
+            manter &= meses <= ate
+        df = df[manter]
+    return df
+
+
+def agregar(df, por):
+    """Ideias, ganho, investimento e ROI (%) por combinação das dimensões `por` (chaves de DIMENSOES_RELATORIO)."""
+    colunas = [DIMENSOES_RELATORIO[dimensao] for dimensao in por]
+    base = pd.DataFrame({
+        "Ganho financeiro": pd.to_numeric(df["Ganho financeiro"], errors="coerce").fillna(0.0),
+        "Investimento": pd.to_numeric(df["Investimento"], errors="coerce").fillna(0.0),
+    }, index=df.index)
+    for coluna in colunas:
+        base[coluna] = _mes(df) if coluna == "Mês" else df[coluna].astype(str).replace("", "(vazio)")
+    if not colunas:
+        base["Total"] = "Total"
+        colunas = ["Total"]
+    tabela = base.groupby(colunas, dropna=False).agg(**{
+        "Ideias": ("Ganho financeiro", "size"),
+        "Ganho financeiro": ("Ganho financeiro", "sum"),
+        "Investimento": ("Investimento", "sum"),
+    })
+    investido = tabela["Investimento"].where(tabela["Investimento"] > 0)
+    tabela["ROI (%)"] = (tabela["Ganho financeiro"] - tabela["Investimento"]) / investido * 100
+    return tabela.sort_index().reset_index()
+
+
+class FonteIdeias:
+    """Ideias lidas fora do Streamlit (relatórios, tarefas agendadas).
+
+    Usa os mesmos backends do app, mas com conexão e cache em disco próprios:
+    enquanto o cache tem menos de `idade_maxima` segundos, nenhuma chamada à
+    API é feita; depois disso, só a data de modificação é consultada e a
+    leitura completa acontece apenas se os dados mudaram. `origem` diz de
+    onde veio cada partição na última leitura.
+    """
+
+    def __init__(self, configuracao=None, credenciais=None, caminho_cache="relatorio_cache.arrow",
+                 idade_maxima=3600.0):
+        configuracao = configuracao or {}
+        self.config = dict(configuracao.get("armazenamento", {}))
+        self.caminho_cache = caminho_cache
+        self.idade_maxima = idade_maxima
+        self.origem = {}
+        usa_planilha = (str(self.config.get("backend", "sheets")).lower() == "sheets"
+                        or bool(self.config.get("espelhar_planilha")))
+        if credenciais is None and usa_planilha:
+            credenciais = ler_credenciais(configuracao)
+        self._credenciais = credenciais
+        self.worksheet = ConexaoPreguicosa(self._abrir) if usa_planilha else None
+        self.backend = criar_backend(self.config, get_column_order(), self.worksheet)
+        self._arquivo = None
+
+    def _abrir(self):
+        if not self._credenciais:
+            raise ValueError(f"credenciais não encontradas (use --credenciais ou {VARIAVEL_CREDENCIAIS})")
+        return abrir_aba_ideias(self._credenciais)
+
+    def _caminho(self, particao):
+        if not self.caminho_cache or particao == "ideias":
+            return self.caminho_cache
+        raiz, extensao = os.path.splitext(self.caminho_cache)
+        return f"{raiz}_{particao}{extensao}"
+
+    def _salvar(self, df, versao, caminho):
+        try:
+            salvar_snapshot(df, versao, caminho, get_column_order())
+        except (ImportError, OSError) as e:
+            logger.warning("Não foi possível gravar o cache em %s: %s", caminho, e)
+
+    def _backend_arquivo(self):
+        if self._arquivo is None:
+            self._arquivo = criar_backend_arquivo(self.config, get_column_order(), self.worksheet)
+        return self._arquivo
+
+    def _ler(self, particao, obter_backend):
+        """DataFrame da partição (None se ela não existe), do cache em disco enquanto ele valer."""
+        caminho = self._caminho(particao)
+        salvo = carregar_snapshot(caminho, get_column_order()) if caminho else None
+        if salvo is not None and time.time() - (salvo[2] or 0) <= self.idade_maxima:
+            self.origem[particao] = "cache"
+            return salvo[0]
+        try:
+            backend = obter_backend()
+            if backend is None:
+                return None
+            if isinstance(backend, BackendPlanilha):
+                # Conecta antes: versao() engole a falha e a leitura completa seria tentada à toa
+                self.worksheet.obter()
+            versao = backend.versao()
+            if salvo is not None and versao is not None and versao == salvo[1]:
+                self.origem[particao] = "cache validado"
+                df = salvo[0]
+            else:
+                self.origem[particao] = "backend"
+                df = dataframe_de_registros(backend.ler_registros())
+        except ErroConexao as e:
+            if salvo is None:
+                raise
+            # Melhor um relatório com dados de algumas horas do que nenhum
+            logger.warning("Sem conexão (%s); usando o cache gravado em %s.", e,
+                           time.strftime("%d/%m/%Y %H:%M", time.localtime(salvo[2] or 0)))
+            self.origem[particao] = "cache antigo"
+            return salvo[0]
+        if caminho:
+            # Regravar também renova a idade do cache validado
+            self._salvar(df, versao, caminho)
+        return df
+
+    def ideias(self, incluir_arquivo=False):
+        """DataFrame das ideias (sem as excluídas); com `incluir_arquivo`, junta as arquivadas."""
+        df = self._ler("ideias", lambda: self.backend)
+        if df is None:
+            raise ErroConexao("backend de armazenamento indisponível")
+        df = df[df["Status"] != STATUS_EXCLUIDA]
+        arquivadas = self._ler("arquivo", self._backend_arquivo) if incluir_arquivo else None
+        if arquivadas is None:
+            return df
+        # Arquivamento interrompido entre as duas escritas: vale a cópia da partição ativa
+        arquivadas = arquivadas[~arquivadas["ID"].isin(df["ID"].dropna())].drop_duplicates("ID", keep="last")
+        return concatenar(df, arquivadas)
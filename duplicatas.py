@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import os
+import pickle
+import zlib
+
+from busca import tokenizar
+from sob_demanda import ModuloSobDemanda
+
+np = ModuloSobDemanda("numpy")
+pd = ModuloSobDemanda("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Campos comparados para detectar ideias repetidas
+CAMPOS_DUPLICATAS = ["Descrição de problema", "Descrição da solução"]
+
+_PRIMO = (1 << 31) - 1
+
+
+def _shingles(texto):
+    """Termos e pares de termos consecutivos do texto normalizado."""
+    termos = tokenizar(texto)
+    return set(termos) | {f"{a} {b}" for a, b in zip(termos, termos[1:])}
+
+
+def texto_da_ideia(registro):
+    """Texto comparado na detecção: problema + solução."""
+    return " ".join(str(registro.get(c, "")) for c in CAMPOS_DUPLICATAS if not pd.isna(registro.get(c, "")))
+
+
+class DetectorDuplicatas:
+    """Índice MinHash + LSH para achar ideias com texto parecido sem comparar par a par.
+
+    Cada ideia vira uma assinatura de `num_permutacoes` valores MinHash,
+    dividida em `bandas`; ideias que coincidem em alguma banda caem no mesmo
+    balde e só essas candidatas têm a similaridade estimada.
+    """
+
+    def __init__(self, num_permutacoes=64, bandas=16, semente=42):
+        self.num_permutacoes = num_permutacoes
+        self.bandas = bandas
+        self.linhas_por_banda = num_permutacoes // bandas
+        gerador = np.random.default_rng(semente)
+        self._a = gerador.integers(1, _PRIMO, num_permutacoes, dtype=np.uint64)
+        self._b = gerador.integers(0, _PRIMO, num_permutacoes, dtype=np.uint64)
+        self.assinaturas = {}
+        self.resumos = {}
+        self.nomes = {}
+        self.baldes = [{} for _ in range(bandas)]
+
+    def assinatura(self, texto):
+        """Assinatura MinHash do texto (None se não há termos)."""
+        shingles = _shingles(texto)
+        if not shingles:
+            return None
+        valores = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+        # h(x) = (a*x + b) mod p para cada permutação, vetorizado
+        hashes = (np.outer(self._a, valores) + self._b[:, None]) % _PRIMO
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def _chaves_bandas(self, assinatura):
+        r = self.linhas_por_banda
+        return [assinatura[i * r:(i + 1) * r].tobytes() for i in range(self.bandas)]
+
+    def adicionar(self, id_ideia, texto, nome=""):
+        """Indexa (ou reindexa) uma ideia."""
+        resumo = hashlib.blake2b(texto.encode("utf-8"), digest_size=8).digest()
+        if self.resumos.get(id_ideia) == resumo:
+            self.nomes[id_ideia] = nome
+            return
+        self.remover(id_ideia)
+        assinatura = self.assinatura(texto)
+        self.resumos[id_ideia] = resumo
+        self.nomes[id_ideia] = nome
+        if assinatura is None:
+            return
+        self.assinaturas[id_ideia] = assinatura
+        for balde, chave in zip(self.baldes, self._chaves_bandas(assinatura)):
+            balde.setdefault(chave, set()).add(id_ideia)
+
+    def remover(self, id_ideia):
+        assinatura = self.assinaturas.pop(id_ideia, None)
+        self.resumos.pop(id_ideia, None)
+        self.nomes.pop(id_ideia, None)
+        if assinatura is None:
+            return
+        for balde, chave in zip(self.baldes, self._chaves_bandas(assinatura)):
+            ids = balde.get(chave)
+            if ids is not None:
+                ids.discard(id_ideia)
+                if not ids:
+                    del balde[chave]
+
+    def sincronizar(self, df):
+        """Acompanha o DataFrame: indexa ideias novas ou alteradas e remove as que sumiram.
+
+        Ideias cujo texto não mudou (mesmo resumo) não são recalculadas.
+        Retorna True se algo mudou.
+        """
+        atuais = set()
+        mudou = False
+        colunas = ['ID', 'Nome da ideia'] + [c for c in CAMPOS_DUPLICATAS if c in df.columns]
+        for registro in df[colunas].to_dict("records"):
+            if pd.isna(registro['ID']):
+                continue
+            id_ideia = int(registro['ID'])
+            atuais.add(id_ideia)
+            antes = self.resumos.get(id_ideia)
+            self.adicionar(id_ideia, texto_da_ideia(registro), registro.get('Nome da ideia', ""))
+            mudou = mudou or antes != self.resumos.get(id_ideia)
+        for id_ideia in set(self.resumos) - atuais:
+            self.remover(id_ideia)
+            mudou = True
+        return mudou
+
+    def parecidas(self, problema, solucao, limiar=0.5, limite=5):
+        """Ideias parecidas com o texto informado: [(ID, nome, similaridade estimada)]."""
+        assinatura = self.assinatura(f"{problema} {solucao}")
+        if assinatura is None:
+            return []
+        candidatas = set()
+        for balde, chave in zip(self.baldes, self._chaves_bandas(assinatura)):
+            candidatas |= balde.get(chave, set())
+        resultado = []
+        for id_ideia in candidatas:
+            similaridade = float(np.mean(self.assinaturas[id_ideia] == assinatura))
+            if similaridade >= limiar:
+                resultado.append((id_ideia, self.nomes.get(id_ideia, ""), similaridade))
+        resultado.sort(key=lambda item: item[2], reverse=True)
+        return resultado[:limite]
+
+    def salvar(self, caminho):
+        """Grava o índice em disco (escrita atômica)."""
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "wb") as arquivo:
+            pickle.dump(self, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Lê o índice salvo; devolve um índice vazio se não houver arquivo válido."""
+        try:
+            with open(caminho, "rb") as arquivo:
+                detector = pickle.load(arquivo)
+            if isinstance(detector, cls):
+                return detector
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Índice de duplicatas em %s ignorado: %s", caminho, e)
+        return cls()
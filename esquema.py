@@ -0,0 +1,153 @@
+import re
+from datetime import date, datetime
+
+from sob_demanda import ModuloSobDemanda
+
+pd = ModuloSobDemanda("pandas")
+
+# Tipos de coluna do esquema
+TEXTO = "texto"
+INTEIRO = "inteiro"
+DATA = "data"
+MOEDA = "moeda"
+CATEGORIA = "categoria"
+
+# As colunas da aba "Ideias", na ordem exata da planilha, com o tipo de cada uma
+ESQUEMA = {
+    "ID": INTEIRO,
+    "Nome da ideia": TEXTO,
+    "Descrição da solução": TEXTO,
+    "Descrição de problema": TEXTO,
+    "Área": CATEGORIA,
+    "Local": CATEGORIA,
+    "BL": CATEGORIA,
+    "Unidade": CATEGORIA,
+    "Dono da ideia": TEXTO,
+    "Matrícula": TEXTO,
+    "Área do operador": CATEGORIA,
+    "Turno do operador que deu a ideia": CATEGORIA,
+    "Data ideia": DATA,
+    "Metodologia": CATEGORIA,
+    "Líder": TEXTO,
+    "Equipe": TEXTO,
+    "Status": CATEGORIA,
+    "Observações": TEXTO,
+    "Data conclusão": DATA,
+    "Investimento": MOEDA,
+    "Ganho financeiro": MOEDA,
+    "Link": TEXTO,
+    "Apresentou em alguma rotina?": CATEGORIA,
+    # Coluna X: quantas vezes a linha foi editada pelo app (vazio = 0), para detectar edições simultâneas
+    "Versão": INTEIRO,
+}
+
+COLUNA_VERSAO = "Versão"
+# Colunas preenchidas só pelo app (nunca pelo formulário nem pela importação)
+COLUNAS_CONTROLE = ("ID", COLUNA_VERSAO)
+
+FORMATO_DATA = "%d/%m/%Y"
+
+_SO_MILHAR = re.compile(r"^-?\d{1,3}(\.\d{3})+$")
+
+
+def get_column_order():
+    """Retorna a lista de colunas na ordem exata da planilha."""
+    return list(ESQUEMA)
+
+
+def _texto(serie):
+    return serie.astype("string").str.strip()
+
+
+def converter_moeda(serie):
+    """Converte valores como "R$ 1.234,56", "1234.5" ou 1000 em float (vazio/inválido = NaN)."""
+    texto = _texto(serie).str.replace(r"(?i)r\$|\s", "", regex=True)
+    # Formato brasileiro: "." separa milhar e "," separa decimais
+    brasileiro = texto.str.contains(",", regex=False) | texto.str.match(_SO_MILHAR)
+    texto = texto.where(~brasileiro.fillna(False),
+                        texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+
+def converter_data(serie):
+    """Converte datas dd/mm/aaaa (e variações com dia primeiro) em datetime64."""
+    texto = _texto(serie)
+    datas = pd.to_datetime(texto, format=FORMATO_DATA, errors="coerce")
+    falhas = datas.isna() & texto.fillna("").ne("")
+    if falhas.any():
+        datas[falhas] = pd.to_datetime(texto[falhas], dayfirst=True, format="mixed", errors="coerce")
+    # Mesma resolução sempre, para que linhas novas não mudem o tipo da coluna
+    return datas.astype("datetime64[ns]")
+
+
+def aplicar_tipos(df):
+    """Converte as colunas conhecidas para os tipos do esquema (de forma vetorizada)."""
+    df = df.copy()
+    for coluna, tipo in ESQUEMA.items():
+        if coluna not in df.columns:
+            continue
+        if tipo == INTEIRO:
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce").round().astype("Int64")
+        elif tipo == MOEDA:
+            df[coluna] = converter_moeda(df[coluna])
+        elif tipo == DATA:
+            df[coluna] = converter_data(df[coluna])
+        elif tipo == CATEGORIA:
+            df[coluna] = df[coluna].fillna("").astype(str).astype("category")
+        else:
+            df[coluna] = df[coluna].fillna("").astype(str)
+    return df
+
+
+def concatenar(df, novas, ignore_index=True):
+    """pd.concat que preserva as colunas categóricas (une as categorias dos dois lados)."""
+    df, novas = df.copy(deep=False), novas.copy(deep=False)
+    for coluna, tipo in ESQUEMA.items():
+        if tipo != CATEGORIA or coluna not in df.columns or coluna not in novas.columns:
+            continue
+        if not (isinstance(df[coluna].dtype, pd.CategoricalDtype)
+                and isinstance(novas[coluna].dtype, pd.CategoricalDtype)):
+            continue
+        extras = novas[coluna].cat.categories.difference(df[coluna].cat.categories)
+        # Categorias novas entram no fim: os códigos já existentes não mudam
+        df[coluna] = df[coluna].cat.add_categories(extras)
+        novas[coluna] = novas[coluna].cat.set_categories(df[coluna].cat.categories)
+    return pd.concat([df, novas], ignore_index=ignore_index)
+
+
+def formatar_moeda(valor):
+    """1234.56 -> "R$ 1.234,56"."""
+    texto = f"{valor:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    return f"R$ {texto}"
+
+
+def serializar_valor(coluna, valor):
+    """Converte um valor (tipado ou texto) para o texto gravado na planilha."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ""
+    tipo = ESQUEMA.get(coluna, TEXTO)
+    if tipo == DATA and isinstance(valor, (datetime, date)):
+        return valor.strftime(FORMATO_DATA)
+    if tipo == MOEDA and isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return formatar_moeda(valor)
+    if tipo == INTEIRO and isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def serializar_linha(registro, colunas=None):
+    """Lista de textos, na ordem das colunas, pronta para gravar uma linha."""
+    return [serializar_valor(coluna, registro.get(coluna, "")) for coluna in (colunas or get_column_order())]
+
+
+def numero_versao(valor):
+    """Versão de uma linha como int (vazio ou inválido = 0)."""
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return 0
+
+
+def registro_como_texto(registro):
+    """Dicionário {coluna: texto} de uma linha tipada, para preencher formulários."""
+    return {coluna: serializar_valor(coluna, registro.get(coluna, "")) for coluna in get_column_order()}
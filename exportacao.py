@@ -0,0 +1,74 @@
+import math
+
+from sob_demanda import ModuloSobDemanda
+
+# Só importados quando um arquivo é de fato exportado
+openpyxl = ModuloSobDemanda("openpyxl")
+pd = ModuloSobDemanda("pandas")
+
+# Formato -> (extensão, tipo MIME)
+FORMATOS_EXPORTACAO = {
+    "CSV": ("csv", "text/csv"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# Linhas convertidas e gravadas por vez
+TAMANHO_BLOCO_EXPORTACAO = 5000
+
+
+def _blocos(df, tamanho):
+    for inicio in range(0, len(df), tamanho):
+        yield df.iloc[inicio:inicio + tamanho]
+
+
+def _celula(valor):
+    """Valor aceito pelo openpyxl (vazios viram None, tipos numpy viram Python)."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isinf(valor):
+        return None
+    return valor
+
+
+def _exportar_csv(df, destino, tamanho_bloco):
+    # utf-8-sig e ";" para o Excel em português abrir o arquivo direto
+    with open(destino, "w", encoding="utf-8-sig", newline="") as arquivo:
+        for numero, bloco in enumerate(_blocos(df, tamanho_bloco)):
+            bloco.to_csv(arquivo, sep=";", decimal=",", date_format="%d/%m/%Y", index=False, header=numero == 0)
+        if df.empty:
+            df.to_csv(arquivo, sep=";", index=False)
+
+
+def _exportar_xlsx(df, destino, tamanho_bloco):
+    # write_only: as linhas vão para o arquivo à medida que são anexadas
+    livro = openpyxl.Workbook(write_only=True)
+    aba = livro.create_sheet("Ideias")
+    aba.append([str(coluna) for coluna in df.columns])
+    for bloco in _blocos(df, tamanho_bloco):
+        for linha in bloco.itertuples(index=False, name=None):
+            aba.append([_celula(valor) for valor in linha])
+    livro.save(destino)
+
+
+def _exportar_parquet(df, destino, tamanho_bloco):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("A exportação em Parquet precisa do pacote pyarrow.") from e
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for bloco in _blocos(df, tamanho_bloco):
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+
+
+def exportar(df, formato, destino, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """Grava o DataFrame em `destino` (CSV, Excel ou Parquet), um bloco de linhas por vez."""
+    exportadores = {"CSV": _exportar_csv, "Excel": _exportar_xlsx, "Parquet": _exportar_parquet}
+    if formato not in exportadores:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    exportadores[formato](df, destino, tamanho_bloco)
+    return destino
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+
+class FilaEnvio:
+    """Fila persistente (SQLite) de linhas a anexar no backend.
+
+    enfileirar() grava no disco local e retorna na hora; uma thread em segundo
+    plano junta as linhas pendentes em lotes e chama `enviar_lote` (ex.:
+    append_rows). Em caso de falha (como o erro 429 de cota do Google) o lote
+    continua na fila e é reenviado com espera exponencial. Depois de um envio,
+    `ao_enviar(linhas)` recebe as linhas enviadas.
+    `preparar_lote(linhas)` completa as linhas antes do envio (ex.: atribui
+    IDs); o resultado é gravado na fila, então um reenvio usa as mesmas linhas.
+
+    Várias filas (ex.: réplicas na mesma máquina) podem usar o mesmo arquivo:
+    cada lote é reservado por uma delas antes do envio e só volta a ficar
+    disponível se o envio falhar ou a reserva passar de `prazo_reserva`
+    segundos (a réplica caiu no meio do envio).
+    """
+
+    def __init__(self, caminho, enviar_lote, tamanho_lote=50, espera_inicial=2.0, espera_maxima=300.0,
+                 ao_enviar=None, prazo_reserva=300.0, preparar_lote=None):
+        self.caminho = caminho
+        self.enviar_lote = enviar_lote
+        self.tamanho_lote = tamanho_lote
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.ao_enviar = ao_enviar
+        self.preparar_lote = preparar_lote
+        self.prazo_reserva = prazo_reserva
+        self.dono = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.falhas_seguidas = 0
+        self.ultimo_erro = None
+        self.proxima_tentativa = 0.0
+        self._acordar = threading.Event()
+        self._thread = None
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS fila ("
+                "id INTEGER PRIMARY KEY, valores TEXT NOT NULL, criado_em REAL NOT NULL, "
+                "enviado_em REAL, tentativas INTEGER NOT NULL DEFAULT 0)"
+            )
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_fila_pendentes ON fila (enviado_em, id)")
+            colunas = {linha[1] for linha in conexao.execute("PRAGMA table_info(fila)")}
+            # Filas criadas antes da reserva de lotes
+            if "reservado_por" not in colunas:
+                conexao.execute("ALTER TABLE fila ADD COLUMN reservado_por TEXT")
+                conexao.execute("ALTER TABLE fila ADD COLUMN reservado_ate REAL")
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        return conexao
+
+    def iniciar(self):
+        """Inicia a thread de envio (uma vez por processo)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._laco, name="fila-envio", daemon=True)
+            self._thread.start()
+        return self
+
+    def enfileirar(self, valores):
+        """Grava uma linha na fila e retorna o número do item."""
+        with closing(self._conectar()) as conexao, conexao:
+            cursor = conexao.execute("INSERT INTO fila (valores, criado_em) VALUES (?, ?)",
+                                     (json.dumps(list(valores), ensure_ascii=False), time.time()))
+            item = cursor.lastrowid
+        self._acordar.set()
+        return item
+
+    def situacao(self):
+        """Contagem de itens pendentes/enviados e estado da última tentativa."""
+        with closing(self._conectar()) as conexao:
+            pendentes, enviados = conexao.execute(
+                "SELECT COALESCE(SUM(enviado_em IS NULL), 0), COALESCE(SUM(enviado_em IS NOT NULL), 0) FROM fila"
+            ).fetchone()
+        return {
+            "pendentes": pendentes,
+            "enviados": enviados,
+            "ultimo_erro": self.ultimo_erro,
+            "proxima_tentativa": self.proxima_tentativa if self.falhas_seguidas else None,
+        }
+
+    def item_enviado(self, item):
+        """Indica se o item já foi gravado no backend."""
+        with closing(self._conectar()) as conexao:
+            linha = conexao.execute("SELECT enviado_em FROM fila WHERE id = ?", (item,)).fetchone()
+        return linha is not None and linha[0] is not None
+
+    def _reservar_lote(self):
+        """Reserva para esta fila até `tamanho_lote` itens pendentes e sem reserva válida."""
+        agora = time.time()
+        with closing(self._conectar()) as conexao:
+            # A seleção e a reserva numa só transação de escrita: duas filas nunca pegam o mesmo item
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                pendentes = conexao.execute(
+                    "SELECT id, valores FROM fila WHERE enviado_em IS NULL "
+                    "AND (reservado_ate IS NULL OR reservado_ate < ?) ORDER BY id LIMIT ?",
+                    (agora, self.tamanho_lote),
+                ).fetchall()
+                if pendentes:
+                    ids = [item for item, _ in pendentes]
+                    conexao.execute(
+                        f"UPDATE fila SET reservado_por = ?, reservado_ate = ? "
+                        f"WHERE id IN ({', '.join('?' for _ in ids)})",
+                        [self.dono, agora + self.prazo_reserva] + ids)
+                conexao.commit()
+            except BaseException:
+                conexao.rollback()
+                raise
+        return pendentes
+
+    def _preparar(self, ids, linhas):
+        """Aplica preparar_lote e grava as linhas que mudaram, enquanto o lote é desta fila."""
+        preparadas = self.preparar_lote([list(linha) for linha in linhas])
+        alteradas = [(json.dumps(nova, ensure_ascii=False), item, self.dono)
+                     for item, antiga, nova in zip(ids, linhas, preparadas) if nova != antiga]
+        if alteradas:
+            with closing(self._conectar()) as conexao, conexao:
+                conexao.executemany("UPDATE fila SET valores = ? WHERE id = ? AND reservado_por = ?", alteradas)
+        return preparadas
+
+    def _renovar_reserva(self, ids):
+        """Estende a reserva dos itens que ainda são desta fila; retorna quantos continuam com ela."""
+        with closing(self._conectar()) as conexao, conexao:
+            cursor = conexao.execute(
+                f"UPDATE fila SET reservado_ate = ? WHERE id IN ({', '.join('?' for _ in ids)}) "
+                f"AND reservado_por = ? AND enviado_em IS NULL",
+                [time.time() + self.prazo_reserva] + ids + [self.dono])
+            return cursor.rowcount
+
+    def _manter_reserva(self, ids, terminou):
+        # Durante um envio demorado a reserva é renovada a cada terço do prazo
+        while not terminou.wait(max(self.prazo_reserva / 3, 0.01)):
+            try:
+                self._renovar_reserva(ids)
+            except sqlite3.Error as e:
+                logger.warning("Falha ao renovar a reserva do lote: %s", e)
+
+    def descarregar(self):
+        """Envia um lote pendente. Retorna quantas linhas foram enviadas."""
+        pendentes = self._reservar_lote()
+        if not pendentes:
+            return 0
+        ids = [item for item, _ in pendentes]
+        linhas = [json.loads(valores) for _, valores in pendentes]
+        marcadores = ", ".join("?" for _ in ids)
+        terminou = threading.Event()
+        try:
+            if self.preparar_lote is not None:
+                linhas = self._preparar(ids, linhas)
+            # Preparar o lote pode ter levado parte do prazo: renova antes de enviar
+            if self._renovar_reserva(ids) != len(ids):
+                logger.warning("Reserva de um lote de %d ideias venceu antes do envio; o lote volta à fila.",
+                               len(ids))
+                with closing(self._conectar()) as conexao, conexao:
+                    conexao.execute(f"UPDATE fila SET reservado_por = NULL, reservado_ate = NULL "
+                                    f"WHERE id IN ({marcadores}) AND reservado_por = ?", ids + [self.dono])
+                return 0
+            threading.Thread(target=self._manter_reserva, args=(ids, terminou), name="fila-reserva",
+                             daemon=True).start()
+            try:
+                self.enviar_lote(linhas)
+            finally:
+                terminou.set()
+        except Exception as e:
+            self.falhas_seguidas += 1
+            self.ultimo_erro = str(e)
+            espera = min(self.espera_inicial * 2 ** (self.falhas_seguidas - 1), self.espera_maxima)
+            self.proxima_tentativa = time.time() + espera
+            logger.warning("Falha ao enviar lote de %d ideias (tentativa %d, nova tentativa em %.0fs): %s",
+                           len(linhas), self.falhas_seguidas, espera, e)
+            # Devolve o lote à fila: outra réplica (ou esta, depois da espera) tenta de novo
+            with closing(self._conectar()) as conexao, conexao:
+                conexao.execute(
+                    f"UPDATE fila SET tentativas = tentativas + 1, reservado_por = NULL, reservado_ate = NULL "
+                    f"WHERE id IN ({marcadores}) AND reservado_por = ?", ids + [self.dono])
+            raise
+        self.falhas_seguidas = 0
+        self.ultimo_erro = None
+        with closing(self._conectar()) as conexao, conexao:
+            marcadas = conexao.execute(f"UPDATE fila SET enviado_em = ?, reservado_por = NULL, reservado_ate = NULL "
+                                       f"WHERE id IN ({marcadores}) AND reservado_por = ?",
+                                       [time.time()] + ids + [self.dono]).rowcount
+            # Histórico de itens enviados só é mantido por uma semana
+            conexao.execute("DELETE FROM fila WHERE enviado_em < ?", (time.time() - 7 * 86400,))
+        if marcadas != len(ids):
+            logger.warning("Reserva de %d de %d ideias perdida durante o envio: outra réplica pode "
+                           "enviá-las de novo (ideias duplicadas).", len(ids) - marcadas, len(ids))
+        if self.ao_enviar is not None:
+            self.ao_enviar(linhas)
+        return len(linhas)
+
+    def _laco(self):
+        while True:
+            espera = self.proxima_tentativa - time.time() if self.falhas_seguidas else None
+            if espera is None or espera > 0:
+                self._acordar.wait(timeout=espera if espera is not None else 5.0)
+                self._acordar.clear()
+                if self.falhas_seguidas and self.proxima_tentativa > time.time():
+                    continue
+            try:
+                # Esvazia a fila enquanto houver lotes cheios
+                while self.descarregar() == self.tamanho_lote:
+                    pass
+            except Exception:
+                pass
@@ -0,0 +1,99 @@
+from esquema import concatenar
+from sob_demanda import ModuloSobDemanda
+
+np = ModuloSobDemanda("numpy")
+pd = ModuloSobDemanda("pandas")
+
+
+# Colunas com filtro na barra lateral dos painéis
+COLUNAS_FILTRO = ["Status", "Área", "Matrícula"]
+
+
+class IndiceFiltros:
+    """Índice invertido dos filtros categóricos, montado uma vez por carga de dados.
+
+    Cada coluna é convertida em Categorical e, para cada valor, guarda-se o
+    vetor (ordenado) das posições das linhas que o contêm. Um filtro combinado
+    é a interseção desses vetores, sem copiar nem varrer o DataFrame inteiro.
+    """
+
+    def __init__(self, df, colunas=COLUNAS_FILTRO):
+        self.df = df
+        self.categorias = {}
+        self.posicoes = {}
+        for coluna in colunas:
+            if coluna not in df.columns:
+                continue
+            # Colunas já categóricas podem trazer categorias sem nenhuma linha
+            categorico = pd.Categorical(df[coluna]).remove_unused_categories()
+            codigos = np.asarray(categorico.codes)
+            ordem = np.argsort(codigos, kind="stable")
+            limites = np.searchsorted(codigos[ordem], np.arange(len(categorico.categories) + 1))
+            self.categorias[coluna] = list(categorico.categories)
+            self.posicoes[coluna] = {
+                valor: ordem[limites[i]:limites[i + 1]]
+                for i, valor in enumerate(categorico.categories)
+            }
+
+    def opcoes(self, coluna):
+        """Valores distintos da coluna (para popular o filtro)."""
+        return self.categorias.get(coluna, [])
+
+    def posicoes_filtradas(self, selecoes):
+        """Posições das linhas que atendem a todas as seleções.
+
+        `selecoes` mapeia coluna -> lista de valores aceitos (OU dentro da
+        coluna, E entre colunas). Lista vazia ou coluna ausente = sem filtro.
+        """
+        conjuntos = []
+        for coluna, valores in selecoes.items():
+            if not valores or coluna not in self.posicoes:
+                continue
+            por_valor = self.posicoes[coluna]
+            partes = [por_valor[v] for v in valores if v in por_valor]
+            if not partes:
+                return np.array([], dtype=np.intp)
+            conjuntos.append(np.sort(np.concatenate(partes)) if len(partes) > 1 else partes[0])
+        if not conjuntos:
+            return None
+        # Começa pelo menor conjunto: o custo acompanha o tamanho do resultado
+        conjuntos.sort(key=len)
+        resultado = conjuntos[0]
+        for conjunto in conjuntos[1:]:
+            resultado = np.intersect1d(resultado, conjunto, assume_unique=True)
+        return resultado
+
+    def filtrar(self, selecoes):
+        """Retorna o DataFrame filtrado (o próprio DataFrame se não há filtro)."""
+        posicoes = self.posicoes_filtradas(selecoes)
+        if posicoes is None:
+            return self.df
+        return self.df.iloc[posicoes]
+
+
+class IndiceFiltrosUnido:
+    """Vários índices de filtros (ex.: partição ativa e arquivo) vistos como um só.
+
+    `df` é a união já montada dos DataFrames dos índices, devolvida quando
+    não há filtro; com filtro, só as linhas escolhidas de cada parte são unidas.
+    """
+
+    def __init__(self, df, indices):
+        self.df = df
+        self.indices = indices
+        self._opcoes = {}
+
+    def opcoes(self, coluna):
+        if coluna not in self._opcoes:
+            self._opcoes[coluna] = sorted(set().union(*(indice.opcoes(coluna) for indice in self.indices)), key=str)
+        return self._opcoes[coluna]
+
+    def filtrar(self, selecoes):
+        partes = [indice.filtrar(selecoes) for indice in self.indices]
+        if all(parte is indice.df for parte, indice in zip(partes, self.indices)):
+            return self.df
+        resultado = partes[0]
+        for parte in partes[1:]:
+            # Mantém o índice de cada parte (no arquivo ele é negativo)
+            resultado = concatenar(resultado, parte, ignore_index=False)
+        return resultado
@@ -1,9 +1,31 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import pytz
-import gspread
-from google.oauth2.service_account import Credentials
+from componentes import aviso_conflito, edicao_em_lote, exportacao_ideias, seletor_ideia, tabela_paginada
+from esquema import COLUNAS_CONTROLE, registro_como_texto
+from utils import (
+    carregar_dados,
+    salvar_ideia,
+    editar_ideia,
+    excluir_ideia,
+    get_column_order,
+    proximo_id,
+    localizar_ideia,
+    obter_indice_filtros,
+    importar_ideias,
+    medir_pagina,
+    reexecutar,
+    parar,
+    ConflitoEdicao,
+    salvar_edicoes_em_lote
+)
+from importacao import ler_cabecalho, mapear_colunas
+from sob_demanda import ModuloSobDemanda
+
+pd = ModuloSobDemanda("pandas")
+
+# Tempo de cada execução da página (métricas)
+cronometro = medir_pagina("ideias")
 
 # Oculta o rodapé de menu
 hide_streamlit_style = """
@@ -21,78 +43,7 @@ try:
     fuso_horario_sp = pytz.timezone('America/Sao_Paulo')
 except pytz.UnknownTimeZoneError:
     st.error("Fuso horário 'America/Sao_Paulo' não encontrado.")
-    st.stop()
-
-
-# Função para conectar ao Google Sheets
-@st.cache_resource
-def connect_to_google_sheets():
-    """Conecta-se à planilha Google e retorna o objeto da aba (worksheet)."""
-    try:
-        creds_dict = dict(st.secrets["gcp_service_account"])
-        client = gspread.service_account_from_dict(creds_dict)
-        spreadsheet_url = "https://docs.google.com/spreadsheets/d/1CEu8e_LgTq4NQxm8SWpSsLXYWcGjwJd4YseNUsXm0RQ/edit?usp=sharing"
-        spreadsheet = client.open_by_url(spreadsheet_url)
-        worksheet = spreadsheet.worksheet("Ideias")
-        return worksheet
-    except Exception as e:
-        st.error(f"Falha na conexão com a Planilha Google: {e}")
-        st.stop()
-
-
-# Função auxiliar para manter a ordem correta das colunas
-def get_column_order():
-    """Retorna a lista de colunas na ordem exata da planilha."""
-    return [
-        "ID", "Nome da ideia", "Descrição da solução", "Descrição de problema",
-        "Área", "Local", "BL", "Unidade", "Dono da ideia", "Matrícula",
-        "Área do operador", "Turno do operador que deu a ideia", "Data ideia",
-        "Metodologia", "Líder", "Equipe", "Status", "Observações", "Data conclusão",
-        "Investimento", "Ganho financeiro", "Link", "Apresentou em alguma rotina?"
-    ]
-
-
-# Inicia a conexão com a planilha
-worksheet = connect_to_google_sheets()
-
-
-# --- FUNÇÕES DE MANIPULAÇÃO DE DADOS ---
-@st.cache_data(ttl=60)
-def carregar_dados():
-    """Carrega os dados da planilha e retorna um DataFrame."""
-    data = worksheet.get_all_records()
-    df = pd.DataFrame(data)
-    if df.empty:
-        df = pd.DataFrame(columns=get_column_order())
-    # Garante que a coluna ID seja numérica para a busca funcionar corretamente
-    if 'ID' in df.columns:
-        df['ID'] = pd.to_numeric(df['ID'], errors='coerce')
-    return df
-
-
-def salvar_ideia(nova_ideia):
-    """Salva uma nova ideia na planilha, garantindo a ordem das colunas."""
-    colunas_ordenadas = get_column_order()
-    dados_para_adicionar = [nova_ideia.get(col, "") for col in colunas_ordenadas]
-    worksheet.append_row(dados_para_adicionar)
-    st.cache_data.clear()
-
-
-def excluir_ideia(indice_real_df):
-    """Exclui uma linha da planilha com base no índice REAL do DataFrame."""
-    linha_para_excluir = int(indice_real_df) + 2
-    worksheet.delete_rows(linha_para_excluir)
-    st.cache_data.clear()
-
-
-def editar_ideia(indice_real_df, dados_editados):
-    """Atualiza uma linha existente na planilha."""
-    linha_para_editar = int(indice_real_df) + 2
-    colunas_ordenadas = get_column_order()
-    valores_para_atualizar = [dados_editados.get(col, "") for col in colunas_ordenadas]
-    valores_formatados = [str(valor) for valor in valores_para_atualizar]
-    worksheet.update(f'A{linha_para_editar}:W{linha_para_editar}', [valores_formatados])
-    st.cache_data.clear()
+    parar()
 
 
 # --- INTERFACE STREAMLIT ---
@@ -106,21 +57,19 @@ df = carregar_dados()
 # Cria a barra lateral para os filtros
 st.sidebar.header(" Filtros do Painel")
 
-# Filtro por Status
-status_disponiveis = ["Todos"] + df["Status"].unique().tolist()
-status_selecionado = st.sidebar.selectbox("Filtrar por Status", status_disponiveis)
+# Opções e posições de cada filtro vêm prontas do índice (refeito só quando os dados mudam)
+indice_filtros = obter_indice_filtros()
 
-# Filtro por Área
-areas_disponiveis = ["Todas"] + df["Área"].unique().tolist()
-area_selecionada = st.sidebar.selectbox("Filtrar por Área da Ideia", areas_disponiveis)
+# Filtro por Status (vazio = todos)
+status_selecionados = st.sidebar.multiselect("Filtrar por Status", indice_filtros.opcoes("Status"),
+                                             placeholder="Todos")
 
-# Aplica os filtros ao DataFrame
-df_filtrado = df.copy()
-if status_selecionado != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["Status"] == status_selecionado]
+# Filtro por Área
+areas_selecionadas = st.sidebar.multiselect("Filtrar por Área da Ideia", indice_filtros.opcoes("Área"),
+                                            placeholder="Todas")
 
-if area_selecionada != "Todas":
-    df_filtrado = df_filtrado[df_filtrado["Área"] == area_selecionada]
+# Aplica os filtros ao DataFrame (interseção das posições de cada filtro)
+df_filtrado = indice_filtros.filtrar({"Status": status_selecionados, "Área": areas_selecionadas})
 
 # Formulário de cadastro dentro de um expander para economizar espaço
 with st.expander(" Clique aqui para registrar uma nova ideia"):
@@ -192,9 +141,7 @@ with st.expander(" Clique aqui para registrar uma nova ideia"):
         campos_obrigatorios = [dono_da_ideia, matricula, area_do_operador, nome_da_ideia, descricao_de_problema,
                                descricao_da_solucao]
         if all(campos_obrigatorios):
-            df_existente = carregar_dados()
-            novo_id = (pd.to_numeric(df_existente['ID'],
-                                     errors='coerce').max() + 1) if not df_existente.empty and 'ID' in df_existente else 1
+            novo_id = proximo_id()
             data_ideia = datetime.now(fuso_horario_sp).strftime("%d/%m/%Y")
             nova_ideia = {
                 "ID": int(novo_id), "Nome da ideia": nome_da_ideia, "Descrição da solução": descricao_da_solucao,
@@ -208,15 +155,61 @@ with st.expander(" Clique aqui para registrar uma nova ideia"):
             }
             salvar_ideia(nova_ideia)
             st.success("✅ Ideia registrada com sucesso!")
-            st.rerun()
+            reexecutar()
         else:
             st.warning("⚠️ Por favor, preencha todos os campos marcados com *.")
 
+# Importação em lote de planilhas antigas (.xlsx ou .csv)
+with st.expander("📥 Importar ideias em lote (.xlsx ou .csv)"):
+    arquivo_importacao = st.file_uploader("Arquivo com uma ideia por linha e cabeçalho na primeira linha",
+                                          type=["xlsx", "csv"], key="arquivo_importacao")
+    if arquivo_importacao is not None:
+        cabecalho = ler_cabecalho(arquivo_importacao, arquivo_importacao.name)
+        automatico = mapear_colunas(cabecalho)
+        opcoes_origem = ["(não importar)"] + [f"{i + 1}. {nome}" for i, nome in enumerate(cabecalho)]
+        st.caption("Associe cada coluna do app a uma coluna do arquivo. O ID é sempre gerado pelo app.")
+        mapeamento = {}
+        colunas_mapa = st.columns(3)
+        for posicao, coluna in enumerate(c for c in get_column_order() if c not in COLUNAS_CONTROLE):
+            with colunas_mapa[posicao % 3]:
+                escolha = st.selectbox(coluna, opcoes_origem, index=automatico.get(coluna, -1) + 1,
+                                       key=f"mapa_{coluna}")
+            if escolha != opcoes_origem[0]:
+                mapeamento[coluna] = opcoes_origem.index(escolha) - 1
+        status_padrao = st.text_input("Status para linhas sem status", value="Nova")
+        recomecar = st.checkbox("Recomeçar do início (ignora o progresso de uma importação anterior deste arquivo)")
+        if st.button("🚀 Importar"):
+            andamento = st.empty()
+            with st.spinner("Importando..."):
+                resultado = importar_ideias(
+                    arquivo_importacao, arquivo_importacao.name, mapeamento,
+                    padroes={"Status": status_padrao} if status_padrao else None, recomecar=recomecar,
+                    ao_progredir=lambda r: andamento.info(
+                        f"{r['importadas']} ideias importadas (até a linha {r['linhas_lidas']} do arquivo)..."))
+            andamento.empty()
+            if resultado is None:
+                st.error("Sem conexão com o armazenamento.")
+            elif resultado["ja_importada"]:
+                st.info("Este arquivo já foi importado. Marque \"Recomeçar do início\" para importá-lo de novo.")
+            else:
+                if resultado["retomada"]:
+                    st.caption("Importação retomada de onde a anterior parou.")
+                st.success(f"✅ {resultado['importadas']} ideias importadas; "
+                           f"{resultado['invalidas']} linhas inválidas ignoradas.")
+                if resultado["erros"]:
+                    st.dataframe(pd.DataFrame(resultado["erros"], columns=["Linha", "Motivo"]),
+                                 use_container_width=True)
+
 st.markdown("---")
 st.subheader(" Painel de Ideias Registradas")
 
 if not df_filtrado.empty:
-    st.dataframe(df_filtrado.reset_index(drop=True), use_container_width=True)  # Reset index para visualização
+    # Só a página visível vai para o navegador
+    tabela_paginada(df_filtrado, chave="painel")
+    exportacao_ideias(df_filtrado, chave="exportar")
+    # Revisões semanais mudam dezenas de ideias: todas as células vão numa única gravação
+    with st.expander("✏️ Editar várias ideias de uma vez"):
+        edicao_em_lote(df_filtrado, chave="grade_edicao", salvar=salvar_edicoes_em_lote)
     st.markdown("---")
 
     st.header(" Gerenciar Ideias Existentes")
@@ -225,22 +218,17 @@ if not df_filtrado.empty:
     with col_edit:
         st.subheader(" Alterar Ideia")
 
-        # --- ALTERAÇÃO AQUI: Popula a lista com ID - Nome da ideia ---
-        lista_ideias_filtrada = [f"{row['ID']} - {row['Nome da ideia']}" for index, row in df_filtrado.iterrows()]
-
-        if lista_ideias_filtrada:
-            ideia_selecionada_str = st.selectbox("Selecione a ideia para editar", options=lista_ideias_filtrada,
-                                                 key="editor_idx")
+        # Seletor com busca: as opções são montadas de forma vetorizada e limitadas
+        id_selecionado = seletor_ideia(df_filtrado, "Selecione a ideia para editar", chave="editor_idx")
 
-            # --- ALTERAÇÃO AQUI: Extrai o ID da string selecionada ---
-            id_selecionado = int(ideia_selecionada_str.split(" - ")[0])
+        if id_selecionado is not None:
 
             with st.expander("Clique para carregar e editar os dados", expanded=False):
                 # --- ALTERAÇÃO AQUI: Busca a ideia na tabela original (df) pelo ID e pega seu índice real ---
-                ideia_para_editar_linha = df[df['ID'] == id_selecionado]
-                if not ideia_para_editar_linha.empty:
-                    indice_real = ideia_para_editar_linha.index[0]
-                    ideia_para_editar = ideia_para_editar_linha.iloc[0]
+                indice_real, ideia_para_editar = localizar_ideia(id_selecionado)
+                if ideia_para_editar is not None:
+                    # O formulário trabalha com o texto da planilha (datas dd/mm/aaaa, valores em R$)
+                    ideia_para_editar = registro_como_texto(ideia_para_editar)
 
                     with st.form("form_edicao"):
                         dados_editados = {}
@@ -305,24 +293,43 @@ if not df_filtrado.empty:
                                     dados_editados[col] = ideia_para_editar.get(col)
 
                             # --- ALTERAÇÃO AQUI: Passa o índice REAL para a função de edição ---
-                            editar_ideia(indice_real, dados_editados)
-                            st.success("✅ Ideia atualizada com sucesso!")
-                            st.rerun()
+                            try:
+                                if editar_ideia(indice_real, dados_editados, originais=ideia_para_editar):
+                                    st.success("✅ Ideia atualizada com sucesso!")
+                                    reexecutar()
+                            except ConflitoEdicao as conflito:
+                                st.session_state["conflito_edicao"] = {
+                                    "indice": indice_real, "dados": dados_editados,
+                                    "originais": ideia_para_editar, "conflito": conflito}
+
+                    # Outra pessoa salvou a mesma ideia enquanto ela era editada aqui
+                    pendente = st.session_state.get("conflito_edicao")
+                    if pendente is not None and pendente["conflito"].id_ideia == ideia_para_editar.get("ID"):
+                        escolha = aviso_conflito(pendente["conflito"], pendente["dados"], pendente["originais"],
+                                                 chave="conflito_edicao")
+                        if escolha == "sobrescrever":
+                            del st.session_state["conflito_edicao"]
+                            if editar_ideia(pendente["indice"], pendente["dados"], originais=pendente["originais"],
+                                            forcar=True):
+                                st.success("✅ Ideia atualizada com sucesso!")
+                                reexecutar()
+                        elif escolha == "descartar":
+                            del st.session_state["conflito_edicao"]
+                            # Os campos voltam a mostrar a ideia como está agora
+                            for chave in [k for k in st.session_state if str(k).startswith("edit_")]:
+                                del st.session_state[chave]
+                            reexecutar()
 
     with col_delete:
         st.subheader(" Excluir Ideia")
-        if 'lista_ideias_filtrada' in locals() and lista_ideias_filtrada:
-            ideia_excluir_str = st.selectbox("Selecione a ideia para excluir", options=lista_ideias_filtrada,
-                                             key="excluir_idx")
+        id_excluir = seletor_ideia(df_filtrado, "Selecione a ideia para excluir", chave="excluir_idx")
+        if id_excluir is not None:
             if st.button("❌ Excluir Ideia Selecionada"):
-                # --- ALTERAÇÃO AQUI: Mesma lógica de busca pelo ID para exclusão ---
-                id_excluir = int(ideia_excluir_str.split(" - ")[0])
-                linha_excluir = df[df['ID'] == id_excluir]
-                if not linha_excluir.empty:
-                    indice_real_excluir = linha_excluir.index[0]
-                    excluir_ideia(indice_real_excluir)
-                    st.success(f"Ideia '{ideia_excluir_str.split(' - ')[1]}' excluída com sucesso!")
-                    st.rerun()
+                indice_real_excluir, ideia_excluir = localizar_ideia(id_excluir)
+                if indice_real_excluir is not None and excluir_ideia(indice_real_excluir, id_excluir):
+                    st.success(f"Ideia '{ideia_excluir['Nome da ideia']}' excluída com sucesso!")
+                    reexecutar()
 else:
     st.info("Nenhuma ideia encontrada com os filtros selecionados ou nenhuma ideia foi cadastrada ainda.")
 
+cronometro.encerrar()
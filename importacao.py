@@ -0,0 +1,203 @@
+import csv
+import hashlib
+import io
+import sqlite3
+import time
+from contextlib import closing
+
+from busca import normalizar
+from esquema import COLUNAS_CONTROLE, DATA, ESQUEMA, MOEDA, aplicar_tipos, get_column_order, serializar_linha
+from sob_demanda import ModuloSobDemanda
+
+# Só importados quando um arquivo é de fato lido
+openpyxl = ModuloSobDemanda("openpyxl")
+pd = ModuloSobDemanda("pandas")
+
+# Linhas lidas, validadas e gravadas por vez (uma chamada append_rows por lote)
+TAMANHO_LOTE_IMPORTACAO = 500
+# Quantos erros de validação são guardados para mostrar (os demais só são contados)
+LIMITE_ERROS = 100
+
+
+class ProgressoImportacao:
+    """Progresso das importações (SQLite), para retomar um arquivo interrompido.
+
+    Cada arquivo é identificado pelo hash do conteúdo; após gravar um lote,
+    registra a última linha do arquivo já processada (`linhas_lidas`).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        with closing(sqlite3.connect(self.caminho, timeout=30)) as conexao, conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS importacoes ("
+                "assinatura TEXT PRIMARY KEY, nome TEXT, linhas_lidas INTEGER NOT NULL, "
+                "importadas INTEGER NOT NULL, invalidas INTEGER NOT NULL, concluida INTEGER NOT NULL, "
+                "atualizado_em REAL NOT NULL)"
+            )
+
+    def ler(self, assinatura):
+        with closing(sqlite3.connect(self.caminho, timeout=30)) as conexao:
+            linha = conexao.execute(
+                "SELECT linhas_lidas, importadas, invalidas, concluida FROM importacoes WHERE assinatura = ?",
+                (assinatura,)).fetchone()
+        if linha is None:
+            return {"linhas_lidas": 0, "importadas": 0, "invalidas": 0, "concluida": False}
+        return {"linhas_lidas": linha[0], "importadas": linha[1], "invalidas": linha[2], "concluida": bool(linha[3])}
+
+    def gravar(self, assinatura, nome, linhas_lidas, importadas, invalidas, concluida=False):
+        with closing(sqlite3.connect(self.caminho, timeout=30)) as conexao, conexao:
+            conexao.execute("INSERT OR REPLACE INTO importacoes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (assinatura, nome, linhas_lidas, importadas, invalidas, int(concluida), time.time()))
+
+    def reiniciar(self, assinatura):
+        with closing(sqlite3.connect(self.caminho, timeout=30)) as conexao, conexao:
+            conexao.execute("DELETE FROM importacoes WHERE assinatura = ?", (assinatura,))
+
+
+def assinatura_arquivo(arquivo):
+    """Hash SHA-256 do conteúdo do arquivo (lido em partes)."""
+    resumo = hashlib.sha256()
+    arquivo.seek(0)
+    for parte in iter(lambda: arquivo.read(1 << 20), b""):
+        resumo.update(parte)
+    arquivo.seek(0)
+    return resumo.hexdigest()
+
+
+def _linhas_csv(arquivo):
+    arquivo.seek(0)
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    try:
+        amostra = texto.read(8192)
+        texto.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+        except csv.Error:
+            dialeto = csv.excel
+        yield from csv.reader(texto, dialeto)
+    finally:
+        # Devolve o arquivo original aberto (o wrapper o fecharia)
+        texto.detach()
+
+
+def _linhas_xlsx(arquivo):
+    arquivo.seek(0)
+    # read_only: as linhas são lidas do XML sob demanda, sem carregar a planilha inteira
+    livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        yield from livro.active.iter_rows(values_only=True)
+    finally:
+        livro.close()
+
+
+def ler_linhas(arquivo, nome):
+    """Itera as linhas (tuplas) de um arquivo .xlsx ou .csv, incluindo o cabeçalho."""
+    if nome.lower().endswith(".csv"):
+        return _linhas_csv(arquivo)
+    return _linhas_xlsx(arquivo)
+
+
+def ler_cabecalho(arquivo, nome):
+    """Nomes das colunas do arquivo (primeira linha)."""
+    linhas = ler_linhas(arquivo, nome)
+    try:
+        cabecalho = next(linhas, ())
+    finally:
+        linhas.close()
+    return ["" if valor is None else str(valor).strip() for valor in cabecalho]
+
+
+def mapear_colunas(cabecalho):
+    """Mapeamento automático {coluna do app: índice no arquivo} por nome (sem acentos/maiúsculas)."""
+    por_nome = {normalizar(nome).strip(): indice for indice, nome in enumerate(cabecalho) if nome}
+    return {coluna: por_nome[normalizar(coluna)] for coluna in get_column_order()
+            if coluna not in COLUNAS_CONTROLE and normalizar(coluna) in por_nome}
+
+
+def _preenchido(serie):
+    return serie.notna() & serie.astype("string").str.strip().fillna("").ne("")
+
+
+def preparar_lote(linhas, mapeamento, padroes=None):
+    """Valida um lote de linhas [(número da linha, tupla)] já mapeadas para as colunas do app.
+
+    Retorna (DataFrame tipado das linhas válidas, [(número da linha, motivo)]).
+    """
+    numeros = [numero for numero, _ in linhas]
+    bruto = pd.DataFrame({
+        coluna: [valores[indice] if indice < len(valores) else None for _, valores in linhas]
+        for coluna, indice in mapeamento.items() if coluna not in COLUNAS_CONTROLE
+    }, index=numeros, dtype=object)
+    for coluna, valor in (padroes or {}).items():
+        if coluna not in bruto.columns:
+            bruto[coluna] = valor
+        else:
+            bruto[coluna] = bruto[coluna].where(_preenchido(bruto[coluna]), valor)
+    tipado = aplicar_tipos(bruto)
+
+    motivos = pd.Series("", index=bruto.index)
+    if "Nome da ideia" in bruto.columns:
+        motivos = motivos.where(_preenchido(bruto["Nome da ideia"]), "Nome da ideia vazio; ")
+    else:
+        motivos[:] = "Nome da ideia vazio; "
+    for coluna in bruto.columns:
+        if ESQUEMA.get(coluna) in (DATA, MOEDA):
+            invalidos = _preenchido(bruto[coluna]) & tipado[coluna].isna()
+            motivos = motivos.where(~invalidos, motivos + f"{coluna} inválido(a); ")
+    validos = motivos.eq("")
+    erros = [(numero, motivo.rstrip("; ")) for numero, motivo in motivos[~validos].items()]
+    return tipado[validos.to_numpy()], erros
+
+
+def importar(arquivo, nome, mapeamento, gravar_linhas, reservar_ids, progresso, padroes=None,
+             tamanho_lote=TAMANHO_LOTE_IMPORTACAO, ao_progredir=None):
+    """Importa um arquivo .xlsx/.csv em lotes, retomando de onde uma importação anterior parou.
+
+    `gravar_linhas(linhas)` recebe as linhas já no formato da planilha (ex.:
+    append_rows) e `reservar_ids(n)` devolve n IDs novos. O progresso é
+    gravado depois de cada lote; se o processo cair entre a gravação do lote
+    e a do progresso, esse lote pode ser enviado de novo ao retomar.
+    """
+    assinatura = assinatura_arquivo(arquivo)
+    estado = progresso.ler(assinatura)
+    resultado = dict(estado, erros=[], ja_importada=estado["concluida"],
+                     retomada=estado["linhas_lidas"] > 0 and not estado["concluida"])
+    if estado["concluida"]:
+        return resultado
+
+    def processar(pendentes):
+        validos, erros = preparar_lote(pendentes, mapeamento, padroes)
+        if len(validos):
+            validos = validos.assign(ID=reservar_ids(len(validos)))
+            gravar_linhas([serializar_linha(registro) for registro in validos.to_dict("records")])
+        resultado["importadas"] += len(validos)
+        resultado["invalidas"] += len(erros)
+        resultado["erros"].extend(erros[:LIMITE_ERROS - len(resultado["erros"])])
+        resultado["linhas_lidas"] = pendentes[-1][0]
+        progresso.gravar(assinatura, nome, resultado["linhas_lidas"], resultado["importadas"],
+                         resultado["invalidas"])
+        if ao_progredir is not None:
+            ao_progredir(resultado)
+
+    pendentes = []
+    linhas = ler_linhas(arquivo, nome)
+    try:
+        next(linhas, None)  # cabeçalho
+        # Número da linha no arquivo (o cabeçalho é a linha 1)
+        for numero, valores in enumerate(linhas, start=2):
+            # Pula o que já foi gravado numa importação anterior e as linhas em branco
+            if numero <= estado["linhas_lidas"] or not any(v not in (None, "") for v in valores):
+                continue
+            pendentes.append((numero, valores))
+            if len(pendentes) >= tamanho_lote:
+                processar(pendentes)
+                pendentes = []
+    finally:
+        linhas.close()
+    if pendentes:
+        processar(pendentes)
+    resultado["concluida"] = True
+    progresso.gravar(assinatura, nome, resultado["linhas_lidas"], resultado["importadas"],
+                     resultado["invalidas"], concluida=True)
+    return resultado
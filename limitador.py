@@ -0,0 +1,180 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Prioridade das chamadas: as das páginas passam na frente das de segundo plano
+PRIORIDADE_ALTA = 0
+PRIORIDADE_BAIXA = 1
+
+# Métodos só de leitura; qualquer outro é tratado como escrita
+LEITURAS = {
+    "get_all_records", "get_all_values", "get_values", "get", "batch_get", "col_values", "row_values",
+    "cell", "acell", "get_lastUpdateTime", "worksheet", "open_by_url", "open_by_key",
+}
+
+# Leituras de recarga e sincronização: chamadas idênticas simultâneas viram uma só. get_values,
+# cell, batch_get etc. ficam de fora: conferem versões logo antes de gravar e não podem
+# receber o resultado de uma leitura que começou antes
+JUNTAVEIS = {"get_all_records", "get_all_values", "col_values", "get_lastUpdateTime", "worksheet",
+             "open_by_url", "open_by_key"}
+
+_prioridade = ContextVar("prioridade_api", default=PRIORIDADE_ALTA)
+
+
+@contextmanager
+def baixa_prioridade():
+    """Chamadas feitas dentro do bloco esperam atrás das chamadas das páginas."""
+    marca = _prioridade.set(PRIORIDADE_BAIXA)
+    try:
+        yield
+    finally:
+        _prioridade.reset(marca)
+
+
+class _Voo:
+    """Uma leitura em andamento, aguardada por quem pediu a mesma coisa."""
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class Limitador:
+    """Balde de fichas com fila de prioridade e junção de leituras iguais (single-flight).
+
+    Cada chamada à API gasta uma ficha; o balde guarda até `capacidade` e
+    ganha `por_minuto` fichas por minuto. Sem ficha a chamada espera na fila
+    (em vez de estourar a cota e falhar com 429), e as de PRIORIDADE_ALTA
+    são atendidas antes das de PRIORIDADE_BAIXA. Uma leitura idêntica a outra
+    ainda em andamento não vai à API: recebe o mesmo resultado (o mesmo
+    objeto, que deve ser tratado como somente leitura). Depois de uma escrita,
+    descartar_voos() faz as leituras seguintes irem à API de novo.
+    """
+
+    def __init__(self, por_minuto=60, capacidade=None, metricas=None):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = capacidade or max(1, int(por_minuto) // 4)
+        self.metricas = metricas
+        self.fichas = float(self.capacidade)
+        self.reposto_em = time.monotonic()
+        self.economizadas = 0
+        self.enfileiradas = 0
+        self._condicao = threading.Condition()
+        self._fila = []
+        self._senhas = itertools.count()
+        self._voos = {}
+        self._lock_voos = threading.Lock()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.reposto_em) * self.taxa)
+        self.reposto_em = agora
+
+    def _contar(self, resultado):
+        if self.metricas is not None:
+            self.metricas.contar("limitador", resultado)
+
+    def aguardar_vez(self, prioridade=None):
+        """Bloqueia até haver ficha e esta chamada ser a primeira da fila."""
+        senha = (_prioridade.get() if prioridade is None else prioridade, next(self._senhas))
+        esperou = False
+        with self._condicao:
+            heapq.heappush(self._fila, senha)
+            while True:
+                self._repor()
+                if self._fila[0] == senha and self.fichas >= 1:
+                    heapq.heappop(self._fila)
+                    self.fichas -= 1
+                    # A próxima da fila pode ter ficha também
+                    self._condicao.notify_all()
+                    break
+                esperou = True
+                self._condicao.wait(timeout=(1 - self.fichas) / self.taxa if self.fichas < 1 else None)
+            if esperou:
+                self.enfileiradas += 1
+        if esperou:
+            self._contar("enfileirada")
+
+    def executar(self, chave, funcao):
+        """Executa `funcao` respeitando o balde; com `chave` (leitura), junta chamadas iguais."""
+        if chave is None:
+            self.aguardar_vez()
+            return funcao()
+        with self._lock_voos:
+            voo = self._voos.get(chave)
+            dono = voo is None
+            if dono:
+                voo = self._voos[chave] = _Voo()
+        if not dono:
+            voo.pronto.wait()
+            with self._condicao:
+                self.economizadas += 1
+            self._contar("coalescida")
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado
+        try:
+            self.aguardar_vez()
+            voo.resultado = funcao()
+            return voo.resultado
+        except Exception as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock_voos:
+                if self._voos.get(chave) is voo:
+                    del self._voos[chave]
+            voo.pronto.set()
+
+    def descartar_voos(self):
+        """Leituras em andamento deixam de receber novas chamadas iguais (podem não ver uma escrita)."""
+        with self._lock_voos:
+            self._voos.clear()
+
+    def situacao(self):
+        """Fichas disponíveis, chamadas na fila e totais economizadas/enfileiradas."""
+        with self._condicao:
+            self._repor()
+            return {"fichas": self.fichas, "na_fila": len(self._fila),
+                    "economizadas": self.economizadas, "enfileiradas": self.enfileiradas}
+
+
+class ClienteLimitado:
+    """Envolve o cliente, a planilha ou a aba do gspread passando cada chamada pelo Limitador.
+
+    Assim como ClienteInstrumentado, envolve também as planilhas e abas
+    devolvidas, para que nenhuma chamada à API escape do balde. Só as
+    leituras de JUNTAVEIS são juntadas, e cada escrita descarta as leituras
+    em andamento: quem lê depois de gravar sempre vê a própria escrita.
+    """
+
+    def __init__(self, alvo, limitador):
+        self._alvo = alvo
+        self._limitador = limitador
+
+    def _envolver(self, valor):
+        if callable(getattr(valor, "get_all_records", None)) or callable(getattr(valor, "worksheet", None)):
+            return ClienteLimitado(valor, self._limitador)
+        return valor
+
+    def __getattr__(self, nome):
+        valor = getattr(self._alvo, nome)
+        if not callable(valor):
+            return self._envolver(valor)
+
+        def chamada_limitada(*args, **kwargs):
+            chave = None
+            if nome in JUNTAVEIS:
+                # Mesma aba/planilha (pelo id), mesmo método e mesmos argumentos
+                chave = (getattr(self._alvo, "id", None), nome, repr(args), repr(sorted(kwargs.items())))
+            try:
+                return self._envolver(self._limitador.executar(chave, lambda: valor(*args, **kwargs)))
+            finally:
+                if nome not in LEITURAS:
+                    self._limitador.descartar_voos()
+
+        return chamada_limitada
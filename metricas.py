@@ -0,0 +1,233 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Quantas medições recentes de cada operação entram no cálculo dos percentis
+AMOSTRAS_POR_OPERACAO = 1000
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por interpolação linear; None sem valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    abaixo = int(posicao)
+    acima = min(abaixo + 1, len(ordenados) - 1)
+    return ordenados[abaixo] + (ordenados[acima] - ordenados[abaixo]) * (posicao - abaixo)
+
+
+class Metricas:
+    """Contadores e tempos do processo: chamadas à API, cache e execuções das páginas.
+
+    As chamadas à API são registradas como "api", as execuções das páginas
+    como "pagina" e os resultados do cache de dados com contar("cache", ...).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.iniciado_em = time.time()
+        self.tempos = {}
+        self.totais = Counter()
+        self.erros = Counter()
+        self.contadores = Counter()
+        self.chamadas_recentes = deque()
+
+    def registrar(self, tipo, nome, duracao, erro=None):
+        with self.lock:
+            chave = (tipo, nome)
+            self.tempos.setdefault(chave, deque(maxlen=AMOSTRAS_POR_OPERACAO)).append(duracao)
+            self.totais[chave] += 1
+            if erro is not None:
+                self.erros[(tipo, nome, erro)] += 1
+            if tipo == "api":
+                agora = time.time()
+                self.chamadas_recentes.append(agora)
+                while self.chamadas_recentes and self.chamadas_recentes[0] < agora - 60:
+                    self.chamadas_recentes.popleft()
+
+    def contar(self, grupo, resultado):
+        with self.lock:
+            self.contadores[(grupo, resultado)] += 1
+
+    def chamadas_por_minuto(self):
+        with self.lock:
+            limite = time.time() - 60
+            return sum(1 for instante in self.chamadas_recentes if instante >= limite)
+
+    def resumo(self, tipo):
+        """[{nome, total, erros, p50, p95, max}] das operações de um tipo, em segundos."""
+        with self.lock:
+            linhas = []
+            for (tipo_registro, nome), amostras in self.tempos.items():
+                if tipo_registro != tipo:
+                    continue
+                amostras = list(amostras)
+                linhas.append({
+                    "nome": nome, "total": self.totais[(tipo, nome)],
+                    "erros": sum(n for (t, o, _), n in self.erros.items() if t == tipo and o == nome),
+                    "p50": percentil(amostras, 50), "p95": percentil(amostras, 95), "max": max(amostras),
+                })
+        return sorted(linhas, key=lambda linha: linha["total"], reverse=True)
+
+    def contagens(self, grupo):
+        """{resultado: quantidade} de um grupo de contadores."""
+        with self.lock:
+            return {r: n for (g, r), n in self.contadores.items() if g == grupo}
+
+    def taxa_acerto(self, grupo):
+        """Fração das leituras do grupo atendidas sem esperar pelo backend (None sem leituras)."""
+        por_resultado = self.contagens(grupo)
+        total = sum(por_resultado.values())
+        # "obsoleto": servido na hora enquanto a atualização corre em segundo plano
+        return (por_resultado.get("acerto", 0) + por_resultado.get("obsoleto", 0)) / total if total else None
+
+    def texto_prometheus(self):
+        """Métricas no formato texto do Prometheus."""
+        linhas = [
+            "# HELP conso_api_chamadas_total Chamadas à API do Google por método.",
+            "# TYPE conso_api_chamadas_total counter",
+        ]
+        with self.lock:
+            totais = dict(self.totais)
+            erros = dict(self.erros)
+            contadores = dict(self.contadores)
+        for (tipo, nome), total in sorted(totais.items()):
+            if tipo == "api":
+                linhas.append(f'conso_api_chamadas_total{{metodo="{nome}"}} {total}')
+        linhas += ["# HELP conso_api_erros_total Chamadas à API que falharam, por método e tipo de erro.",
+                   "# TYPE conso_api_erros_total counter"]
+        for (tipo, nome, erro), total in sorted(erros.items()):
+            if tipo == "api":
+                linhas.append(f'conso_api_erros_total{{metodo="{nome}",erro="{erro}"}} {total}')
+        for tipo, metrica, ajuda, rotulo in (
+                ("api", "conso_api_latencia_segundos", "Latência das chamadas à API.", "metodo"),
+                ("pagina", "conso_pagina_execucao_segundos", "Tempo de cada execução (rerun) da página.", "pagina")):
+            linhas += [f"# HELP {metrica} {ajuda}", f"# TYPE {metrica} summary"]
+            for linha in self.resumo(tipo):
+                for quantil, chave in (("0.5", "p50"), ("0.95", "p95")):
+                    linhas.append(f'{metrica}{{{rotulo}="{linha["nome"]}",quantile="{quantil}"}} {linha[chave]:.6f}')
+                linhas.append(f'{metrica}_count{{{rotulo}="{linha["nome"]}"}} {linha["total"]}')
+        linhas += ["# HELP conso_api_chamadas_por_minuto Chamadas à API nos últimos 60 segundos.",
+                   "# TYPE conso_api_chamadas_por_minuto gauge",
+                   f"conso_api_chamadas_por_minuto {self.chamadas_por_minuto()}",
+                   "# HELP conso_cache_leituras_total Leituras do cache de dados por resultado.",
+                   "# TYPE conso_cache_leituras_total counter"]
+        for (grupo, resultado), total in sorted(contadores.items()):
+            if grupo != "limitador":
+                linhas.append(f'conso_cache_leituras_total{{cache="{grupo}",resultado="{resultado}"}} {total}')
+        linhas += ["# HELP conso_api_limitador_total Chamadas juntadas a outra igual (coalescida) ou que "
+                   "esperaram por cota (enfileirada).",
+                   "# TYPE conso_api_limitador_total counter"]
+        for (grupo, resultado), total in sorted(contadores.items()):
+            if grupo == "limitador":
+                linhas.append(f'conso_api_limitador_total{{resultado="{resultado}"}} {total}')
+        return "\n".join(linhas) + "\n"
+
+    def gravar_prometheus(self, caminho):
+        """Grava o texto do Prometheus (ex.: para o textfile collector do node_exporter)."""
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            arquivo.write(self.texto_prometheus())
+        os.replace(temporario, caminho)
+
+    def iniciar_exportacao(self, caminho=None, intervalo=15.0, porta=None):
+        """Grava o arquivo a cada `intervalo` segundos e/ou serve /metrics na `porta`."""
+        if caminho:
+            def gravar_periodicamente():
+                while True:
+                    try:
+                        self.gravar_prometheus(caminho)
+                    except OSError as e:
+                        logger.warning("Não foi possível gravar as métricas em %s: %s", caminho, e)
+                    time.sleep(intervalo)
+
+            threading.Thread(target=gravar_periodicamente, name="metricas-arquivo", daemon=True).start()
+        if porta:
+            metricas = self
+
+            class Manipulador(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    corpo = metricas.texto_prometheus().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(corpo)))
+                    self.end_headers()
+                    self.wfile.write(corpo)
+
+                def log_message(self, *args):
+                    pass
+
+            try:
+                servidor = ThreadingHTTPServer(("0.0.0.0", int(porta)), Manipulador)
+            except OSError as e:
+                logger.warning("Não foi possível abrir a porta %s para as métricas: %s", porta, e)
+            else:
+                threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+        return self
+
+
+def _tipo_erro(erro):
+    resposta = getattr(erro, "response", None)
+    codigo = getattr(resposta, "status_code", None)
+    return str(codigo) if codigo else type(erro).__name__
+
+
+class ClienteInstrumentado:
+    """Envolve uma aba (ou planilha) do gspread medindo cada chamada de método.
+
+    Atributos que não são métodos passam direto; abas e planilhas devolvidas
+    (ex.: worksheet.spreadsheet, spreadsheet.worksheet("...")) também são
+    envolvidas, para que toda chamada à API seja contada.
+    """
+
+    def __init__(self, alvo, metricas):
+        self._alvo = alvo
+        self._metricas = metricas
+
+    def _envolver(self, valor):
+        # Abas têm get_all_records e planilhas têm worksheet (vale também para a planilha falsa)
+        if callable(getattr(valor, "get_all_records", None)) or callable(getattr(valor, "worksheet", None)):
+            return ClienteInstrumentado(valor, self._metricas)
+        return valor
+
+    def __getattr__(self, nome):
+        valor = getattr(self._alvo, nome)
+        if not callable(valor):
+            return self._envolver(valor)
+
+        def chamada_medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = valor(*args, **kwargs)
+            except Exception as e:
+                self._metricas.registrar("api", nome, time.perf_counter() - inicio, _tipo_erro(e))
+                raise
+            self._metricas.registrar("api", nome, time.perf_counter() - inicio)
+            return self._envolver(resultado)
+
+        return chamada_medida
+
+
+class CronometroPagina:
+    """Mede uma execução (rerun) de página: crie no início do script e chame encerrar() no fim.
+
+    Só a primeira chamada a encerrar() conta.
+    """
+
+    def __init__(self, metricas, pagina):
+        self.metricas = metricas
+        self.pagina = pagina
+        self.inicio = time.perf_counter()
+        self.encerrado = False
+
+    def encerrar(self):
+        if self.encerrado:
+            return
+        self.encerrado = True
+        self.metricas.registrar("pagina", self.pagina, time.perf_counter() - self.inicio)
@@ -0,0 +1,81 @@
+import streamlit as st
+import pandas as pd
+from utils import medir_pagina, obter_limitador, obter_metricas, situacao_fila
+
+# Tempo de cada execução da página (métricas)
+cronometro = medir_pagina("metricas_admin")
+
+hide_streamlit_style = """
+    <style>
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+    [data-testid="stToolbar"] {visibility: hidden;}
+    </style>
+"""
+st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+
+
+st.set_page_config(layout="wide", page_title="Métricas do App")
+
+st.title("📈 Métricas do App (administração)")
+st.caption("Números deste processo desde a última reinicialização.")
+
+# Cota de leitura da API do Sheets por usuário por minuto (ajuste conforme o projeto)
+COTA_POR_MINUTO = 60
+
+metricas = obter_metricas()
+
+
+def _tabela(linhas, rotulo):
+    if not linhas:
+        return pd.DataFrame()
+    tabela = pd.DataFrame(linhas).rename(columns={"nome": rotulo, "total": "Chamadas", "erros": "Erros"})
+    for coluna in ("p50", "p95", "max"):
+        tabela[f"{coluna} (ms)"] = (tabela.pop(coluna) * 1000).round(1)
+    return tabela
+
+
+c1, c2, c3, c4 = st.columns(4)
+por_minuto = metricas.chamadas_por_minuto()
+c1.metric("Chamadas à API no último minuto", por_minuto, help=f"Cota de referência: {COTA_POR_MINUTO}/min")
+c2.metric("Uso da cota por minuto", f"{por_minuto / COTA_POR_MINUTO:.0%}")
+taxa = metricas.taxa_acerto("dados")
+c3.metric("Acertos do cache de dados", f"{taxa:.1%}" if taxa is not None else "—")
+fila = situacao_fila()
+c4.metric("Ideias na fila de envio", fila["pendentes"] if fila else "—")
+
+st.subheader("Chamadas à API do Google")
+api = _tabela(metricas.resumo("api"), "Método")
+if api.empty:
+    st.info("Nenhuma chamada à API registrada ainda.")
+else:
+    st.dataframe(api, use_container_width=True, hide_index=True)
+
+st.subheader("Limitador de chamadas à API")
+limitador = obter_limitador()
+if limitador is None:
+    st.info("Limitador desativado.")
+else:
+    situacao = limitador.situacao()
+    l1, l2, l3, l4 = st.columns(4)
+    l1.metric("Chamadas economizadas", situacao["economizadas"],
+              help="Leituras iguais feitas ao mesmo tempo que viraram uma só chamada")
+    l2.metric("Chamadas que esperaram por cota", situacao["enfileiradas"])
+    l3.metric("Na fila agora", situacao["na_fila"])
+    l4.metric("Fichas disponíveis", f"{situacao['fichas']:.1f} / {limitador.capacidade}")
+
+st.subheader("Leituras do cache de dados")
+st.dataframe(pd.Series(metricas.contagens("dados"), name="Leituras", dtype="int64"), use_container_width=True)
+
+st.subheader("Tempo de execução das páginas (por rerun)")
+paginas = _tabela(metricas.resumo("pagina"), "Página")
+if paginas.empty:
+    st.info("Nenhuma execução registrada ainda.")
+else:
+    st.dataframe(paginas.rename(columns={"Chamadas": "Execuções"}), use_container_width=True, hide_index=True)
+
+with st.expander("Formato Prometheus"):
+    st.code(metricas.texto_prometheus(), language="text")
+
+cronometro.encerrar()
@@ -1,12 +1,18 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
+from conexao import ErroConexao
 from utils import (
-    carregar_dados,
-    salvar_ideia,
-    fuso_horario_sp
+    enfileirar_ideia,
+    encontrar_duplicatas,
+    situacao_fila,
+    fuso_horario_sp,
+    medir_pagina,
+    reexecutar
 )
 
+# Tempo de cada execução da página (métricas)
+cronometro = medir_pagina("operadores")
+
 # Configuração da página
 st.set_page_config(layout="centered", page_title="Cadastro de Ideias")
 
@@ -59,28 +65,66 @@ with st.form("form_ideia", clear_on_submit=True):
 
     enviar = st.form_submit_button("🚀 Enviar Minha Ideia")
 
+
+
+def registrar_ideia(nova_ideia):
+    """Envia a ideia para a fila (que lhe dá o ID) e agradece ao operador."""
+    try:
+        enfileirar_ideia(nova_ideia)
+    except ErroConexao:
+        st.error("❌ A planilha está indisponível no momento. Tente enviar novamente em instantes.")
+        return
+    st.success("✅ Ideia registrada com sucesso! Agradecemos sua colaboração.")
+    st.balloons()
+
+
 if enviar:
     campos_obrigatorios = [dono_da_ideia, matricula, area_do_operador, nome_da_ideia, descricao_de_problema,
                            descricao_da_solucao]
     if all(campos_obrigatorios):
-
-
-        df_existente = carregar_dados()
-        novo_id = (pd.to_numeric(df_existente['ID'],
-                                 errors='coerce').max() + 1) if not df_existente.empty and 'ID' in df_existente else 1
         data_ideia = datetime.now(fuso_horario_sp).strftime("%d/%m/%Y")
 
-        # Dicionário da nova ideia
+        # Dicionário da nova ideia (o ID é atribuído no envio para a planilha)
         nova_ideia = {
-            "ID": int(novo_id), "Nome da ideia": nome_da_ideia, "Descrição da solução": descricao_da_solucao,
+            "Nome da ideia": nome_da_ideia, "Descrição da solução": descricao_da_solucao,
             "Descrição de problema": descricao_de_problema, "Área": area_aplicacao, "Local": local_aplicacao,
             "Dono da ideia": dono_da_ideia, "Matrícula": matricula, "Área do operador": area_do_operador,
             "Turno do operador que deu a ideia": turno_do_operador, "Data ideia": data_ideia,
             "Status": "Nova"
         }
 
-        salvar_ideia(nova_ideia)
-        st.success("✅ Ideia registrada com sucesso! Agradecemos sua colaboração.")
-        st.balloons()
+        # Antes de salvar, procura ideias já registradas com problema/solução parecidos
+        parecidas = encontrar_duplicatas(descricao_de_problema, descricao_da_solucao)
+        if parecidas:
+            st.session_state["ideia_pendente"] = nova_ideia
+            st.session_state["ideias_parecidas"] = parecidas
+        else:
+            registrar_ideia(nova_ideia)
     else:
         st.warning("⚠️ Por favor, preencha todos os campos marcados com *.")
+
+# Confirmação quando a ideia parece repetida
+if "ideia_pendente" in st.session_state:
+    st.warning("🔁 Encontramos ideias parecidas já registradas. Confira antes de enviar:")
+    for id_parecida, nome_parecida, similaridade in st.session_state["ideias_parecidas"]:
+        st.write(f"- **{id_parecida} - {nome_parecida}** ({similaridade:.0%} parecida)")
+    col_enviar, col_cancelar = st.columns(2)
+    if col_enviar.button("🚀 Enviar mesmo assim"):
+        registrar_ideia(st.session_state.pop("ideia_pendente"))
+        st.session_state.pop("ideias_parecidas", None)
+    elif col_cancelar.button("✖️ Cancelar envio"):
+        st.session_state.pop("ideia_pendente")
+        st.session_state.pop("ideias_parecidas", None)
+        reexecutar()
+
+# Situação da fila de envio para a planilha
+situacao = situacao_fila()
+if situacao and situacao["pendentes"]:
+    aviso = f"⏳ {situacao['pendentes']} ideia(s) aguardando envio para a planilha."
+    if situacao["ultimo_erro"]:
+        aviso += " A planilha está ocupada; o envio será tentado novamente em instantes."
+    st.caption(aviso)
+elif situacao:
+    st.caption(f"✔️ Todas as ideias foram enviadas ({situacao['enviados']} recentes).")
+
+cronometro.encerrar()
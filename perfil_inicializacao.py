@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+PAGINAS = ["operadores.py", "ideias.py", "consulta_.py", "analises.py", "metricas_admin.py"]
+# Módulos caros de importar que uma página só deveria carregar quando precisa deles
+PESADOS = ["pandas", "numpy", "pyarrow", "gspread", "google.oauth2", "openpyxl"]
+
+# Roda a página em modo "bare" (sem servidor), como a primeira execução de um processo novo
+_CODIGO = """
+import logging, runpy, sys, time
+sys.path.insert(0, {raiz!r})
+logging.disable(logging.WARNING)
+sys.stderr.write("PERFIL_INICIO\\n")
+sys.stderr.flush()
+inicio = time.perf_counter()
+runpy.run_path({pagina!r}, run_name="__main__")
+sys.stderr.write("PERFIL_TOTAL %f\\n" % (time.perf_counter() - inicio))
+sys.stderr.write("PERFIL_PESADOS %s\\n" % ",".join(m for m in {pesados!r} if m in sys.modules))
+"""
+
+# Linhas do -X importtime: "import time: <próprio µs> | <acumulado µs> | <recuo><módulo>"
+_LINHA_IMPORTACAO = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def perfilar(pagina, maiores=8):
+    """Executa a página num processo Python novo e mede o tempo total e o das importações."""
+    codigo = _CODIGO.format(raiz=RAIZ, pagina=os.path.join(RAIZ, pagina), pesados=PESADOS)
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True)
+    primeiro_nivel, total, pesados, iniciada = [], None, None, False
+    for linha in processo.stderr.splitlines():
+        encontrada = _LINHA_IMPORTACAO.match(linha)
+        # Só contam as importações feitas pela página, não as da partida do interpretador
+        if linha == "PERFIL_INICIO":
+            iniciada = True
+        elif encontrada and iniciada and len(encontrada.group(3)) == 1:
+            primeiro_nivel.append((int(encontrada.group(2)) / 1000, encontrada.group(4)))
+        elif linha.startswith("PERFIL_TOTAL "):
+            total = float(linha.split()[1]) * 1000
+        elif linha.startswith("PERFIL_PESADOS"):
+            pesados = [m for m in linha.split(" ", 1)[1].strip().split(",") if m]
+    primeiro_nivel.sort(reverse=True)
+    return {
+        "pagina": pagina,
+        "total_ms": round(total, 1) if total is not None else None,
+        "importacoes_ms": round(sum(ms for ms, _ in primeiro_nivel), 1),
+        "maiores": [{"modulo": nome, "ms": round(ms, 1)} for ms, nome in primeiro_nivel[:maiores]],
+        "pesados": pesados,
+        "erro": None if total is not None else (processo.stderr.strip().splitlines() or ["?"])[-1],
+    }
+
+
+def _imprimir(perfis):
+    print(f"{'página':<20} {'total (ms)':>11} {'importações (ms)':>17}  pesados carregados")
+    for perfil in perfis:
+        if perfil["erro"]:
+            print(f"{perfil['pagina']:<20} falhou: {perfil['erro']}")
+            continue
+        print(f"{perfil['pagina']:<20} {perfil['total_ms']:>11.1f} {perfil['importacoes_ms']:>17.1f}  "
+              f"{', '.join(perfil['pesados']) or '—'}")
+        print("    " + ", ".join(f"{m['modulo']} {m['ms']:.0f}" for m in perfil["maiores"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Perfil da partida das páginas: tempo da primeira execução e das importações, "
+                    "cada página num processo novo.")
+    parser.add_argument("paginas", nargs="*", default=PAGINAS)
+    parser.add_argument("--maiores", type=int, default=8, help="quantos módulos mais lentos listar por página")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    perfis = [perfilar(pagina, args.maiores) for pagina in args.paginas]
+    if args.json:
+        print(json.dumps(perfis, ensure_ascii=False, indent=2))
+    else:
+        _imprimir(perfis)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# Planilha Google simulada (em memória) para medir o app sem rede nem cota da API
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, numericise_all, rowcol_to_a1
+
+from esquema import formatar_moeda, get_column_order
+
+AREAS = ["Cobre", "Zinco", "Refino", "Digestão", "Nitrocelulose", "Laboratório", "Manutenção", "Produção"]
+LOCAIS = ["Área Ácida", "Lixiviação", "Preparação", "Extração Química", "Planta de Soluções"]
+STATUS = ["Nova", "Em análise", "Aprovada", "Em implementação", "Concluída", "Rejeitada"]
+METODOLOGIAS = ["Green Belt", "Kaizen", "PDCA", "Yellow Belt"]
+TURNOS = ["1", "2", "3", "A", "ADM", "B"]
+PALAVRAS = ["vazamento", "bomba", "válvula", "tanque", "ácido", "filtro", "motor", "correia", "sensor",
+            "temperatura", "pressão", "limpeza", "segurança", "energia", "água", "vapor", "reator", "painel"]
+
+
+class _RespostaCota:
+    """Resposta HTTP mínima para montar um APIError 429 como o do gspread."""
+
+    status_code = 429
+    text = "Quota exceeded"
+
+    def json(self):
+        return {"error": {"code": 429, "message": "Quota exceeded for quota metric 'Read requests'",
+                          "status": "RESOURCE_EXHAUSTED"}}
+
+
+class _Celula:
+    def __init__(self, valor):
+        self.value = valor
+
+
+def linha_aleatoria(id_ideia, gerador):
+    """Uma ideia com valores plausíveis, já no formato de texto da planilha."""
+    data = datetime(2022, 1, 1) + timedelta(days=gerador.randrange(1000))
+    status = gerador.choice(STATUS)
+    concluida = status == "Concluída"
+
+    def texto(palavras):
+        return " ".join(gerador.choice(PALAVRAS) for _ in range(palavras))
+
+    valores = {
+        "ID": str(id_ideia), "Nome da ideia": f"Ideia {id_ideia} {texto(2)}",
+        "Descrição da solução": texto(12), "Descrição de problema": texto(12),
+        "Área": gerador.choice(AREAS), "Local": gerador.choice(LOCAIS), "BL": "EQ",
+        "Unidade": gerador.choice(["CL", "SMP"]), "Dono da ideia": f"Operador {gerador.randrange(500)}",
+        "Matrícula": str(gerador.randrange(1000, 1500)), "Área do operador": gerador.choice(AREAS),
+        "Turno do operador que deu a ideia": gerador.choice(TURNOS), "Data ideia": data.strftime("%d/%m/%Y"),
+        "Metodologia": gerador.choice(METODOLOGIAS), "Líder": f"Líder {gerador.randrange(30)}", "Equipe": "",
+        "Status": status, "Observações": "",
+        "Data conclusão": (data + timedelta(days=gerador.randrange(10, 200))).strftime("%d/%m/%Y") if concluida else "",
+        "Investimento": formatar_moeda(gerador.randrange(0, 50000)) if gerador.random() < 0.5 else "",
+        "Ganho financeiro": formatar_moeda(gerador.randrange(0, 200000)) if concluida else "",
+        "Link": "", "Apresentou em alguma rotina?": gerador.choice(["Sim", "Não"]), "Versão": "",
+    }
+    return [valores[coluna] for coluna in get_column_order()]
+
+
+class AbaFalsa:
+    """Aba simulada (gspread.Worksheet) guardada em memória."""
+
+    def __init__(self, planilha, titulo, linhas, id_aba):
+        self.spreadsheet = planilha
+        self.title = titulo
+        self.id = id_aba
+        self._linhas = [list(map(str, linha)) for linha in linhas]
+
+    def _chamada(self, nome):
+        self.spreadsheet._chamada(nome)
+
+    def _grade(self, intervalo):
+        grade = a1_range_to_grid_range(intervalo.split("!")[-1])
+        return (grade.get("startRowIndex", 0), grade.get("endRowIndex", len(self._linhas)),
+                grade.get("startColumnIndex", 0), grade.get("endColumnIndex"))
+
+    def get_all_records(self, **kwargs):
+        self._chamada("get_all_records")
+        with self.spreadsheet.lock:
+            if not self._linhas:
+                return []
+            cabecalho = self._linhas[0]
+            return [dict(zip(cabecalho, numericise_all(linha))) for linha in self._linhas[1:]]
+
+    def get_values(self, intervalo=None, **kwargs):
+        self._chamada("get_values")
+        with self.spreadsheet.lock:
+            if intervalo is None:
+                return [list(linha) for linha in self._linhas]
+            r0, r1, c0, c1 = self._grade(intervalo)
+            return [linha[c0:c1] for linha in self._linhas[r0:r1]]
+
+    def batch_get(self, intervalos, **kwargs):
+        self._chamada("batch_get")
+        with self.spreadsheet.lock:
+            resultado = []
+            for intervalo in intervalos:
+                r0, r1, c0, c1 = self._grade(intervalo)
+                valores = [linha[c0:c1] for linha in self._linhas[r0:r1]]
+                # Como a API: sem células vazias no fim de cada linha nem linhas vazias no fim
+                valores = [v[:max((i + 1 for i, x in enumerate(v) if x != ""), default=0)] for v in valores]
+                while valores and not valores[-1]:
+                    valores.pop()
+                resultado.append(valores)
+            return resultado
+
+    def row_values(self, linha, **kwargs):
+        self._chamada("row_values")
+        with self.spreadsheet.lock:
+            return list(self._linhas[linha - 1]) if linha <= len(self._linhas) else []
+
+    def col_values(self, coluna, **kwargs):
+        self._chamada("col_values")
+        with self.spreadsheet.lock:
+            return [linha[coluna - 1] if coluna <= len(linha) else "" for linha in self._linhas]
+
+    def cell(self, linha, coluna, **kwargs):
+        self._chamada("cell")
+        with self.spreadsheet.lock:
+            valores = self._linhas[linha - 1] if linha <= len(self._linhas) else []
+            return _Celula(valores[coluna - 1] if coluna <= len(valores) else "")
+
+    def append_row(self, valores, **kwargs):
+        return self.append_rows([valores], _nome="append_row")
+
+    def append_rows(self, linhas, _nome="append_rows", **kwargs):
+        self._chamada(_nome)
+        with self.spreadsheet.lock:
+            inicio = len(self._linhas) + 1
+            self._linhas.extend([["" if v is None else str(v) for v in linha] for linha in linhas])
+            self.spreadsheet._modificada()
+            return {"updates": {"updatedRange": f"'{self.title}'!A{inicio}:B{len(self._linhas)}"}}
+
+    def update(self, intervalo, valores, _nome="update", **kwargs):
+        if _nome:
+            self._chamada(_nome)
+        with self.spreadsheet.lock:
+            r0, _, c0, _ = self._grade(intervalo)
+            for deslocamento, linha in enumerate(valores):
+                while len(self._linhas) <= r0 + deslocamento:
+                    self._linhas.append([])
+                atual = self._linhas[r0 + deslocamento]
+                atual.extend([""] * (c0 + len(linha) - len(atual)))
+                atual[c0:c0 + len(linha)] = ["" if v is None else str(v) for v in linha]
+            self.spreadsheet._modificada()
+
+    def batch_update(self, dados, **kwargs):
+        self._chamada("batch_update")
+        with self.spreadsheet.lock:
+            for intervalo in dados:
+                self.update(intervalo["range"], intervalo["values"], _nome=None)
+
+    def update_cell(self, linha, coluna, valor):
+        self.update(rowcol_to_a1(linha, coluna), [[valor]], _nome="update_cell")
+
+    def delete_rows(self, inicio, fim=None):
+        self._chamada("delete_rows")
+        with self.spreadsheet.lock:
+            del self._linhas[inicio - 1:(fim or inicio)]
+            self.spreadsheet._modificada()
+
+
+class PlanilhaFalsa:
+    """Planilha simulada (gspread.Spreadsheet) com latência e erros 429 configuráveis.
+
+    `latencia` é o tempo (s) de cada chamada; `prob_429` a chance de uma
+    chamada falhar com o erro de cota. `chamadas` conta as chamadas por método.
+    """
+
+    def __init__(self, latencia=0.0, prob_429=0.0, semente=0):
+        self.latencia = latencia
+        self.prob_429 = prob_429
+        self.chamadas = Counter()
+        self.erros_429 = 0
+        self.lock = threading.RLock()
+        self._abas = {}
+        self._gerador = random.Random(semente)
+        self._atualizada_em = datetime.now(timezone.utc)
+
+    def _chamada(self, nome):
+        with self.lock:
+            self.chamadas[nome] += 1
+            falhar = self.prob_429 and self._gerador.random() < self.prob_429
+            if falhar:
+                self.erros_429 += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        if falhar:
+            raise APIError(_RespostaCota())
+
+    def _modificada(self):
+        # Cada escrita avança o relógio, como a data de modificação do Drive
+        self._atualizada_em = max(datetime.now(timezone.utc), self._atualizada_em + timedelta(microseconds=1))
+
+    def get_lastUpdateTime(self):
+        self._chamada("get_lastUpdateTime")
+        return self._atualizada_em.isoformat()
+
+    def worksheet(self, titulo):
+        try:
+            return self._abas[titulo]
+        except KeyError:
+            raise WorksheetNotFound(titulo) from None
+
+    def add_worksheet(self, titulo, rows=1000, cols=26, **kwargs):
+        self._chamada("add_worksheet")
+        with self.lock:
+            aba = AbaFalsa(self, titulo, [], len(self._abas))
+            self._abas[titulo] = aba
+            return aba
+
+    def batch_update(self, corpo):
+        self._chamada("batch_update")
+        with self.lock:
+            por_id = {aba.id: aba for aba in self._abas.values()}
+            for requisicao in corpo.get("requests", []):
+                intervalo = requisicao["deleteDimension"]["range"]
+                del por_id[intervalo["sheetId"]]._linhas[intervalo["startIndex"]:intervalo["endIndex"]]
+            self._modificada()
+        return {}
+
+    def total_chamadas(self):
+        return sum(self.chamadas.values())
+
+
+def criar_aba_ideias(total_linhas, latencia=0.0, prob_429=0.0, semente=0):
+    """Cria uma planilha falsa com a aba "Ideias" preenchida com `total_linhas` ideias."""
+    planilha = PlanilhaFalsa(latencia=latencia, prob_429=prob_429, semente=semente)
+    gerador = random.Random(semente)
+    linhas = [get_column_order()] + [linha_aleatoria(i, gerador) for i in range(1, total_linhas + 1)]
+    aba = AbaFalsa(planilha, "Ideias", linhas, 0)
+    planilha._abas["Ideias"] = aba
+    return aba
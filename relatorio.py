@@ -0,0 +1,75 @@
+import argparse
+import logging
+import os
+import sys
+
+from conexao import ErroConexao
+from dados_ideias import (CAMINHO_CONFIGURACAO, DIMENSOES_RELATORIO, FonteIdeias, agregar, filtrar,
+                          ler_configuracao, ler_credenciais)
+from exportacao import FORMATOS_EXPORTACAO, exportar
+
+# Extensão -> formato de exportacao.exportar()
+FORMATO_POR_EXTENSAO = {extensao: formato for formato, (extensao, _) in FORMATOS_EXPORTACAO.items()}
+
+
+def _mes(texto):
+    if len(texto) != 7 or texto[4] != "-" or not (texto[:4] + texto[5:]).isdigit() or not 1 <= int(texto[5:]) <= 12:
+        raise argparse.ArgumentTypeError(f"mês inválido: {texto} (use AAAA-MM)")
+    return texto
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Relatório das ideias sem o Streamlit: filtra, agrega e grava em CSV ou Excel.")
+    parser.add_argument("--config", default=CAMINHO_CONFIGURACAO,
+                        help="arquivo no formato do secrets.toml do app (seções [armazenamento] e [relatorio])")
+    parser.add_argument("--credenciais", help="JSON da conta de serviço (padrão: variável CONSO_CREDENCIAIS, "
+                                              "GOOGLE_APPLICATION_CREDENTIALS ou [gcp_service_account])")
+    parser.add_argument("--status", nargs="+", action="extend")
+    parser.add_argument("--area", nargs="+", action="extend")
+    parser.add_argument("--matricula", nargs="+", action="extend")
+    parser.add_argument("--de", type=_mes, help="mês inicial da data da ideia (AAAA-MM)")
+    parser.add_argument("--ate", type=_mes, help="mês final da data da ideia (AAAA-MM)")
+    parser.add_argument("--agrupar-por", nargs="+", choices=sorted(DIMENSOES_RELATORIO), default=[],
+                        help="agrega (ideias, ganho, investimento, ROI) em vez de listar as ideias")
+    parser.add_argument("--colunas", nargs="+", help="colunas das ideias listadas (padrão: todas)")
+    parser.add_argument("--incluir-arquivo", action="store_true", help="inclui as ideias arquivadas")
+    parser.add_argument("--saida", help="arquivo .csv ou .xlsx (padrão: CSV na saída padrão)")
+    parser.add_argument("--cache", help="cache em disco (padrão: relatorio_cache.arrow; \"\" desativa)")
+    parser.add_argument("--idade-maxima", type=float,
+                        help="segundos em que o cache é usado sem consultar a planilha (padrão: 3600)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    configuracao = ler_configuracao(args.config)
+    config_relatorio = configuracao.get("relatorio", {})
+    fonte = FonteIdeias(
+        configuracao, ler_credenciais(configuracao, args.credenciais),
+        args.cache if args.cache is not None else config_relatorio.get("caminho_cache", "relatorio_cache.arrow"),
+        args.idade_maxima if args.idade_maxima is not None else float(config_relatorio.get("idade_maxima", 3600)))
+
+    try:
+        df = fonte.ideias(args.incluir_arquivo)
+    except ErroConexao as e:
+        parser.exit(1, f"Não foi possível ler as ideias: {e}\n")
+    df = filtrar(df, args.status, args.area, args.matricula, args.de, args.ate)
+    if args.agrupar_por:
+        df = agregar(df, args.agrupar_por)
+    elif args.colunas:
+        desconhecidas = [coluna for coluna in args.colunas if coluna not in df.columns]
+        if desconhecidas:
+            parser.error(f"colunas desconhecidas: {', '.join(desconhecidas)}")
+        df = df[args.colunas]
+
+    print(f"{len(df)} linhas ({', '.join(f'{p}: {o}' for p, o in fonte.origem.items())})", file=sys.stderr)
+    if not args.saida:
+        df.to_csv(sys.stdout, sep=";", decimal=",", date_format="%d/%m/%Y", index=False)
+        return
+    extensao = os.path.splitext(args.saida)[1].lstrip(".").lower()
+    if extensao not in FORMATO_POR_EXTENSAO:
+        parser.error(f"extensão não suportada: .{extensao} (use {', '.join(sorted(FORMATO_POR_EXTENSAO))})")
+    exportar(df, FORMATO_POR_EXTENSAO[extensao], args.saida)
+
+
+if __name__ == "__main__":
+    main()
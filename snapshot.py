@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _tabela(df, versao, colunas):
+    """Tabela Arrow do DataFrame com a versão dos dados e as colunas nos metadados."""
+    import pyarrow as pa
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[b"conso_ideias"] = json.dumps(
+        {"versao": versao, "gravado_em": time.time(), "colunas": list(colunas)}, default=str).encode("utf-8")
+    return tabela.replace_schema_metadata(metadados)
+
+
+def _dataframe(tabela, colunas):
+    """(DataFrame, versão, gravado_em) de uma tabela gravada por _tabela(); ValueError se não confere."""
+    info = json.loads(tabela.schema.metadata[b"conso_ideias"])
+    if info.get("colunas") != list(colunas):
+        raise ValueError("colunas diferentes das atuais")
+    return tabela.to_pandas(), info.get("versao"), info.get("gravado_em")
+
+
+def serializar_dataframe(df, versao, colunas):
+    """DataFrame em bytes (formato Arrow IPC), com a versão dos dados."""
+    import pyarrow as pa
+
+    tabela = _tabela(df, versao, colunas)
+    destino = pa.BufferOutputStream()
+    with pa.ipc.new_file(destino, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return destino.getvalue().to_pybytes()
+
+
+def desserializar_dataframe(conteudo, colunas):
+    """Inverso de serializar_dataframe(): (DataFrame, versão, gravado_em)."""
+    import pyarrow as pa
+
+    return _dataframe(pa.ipc.open_file(pa.py_buffer(conteudo)).read_all(), colunas)
+
+
+def salvar_snapshot(df, versao, caminho, colunas):
+    """Grava o DataFrame em formato Arrow (IPC) com a versão dos dados nos metadados.
+
+    O arquivo é gravado sem compressão para poder ser lido com mapeamento de
+    memória, e substituído de forma atômica.
+    """
+    import pyarrow as pa
+
+    tabela = _tabela(df, versao, colunas)
+    temporario = f"{caminho}.tmp"
+    with pa.OSFile(temporario, "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+
+def carregar_snapshot(caminho, colunas, mapear_memoria=True):
+    """Lê o snapshot: (DataFrame, versão, gravado_em) ou None se não houver um válido."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    if not os.path.exists(caminho):
+        return None
+    try:
+        fonte = pa.memory_map(caminho, "r") if mapear_memoria else pa.OSFile(caminho, "rb")
+        with fonte:
+            tabela = pa.ipc.open_file(fonte).read_all()
+        return _dataframe(tabela, colunas)
+    except Exception as e:
+        logger.warning("Snapshot em %s ignorado: %s", caminho, e)
+        return None
+
+
+class GravadorSnapshot:
+    """Grava o snapshot numa thread em segundo plano, no máximo uma vez a cada `intervalo` segundos.
+
+    agendar() só avisa que os dados mudaram; várias mudanças seguidas viram
+    uma única gravação, feita com o estado devolvido por `obter_estado()`
+    ((DataFrame, versão)) no momento da gravação.
+    """
+
+    def __init__(self, caminho, colunas, obter_estado, intervalo=5.0):
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        self.obter_estado = obter_estado
+        self.intervalo = intervalo
+        self.gravado_em = 0.0
+        self._pendente = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def agendar(self):
+        self._pendente.set()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._laco, name="gravador-snapshot", daemon=True)
+                self._thread.start()
+
+    def _laco(self):
+        while True:
+            self._pendente.wait()
+            espera = self.gravado_em + self.intervalo - time.time()
+            if espera > 0:
+                time.sleep(espera)
+            self._pendente.clear()
+            df, versao = self.obter_estado()
+            if df is None:
+                continue
+            try:
+                salvar_snapshot(df, versao, self.caminho, self.colunas)
+            except Exception as e:
+                logger.warning("Não foi possível gravar o snapshot em %s: %s", self.caminho, e)
+            self.gravado_em = time.time()
@@ -0,0 +1,23 @@
+import importlib
+
+
+class ModuloSobDemanda:
+    """Módulo importado só no primeiro acesso a um atributo (ex.: pd = ModuloSobDemanda("pandas")).
+
+    Deixa pandas e numpy fora da partida das páginas que não precisam deles
+    para desenhar a tela (o formulário dos operadores só os usa no envio).
+    Cada atributo lido é guardado na instância, então os acessos seguintes
+    custam o mesmo que num módulo comum.
+    """
+
+    def __init__(self, nome):
+        self._nome = nome
+
+    def __getattr__(self, atributo):
+        # import_module já é seguro entre threads (trava de importação por módulo)
+        valor = getattr(importlib.import_module(self._nome), atributo)
+        setattr(self, atributo, valor)
+        return valor
+
+    def __repr__(self):
+        return f"<módulo {self._nome} sob demanda>"
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def planilha(tmp_path, monkeypatch):
+    """O app (utils) falando com uma planilha falsa de 10 ideias; arquivos locais vão para tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    import streamlit as st
+
+    import utils
+    from armazenamento import BackendPlanilha
+    from esquema import get_column_order
+    from planilha_falsa import criar_aba_ideias
+
+    st.cache_resource.clear()
+    aba = criar_aba_ideias(10)
+    monkeypatch.setattr(utils, "worksheet", aba)
+    monkeypatch.setattr(utils, "backend", BackendPlanilha(aba, get_column_order()))
+    monkeypatch.setattr(utils, "CAMINHO_SNAPSHOT", "")
+    monkeypatch.setattr(utils, "CAMINHO_CACHE_COMPARTILHADO", str(tmp_path / "cache_compartilhado.db"))
+    utils.obter_cache().usar_snapshot = False
+    return aba
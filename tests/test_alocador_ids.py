@@ -0,0 +1,92 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from gspread.exceptions import APIError
+
+import utils
+from alocador_ids import AlocadorIds, SequenciaPlanilha, SequenciaSQLite, abrir_aba_controle
+from planilha_falsa import _RespostaCota, criar_aba_ideias
+
+
+def _um(*_):
+    return 1
+
+
+def _ids_de_um_processo(caminho, quantidade):
+    alocador = AlocadorIds(SequenciaSQLite(caminho, _um, tamanho_bloco=7))
+    ids = [alocador.proximo_id() for _ in range(quantidade)]
+    return ids + alocador.reservar(quantidade)
+
+
+def test_processos_nao_repetem_ids_da_sequencia_sqlite(tmp_path):
+    caminho = str(tmp_path / "ideias.db")
+    with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context("spawn")) as processos:
+        resultados = list(processos.map(_ids_de_um_processo, [caminho] * 4, [30] * 4))
+    ids = [novo_id for resultado in resultados for novo_id in resultado]
+    assert len(ids) == len(set(ids)) == 240
+
+
+def test_threads_nao_repetem_ids_do_mesmo_alocador(tmp_path):
+    alocador = AlocadorIds(SequenciaSQLite(str(tmp_path / "ideias.db"), _um, tamanho_bloco=5))
+
+    def pegar(numero):
+        return [alocador.proximo_id() for _ in range(20)] + alocador.reservar(numero % 7 + 1)
+
+    with ThreadPoolExecutor(8) as threads:
+        ids = [novo_id for lote in threads.map(pegar, range(16)) for novo_id in lote]
+    assert len(ids) == len(set(ids))
+
+
+def test_replicas_nao_repetem_ids_da_aba_de_controle():
+    planilha = criar_aba_ideias(0, latencia=0.002).spreadsheet
+    aba = abrir_aba_controle(planilha, "Sequencia_IDs")
+    SequenciaPlanilha(aba, lambda: 100, 10)
+
+    def replica(_):
+        # Cada réplica tem o próprio alocador, como processos diferentes
+        alocador = AlocadorIds(SequenciaPlanilha(aba, lambda: 100, 10))
+        return [alocador.proximo_id() for _ in range(25)] + alocador.reservar(13)
+
+    with ThreadPoolExecutor(6) as threads:
+        ids = [novo_id for lote in threads.map(replica, range(6)) for novo_id in lote]
+    assert len(ids) == len(set(ids))
+    assert min(ids) == 100
+
+
+def test_bloco_vem_da_aba_de_controle_e_nao_da_configuracao(planilha, monkeypatch):
+    aba = abrir_aba_controle(planilha.spreadsheet, "Sequencia_IDs")
+    primeiro = AlocadorIds(SequenciaPlanilha(aba, lambda: 11, 10))
+    # A configuração mudou para 25 depois de a aba ter sido criada com blocos de 10
+    monkeypatch.setitem(utils.config_armazenamento, "tamanho_bloco_ids", 25)
+    alocador = utils.obter_alocador()
+    assert alocador.tamanho_bloco == 10
+    ids = [primeiro.proximo_id(), utils.proximo_id()] + alocador.reservar(23)
+    assert len(ids) == len(set(ids))
+
+
+def test_formulario_enfileira_sem_chamar_a_planilha_e_o_envio_da_o_id(planilha, monkeypatch):
+    anexar_linhas = utils.backend.anexar_linhas
+    falhas = []
+
+    def falhar_uma_vez(linhas):
+        if not falhas:
+            falhas.append(list(linhas))
+            raise APIError(_RespostaCota())
+        anexar_linhas(linhas)
+
+    monkeypatch.setattr(utils.backend, "anexar_linhas", falhar_uma_vez)
+    chamadas = planilha.spreadsheet.total_chamadas()
+    fila = utils.obter_fila()
+    item = utils.enfileirar_ideia({"Nome da ideia": "Ideia da fila", "Status": "Nova"})
+    assert planilha.spreadsheet.total_chamadas() == chamadas
+    limite = time.time() + 10
+    while not fila.item_enviado(item) and time.time() < limite:
+        fila.proxima_tentativa = 0.0
+        fila._acordar.set()
+        time.sleep(0.05)
+    assert fila.item_enviado(item)
+    ultima = planilha.get_values()[-1]
+    assert ultima[1] == "Ideia da fila"
+    # O reenvio depois do 429 usou o ID dado na primeira tentativa
+    assert ultima[0] == falhas[0][0][0] == "11"
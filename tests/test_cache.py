@@ -0,0 +1,27 @@
+import utils
+
+
+def test_escrita_do_app_nao_esconde_edicao_externa(planilha):
+    df = utils.carregar_dados()
+    assert df.loc[0, "Status"] != "Rejeitada"
+    # Um líder muda a ideia 1 direto na planilha; logo depois o app grava outra ideia
+    planilha.update_cell(2, 17, "Rejeitada")
+    utils.excluir_ideia(1, 2)
+    # A conferência seguinte (vencido o TTL) traz a mudança de fora junto com a do app
+    utils._revalidar(utils.obter_cache())
+    df = utils.carregar_dados()
+    assert df.loc[0, "Status"] == "Rejeitada"
+    assert 2 not in set(df["ID"])
+
+
+def test_escrita_do_app_nao_consulta_a_data_de_modificacao(planilha):
+    utils.carregar_dados()
+    consultas = planilha.spreadsheet.chamadas["get_lastUpdateTime"]
+    utils.salvar_ideia({"ID": 11, "Nome da ideia": "Nova", "Status": "Nova"})
+    posicao, linha = utils.localizar_ideia(3)
+    utils.editar_ideia(posicao, {**utils.registro_como_texto(linha), "Status": "Aprovada"})
+    utils.excluir_ideia(1, 2)
+    assert planilha.spreadsheet.chamadas["get_lastUpdateTime"] == consultas
+    chamadas = planilha.spreadsheet.total_chamadas()
+    utils.carregar_dados()
+    assert planilha.spreadsheet.total_chamadas() == chamadas
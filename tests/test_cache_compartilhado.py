@@ -0,0 +1,36 @@
+import time
+
+import utils
+from cache_compartilhado import CacheCompartilhado
+from esquema import get_column_order
+
+
+def _replica(df):
+    """Um cache local como o de outra réplica, já com dados."""
+    cache = utils.CacheIdeias()
+    cache.definir(df)
+    return cache
+
+
+def test_cada_invalidacao_tem_uma_recarga(tmp_path):
+    compartilhado = CacheCompartilhado(str(tmp_path / "cache.db"), get_column_order())
+    compartilhado.invalidar()
+    assert compartilhado.reivindicar_recarga(1, 300)
+    assert not compartilhado.reivindicar_recarga(1, 300)
+    compartilhado.invalidar()
+    assert compartilhado.reivindicar_recarga(2, 300)
+    assert not compartilhado.reivindicar_recarga(2, 300)
+
+
+def test_segundo_conflito_logo_depois_do_primeiro_e_recarregado(planilha):
+    df = utils.carregar_dados()
+    compartilhado = utils.obter_cache_compartilhado()
+    outra = _replica(df)
+    for _ in range(2):
+        # Duas réplicas escreveram ao mesmo tempo: a cópia comum foi invalidada
+        compartilhado.invalidar()
+        agora = time.time()
+        assert utils._ler_compartilhado(utils.obter_cache(), agora) == "invalidado"
+        assert utils._ler_compartilhado(outra, agora) is None
+        utils._recarregar(utils.obter_cache(), agora)
+        assert utils._ler_compartilhado(outra, agora) == "compartilhado"
@@ -0,0 +1,76 @@
+from gspread.exceptions import APIError
+
+from armazenamento import BackendPlanilha, BackendSQLite
+from esquema import get_column_order
+from planilha_falsa import _RespostaCota, criar_aba_ideias
+
+
+def _backend(tmp_path):
+    aba = criar_aba_ideias(6)
+    espelho = BackendPlanilha(aba, get_column_order())
+    return aba, BackendSQLite(str(tmp_path / "ideias.db"), get_column_order(), espelho=espelho)
+
+
+def _linha(id_ideia):
+    colunas = get_column_order()
+    valores = [""] * len(colunas)
+    valores[colunas.index("ID")] = id_ideia
+    valores[colunas.index("Status")] = "Nova"
+    return valores
+
+
+def _falhar_uma_vez(monkeypatch, alvo, metodo):
+    original = getattr(alvo, metodo)
+    estado = {"falhou": False}
+
+    def talvez_falhar(*args, **kwargs):
+        if not estado["falhou"]:
+            estado["falhou"] = True
+            raise APIError(_RespostaCota())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(alvo, metodo, talvez_falhar)
+
+
+def _planilha(aba):
+    linhas = aba.get_values()
+    return [dict(zip(linhas[0], linha)) for linha in linhas[1:]]
+
+
+def _local(backend):
+    return [{c: str(v) for c, v in registro.items()} for registro in backend.ler_registros()]
+
+
+def test_espelho_segue_pelo_id_apos_falha(tmp_path, monkeypatch):
+    aba, backend = _backend(tmp_path)
+    _falhar_uma_vez(monkeypatch, aba, "append_rows")
+    backend.anexar_linhas([_linha(7)])
+    assert backend.espelho_desatualizado()
+    # A próxima escrita regrava o espelho inteiro em vez de escrever pela posição
+    backend.atualizar_celula(4, "Status", "Excluída")
+    assert not backend.espelho_desatualizado()
+    assert _planilha(aba) == _local(backend)
+    assert _planilha(aba)[4]["Status"] == "Excluída"
+
+
+def test_escrita_no_espelho_localiza_a_linha_pelo_id(tmp_path):
+    aba, backend = _backend(tmp_path)
+    # Uma linha a mais no topo do espelho: as posições não batem mais com as do banco local
+    aba._linhas.insert(1, [str(v) for v in _linha(99)])
+    backend.atualizar_celula(4, "Status", "Excluída")
+    por_id = {linha["ID"]: linha for linha in _planilha(aba)}
+    assert por_id["5"]["Status"] == "Excluída"
+    assert por_id["4"]["Status"] != "Excluída"
+    backend.excluir_linhas([0, 1])
+    assert [linha["ID"] for linha in _planilha(aba)] == ["99", "3", "4", "5", "6"]
+    assert not backend.espelho_desatualizado()
+
+
+def test_espelho_desatualizado_vale_entre_reinicios(tmp_path, monkeypatch):
+    aba, backend = _backend(tmp_path)
+    _falhar_uma_vez(monkeypatch, aba.spreadsheet, "batch_update")
+    backend.excluir_linhas([1])
+    novo = BackendSQLite(backend.caminho, get_column_order(), espelho=BackendPlanilha(aba, get_column_order()))
+    assert novo.espelho_desatualizado()
+    assert novo.sincronizar_espelho()
+    assert _planilha(aba) == _local(novo)
@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from fila_envio import FilaEnvio
+
+
+def test_duas_filas_no_mesmo_arquivo_enviam_cada_item_uma_vez(tmp_path):
+    caminho = str(tmp_path / "fila.db")
+    enviados = []
+    lock = threading.Lock()
+
+    def enviar(linhas):
+        time.sleep(0.05)
+        with lock:
+            enviados.extend(linha[0] for linha in linhas)
+
+    filas = [FilaEnvio(caminho, enviar, tamanho_lote=5) for _ in range(2)]
+    for numero in range(20):
+        filas[0].enfileirar([numero])
+
+    def esvaziar(fila):
+        while fila.descarregar():
+            pass
+
+    threads = [threading.Thread(target=esvaziar, args=(fila,)) for fila in filas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(enviados) == list(range(20))
+    assert filas[1].situacao()["pendentes"] == 0
+
+
+def test_lote_que_falhou_volta_para_a_fila(tmp_path):
+    caminho = str(tmp_path / "fila.db")
+    enviados = []
+
+    def falhar(linhas):
+        raise RuntimeError("429")
+
+    com_erro = FilaEnvio(caminho, falhar)
+    outra = FilaEnvio(caminho, enviados.extend)
+    com_erro.enfileirar(["a"])
+    with pytest.raises(RuntimeError):
+        com_erro.descarregar()
+    assert outra.descarregar() == 1
+    assert enviados == [["a"]]
+
+
+def test_reserva_vencida_libera_o_lote(tmp_path):
+    caminho = str(tmp_path / "fila.db")
+    enviados = []
+    caiu = FilaEnvio(caminho, enviados.extend, prazo_reserva=0.0)
+    caiu.enfileirar(["a"])
+    # Reserva feita por uma réplica que caiu antes de enviar
+    assert len(caiu._reservar_lote()) == 1
+    assert FilaEnvio(caminho, enviados.extend).descarregar() == 1
+
+
+def test_envio_demorado_renova_a_reserva(tmp_path):
+    caminho = str(tmp_path / "fila.db")
+    outra = FilaEnvio(caminho, lambda linhas: None)
+    reservados_pela_outra = []
+
+    def enviar_devagar(linhas):
+        time.sleep(0.5)
+        # O prazo (0.2 s) já passou, mas a reserva foi renovada durante o envio
+        reservados_pela_outra.extend(outra._reservar_lote())
+
+    fila = FilaEnvio(caminho, enviar_devagar, prazo_reserva=0.2)
+    fila.enfileirar(["a"])
+    assert fila.descarregar() == 1
+    assert reservados_pela_outra == []
+    assert fila.situacao()["pendentes"] == 0
+
+
+def test_reserva_perdida_no_envio_nao_marca_o_lote_da_outra_replica(tmp_path, caplog):
+    caminho = str(tmp_path / "fila.db")
+    fila = FilaEnvio(caminho, lambda linhas: None)
+
+    def enviar_e_perder_a_reserva(linhas):
+        with sqlite3.connect(caminho) as conexao:
+            conexao.execute("UPDATE fila SET reservado_por = 'outra'")
+
+    fila.enviar_lote = enviar_e_perder_a_reserva
+    fila.enfileirar(["a"])
+    fila.descarregar()
+    with sqlite3.connect(caminho) as conexao:
+        assert conexao.execute("SELECT enviado_em, reservado_por FROM fila").fetchall() == [(None, "outra")]
+    assert "perdida" in caplog.text
@@ -0,0 +1,58 @@
+import threading
+
+from limitador import ClienteLimitado, Limitador
+from planilha_falsa import criar_aba_ideias
+
+
+def _em_paralelo(*funcoes):
+    threads = [threading.Thread(target=funcao) for funcao in funcoes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _aba_limitada(latencia=0.1):
+    aba = criar_aba_ideias(5, latencia=latencia)
+    limitador = Limitador(por_minuto=6000, capacidade=100)
+    return aba, ClienteLimitado(aba, limitador), limitador
+
+
+def test_leituras_de_recarga_iguais_viram_uma_chamada():
+    aba, limitada, limitador = _aba_limitada()
+    _em_paralelo(*[limitada.get_all_records for _ in range(4)])
+    assert aba.spreadsheet.chamadas["get_all_records"] == 1
+    assert limitador.situacao()["economizadas"] == 3
+
+
+def test_leituras_de_conferencia_nunca_sao_juntadas():
+    aba, limitada, limitador = _aba_limitada()
+    _em_paralelo(*[lambda: limitada.get_values("A2:X2") for _ in range(3)],
+                 *[lambda: limitada.cell(2, 1) for _ in range(3)],
+                 *[lambda: limitada.batch_get(["A2:A", "X2:X"]) for _ in range(3)])
+    assert aba.spreadsheet.chamadas["get_values"] == 3
+    assert aba.spreadsheet.chamadas["cell"] == 3
+    assert aba.spreadsheet.chamadas["batch_get"] == 3
+    assert limitador.situacao()["economizadas"] == 0
+
+
+def test_leitura_depois_de_uma_escrita_nao_recebe_resultado_anterior():
+    aba, limitada, _ = _aba_limitada(latencia=0)
+    ler_ids = aba.col_values
+    leitura_comecou, escrita_feita = threading.Event(), threading.Event()
+
+    def col_values_lento(*args, **kwargs):
+        valores = ler_ids(*args, **kwargs)
+        leitura_comecou.set()
+        escrita_feita.wait(5)
+        return valores
+
+    aba.col_values = col_values_lento
+    antiga = threading.Thread(target=limitada.col_values, args=(1,))
+    antiga.start()
+    leitura_comecou.wait(5)
+    limitada.update_cell(2, 1, "99")
+    escrita_feita.set()
+    aba.col_values = ler_ids
+    assert limitada.col_values(1)[1] == "99"
+    antiga.join()
@@ -0,0 +1,82 @@
+import threading
+
+import utils
+from esquema import get_column_order
+
+
+def _ids(aba):
+    return [int(valor) for valor in aba.col_values(1)[1:]]
+
+
+def _status(aba, id_ideia):
+    return aba.get_values()[_ids(aba).index(id_ideia) + 1][16]
+
+
+def test_compactacoes_simultaneas_nao_apagam_ideias_vivas(planilha):
+    utils.carregar_dados()
+    for id_ideia in (3, 4):
+        utils.excluir_ideia(id_ideia - 1, id_ideia)
+    planilha.spreadsheet.latencia = 0.01
+    threads = [threading.Thread(target=utils.compactar_excluidas) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _ids(planilha) == [1, 2, 5, 6, 7, 8, 9, 10]
+
+
+def test_compactacao_usa_uma_leitura_atual_e_nao_o_cache(planilha, monkeypatch):
+    utils.carregar_dados()
+    utils.excluir_ideia(2, 3)
+    # Alguém apaga a ideia 1 direto na planilha: as posições do cache ficaram velhas
+    planilha.delete_rows(2)
+    ler_colunas = utils.backend.ler_colunas
+    chamadas = []
+
+    def ler_colunas_contando(colunas):
+        chamadas.append(colunas)
+        return ler_colunas(colunas)
+
+    monkeypatch.setattr(utils.backend, "ler_colunas", ler_colunas_contando)
+    assert utils.compactar_excluidas() == 1
+    assert chamadas == [["ID", "Status"]]
+    assert _ids(planilha) == [2, 4, 5, 6, 7, 8, 9, 10]
+
+
+def test_arquivamento_confere_linhas_antes_de_excluir(planilha, monkeypatch):
+    monkeypatch.setitem(utils.config_armazenamento, "arquivo", "sheets")
+    df = utils.carregar_dados()
+    encerradas = df.index[df["Status"].isin(utils.STATUS_ARQUIVAVEIS)].tolist()
+    assert encerradas
+    anexar = utils.obter_backend_arquivo().anexar_linhas
+
+    def anexar_e_excluir_por_fora(linhas):
+        anexar(linhas)
+        planilha.delete_rows(2)
+
+    monkeypatch.setattr(utils.obter_backend_arquivo(), "anexar_linhas", anexar_e_excluir_por_fora)
+    antes = _ids(planilha)
+    utils.arquivar_ideias(dias=0)
+    # Nenhuma ideia viva foi apagada no lugar das encerradas
+    assert set(antes) - set(_ids(planilha)) <= {antes[0]} | {antes[p] for p in encerradas}
+    assert antes[0] not in _ids(planilha)
+
+
+def test_arquivamento_copia_os_valores_como_estao_na_planilha(planilha, monkeypatch):
+    monkeypatch.setitem(utils.config_armazenamento, "arquivo", "sheets")
+    colunas = get_column_order()
+    linha = planilha._linhas[1]
+    linha[colunas.index("Status")] = "Concluída"
+    linha[colunas.index("Data ideia")] = "05/03/2020"
+    # Textos que o DataFrame tipado transforma em NaN/NaT
+    linha[colunas.index("Investimento")] = "a definir"
+    linha[colunas.index("Ganho financeiro")] = "R$ 1.500 por mês"
+    linha[colunas.index("Data conclusão")] = "março/2021"
+    original = list(linha)
+    utils.carregar_dados()
+    assert utils.arquivar_ideias(dias=0) >= 1
+    arquivadas = planilha.spreadsheet.worksheet("Arquivo").get_values()
+    copia = next(valores for valores in arquivadas if valores[0] == original[0])
+    copia += [""] * (len(original) - len(copia))
+    for coluna, esperado, arquivado in zip(colunas, original, copia):
+        assert arquivado == esperado, coluna
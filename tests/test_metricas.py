@@ -0,0 +1,33 @@
+import time
+
+import pytest
+import streamlit as st
+
+import utils
+
+
+class _Interrompida(Exception):
+    pass
+
+
+def _interromper():
+    raise _Interrompida
+
+
+@pytest.mark.parametrize("interromper", ["reexecutar", "parar"])
+def test_execucao_interrompida_e_medida(planilha, monkeypatch, interromper):
+    monkeypatch.setattr(st, "rerun", _interromper)
+    monkeypatch.setattr(st, "stop", _interromper)
+    metricas = utils.obter_metricas()
+    cronometro = utils.medir_pagina("teste")
+    with pytest.raises(_Interrompida):
+        getattr(utils, interromper)()
+    # O encerrar() do fim do script não conta a mesma execução de novo
+    cronometro.encerrar()
+    assert metricas.totais[("pagina", "teste")] == 1
+
+
+def test_metricas_nao_gravam_arquivo_sem_configuracao(planilha, tmp_path):
+    utils.obter_metricas()
+    time.sleep(0.1)
+    assert not list(tmp_path.glob("*.prom"))
@@ -1,8 +1,31 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
 import streamlit as st
-import pandas as pd
-import gspread
 import pytz
-from google.oauth2.service_account import Credentials
+from armazenamento import criar_backend, criar_backend_arquivo
+from conexao import ConexaoPreguicosa, ErroConexao
+from dados_ideias import STATUS_EXCLUIDA, abrir_aba_ideias, dataframe_de_registros
+from esquema import (COLUNA_VERSAO, COLUNAS_CONTROLE, aplicar_tipos, concatenar, get_column_order, numero_versao,
+                     registro_como_texto, serializar_linha, serializar_valor)
+from fila_envio import FilaEnvio
+from filtros import IndiceFiltros, IndiceFiltrosUnido
+from agregados import AgregadosIdeias
+from busca import CAMPOS_BUSCA, IndiceBusca
+from duplicatas import DetectorDuplicatas, texto_da_ideia
+from alocador_ids import AlocadorIds, SequenciaPlanilha, SequenciaSQLite, abrir_aba_controle
+from snapshot import GravadorSnapshot, carregar_snapshot
+from cache_compartilhado import CacheCompartilhado
+from metricas import ClienteInstrumentado, CronometroPagina, Metricas
+from limitador import ClienteLimitado, Limitador, baixa_prioridade
+from sob_demanda import ModuloSobDemanda
+
+# pandas, gspread e google.oauth2 só são importados quando usados: o formulário dos operadores abre sem eles
+pd = ModuloSobDemanda("pandas")
+
+logger = logging.getLogger(__name__)
 
 try:
     fuso_horario_sp = pytz.timezone('America/Sao_Paulo')
@@ -10,82 +33,1363 @@ except pytz.UnknownTimeZoneError:
     fuso_horario_sp = pytz.utc
 
 
+def _configuracao_metricas():
+    """Lê a seção [metricas] dos secrets."""
+    try:
+        return dict(st.secrets.get("metricas", {}))
+    except Exception:
+        return {}
+
+
+@st.cache_resource
+def obter_metricas():
+    """Retorna as métricas do processo (chamadas à API, cache, tempo das páginas)."""
+    config = _configuracao_metricas()
+    # Sem configuração nenhum arquivo é gravado: caminho_prometheus e porta são opcionais
+    return Metricas().iniciar_exportacao(config.get("caminho_prometheus"),
+                                         float(config.get("intervalo", 15)), config.get("porta"))
+
+
+def _configuracao_limitador():
+    """Lê a seção [limitador] dos secrets."""
+    try:
+        return dict(st.secrets.get("limitador", {}))
+    except Exception:
+        return {}
+
+
+@st.cache_resource
+def obter_limitador():
+    """Retorna o limitador de chamadas à API do processo (None se desativado)."""
+    config = _configuracao_limitador()
+    if not config.get("ativo", True):
+        return None
+    capacidade = config.get("capacidade")
+    return Limitador(float(config.get("por_minuto", 60)), int(capacidade) if capacidade else None,
+                     metricas=obter_metricas())
+
+
+# Avisos já mostrados na execução atual da página (ver _avisar_uma_vez)
+_CHAVE_AVISOS = "_avisos_exibidos"
+# Cronômetro da execução em andamento, encerrado por reexecutar() e parar()
+_CHAVE_CRONOMETRO = "_cronometro_pagina"
+
+
+def medir_pagina(pagina):
+    """Cronômetro de uma execução da página; chame encerrar() no fim do script.
+
+    Em vez de st.rerun() e st.stop(), as páginas usam reexecutar() e parar(),
+    que registram o tempo da execução antes de interrompê-la.
+    """
+    # Toda página começa por aqui: os avisos da execução anterior podem aparecer de novo
+    st.session_state.pop(_CHAVE_AVISOS, None)
+    cronometro = CronometroPagina(obter_metricas(), pagina)
+    st.session_state[_CHAVE_CRONOMETRO] = cronometro
+    return cronometro
+
+
+def _encerrar_cronometro():
+    cronometro = st.session_state.pop(_CHAVE_CRONOMETRO, None)
+    if cronometro is not None:
+        cronometro.encerrar()
+
+
+def reexecutar():
+    """st.rerun(), registrando antes o tempo desta execução da página."""
+    _encerrar_cronometro()
+    st.rerun()
+
+
+def parar():
+    """st.stop(), registrando antes o tempo desta execução da página."""
+    _encerrar_cronometro()
+    st.stop()
+
+
+def _avisar_uma_vez(texto, erro=False):
+    """Mostra o aviso uma única vez por execução da página (várias funções podem detectar o mesmo problema)."""
+    exibidos = st.session_state.setdefault(_CHAVE_AVISOS, set())
+    if texto in exibidos:
+        return
+    exibidos.add(texto)
+    (st.error if erro else st.warning)(texto)
+
+
+def _abrir_aba_ideias():
+    """Autentica com a conta de serviço e abre a aba "Ideias" (só no primeiro uso real)."""
+    def envolver(client):
+        # Toda chamada feita pelo cliente, pela planilha ou pela aba é contada e cronometrada
+        client = ClienteInstrumentado(client, obter_metricas())
+        # ... e passa pelo limitador: leituras iguais simultâneas viram uma só e a cota
+        # por minuto é respeitada com fila (as chamadas juntadas não chegam a ser contadas)
+        limitador = obter_limitador()
+        if limitador is not None:
+            client = ClienteLimitado(client, limitador)
+        return client
+
+    return abrir_aba_ideias(dict(st.secrets["gcp_service_account"]), envolver)
+
+
+@st.cache_resource
+def obter_conexao():
+    """Conexão do processo com a aba "Ideias", compartilhada entre páginas e sessões.
+
+    Nada é feito na criação: a autenticação e a abertura da planilha
+    acontecem na primeira chamada à API (ver ConexaoPreguicosa).
+    """
+    return ConexaoPreguicosa(_abrir_aba_ideias)
+
 
 # Esta é a função de conexão original, apenas para o Google Sheets
-@st.cache_resource(ttl=3600)
 def connect_to_google_sheets():
     """Conecta à Planilha Google e retorna o objeto da aba"""
     try:
-        creds_dict = dict(st.secrets["gcp_service_account"])
-        # Escopo apenas para o Sheets
-        SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-        creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-
-        client = gspread.authorize(creds)
-        spreadsheet_url = "https://docs.google.com/spreadsheets/d/1CEu8e_LgTq4NQxm8SWpSsLXYWcGjwJd4YseNUsXm0RQ/edit?usp=sharing"
-        spreadsheet = client.open_by_url(spreadsheet_url)
-        worksheet = spreadsheet.worksheet("Ideias")
-        return worksheet
-    except Exception as e:
+        return obter_conexao().obter()
+    except ErroConexao as e:
         st.error(f"Falha na conexão com a Planilha Google: {str(e)}")
         return None
 
 
-# Inicia a conexão
-worksheet = connect_to_google_sheets()
+def _configuracao_armazenamento():
+    """Lê a seção [armazenamento] dos secrets (backend padrão: Google Sheets)."""
+    try:
+        return dict(st.secrets.get("armazenamento", {}))
+    except Exception:
+        return {}
+
+
+config_armazenamento = _configuracao_armazenamento()
+usa_planilha = (str(config_armazenamento.get("backend", "sheets")).lower() == "sheets"
+                or bool(config_armazenamento.get("espelhar_planilha")))
+
+# A conexão (só necessária se a planilha for o backend ou o espelho) é aberta no primeiro uso
+worksheet = obter_conexao() if usa_planilha else None
+
+
+@st.cache_resource
+def obter_backend():
+    """Retorna o backend de armazenamento escolhido na configuração."""
+    return criar_backend(config_armazenamento, get_column_order(), worksheet)
+
+
+backend = obter_backend()
+
+
+@st.cache_resource
+def obter_backend_arquivo():
+    """Retorna o backend do arquivo de ideias encerradas (None se desativado), criado no primeiro uso."""
+    if backend is None:
+        return None
+    return criar_backend_arquivo(config_armazenamento, get_column_order(), worksheet)
+
+
+def _primeiro_id_livre():
+    """Maior ID existente + 1; só é usado ao criar a sequência de IDs."""
+    ids = backend.ler_ids()
+    arquivo = obter_backend_arquivo()
+    if arquivo is not None:
+        # IDs de ideias arquivadas também não podem voltar a ser usados
+        ids = list(ids) + list(arquivo.ler_ids())
+    ids = pd.to_numeric(pd.Series(ids, dtype=object), errors='coerce')
+    return int(ids.max()) + 1 if ids.notna().any() else 1
+
+
+@st.cache_resource
+def obter_alocador():
+    """Retorna o alocador de IDs do processo (sequência no SQLite ou numa aba de controle)."""
+    if backend is None:
+        return None
+    tamanho_bloco = int(config_armazenamento.get("tamanho_bloco_ids", 10))
+    if str(config_armazenamento.get("backend", "sheets")).lower() == "sqlite":
+        sequencia = SequenciaSQLite(config_armazenamento.get("caminho_sqlite", "ideias.db"), _primeiro_id_livre,
+                                    tamanho_bloco)
+    else:
+        aba = abrir_aba_controle(worksheet.spreadsheet, "Sequencia_IDs")
+        sequencia = SequenciaPlanilha(aba, _primeiro_id_livre, tamanho_bloco)
+    return AlocadorIds(sequencia)
+
+
+def proximo_id():
+    """Retorna um ID novo e único, sem recarregar a planilha."""
+    alocador = obter_alocador()
+    return alocador.proximo_id() if alocador is not None else 1
+
+
+# Tempo (s) até conferir se a planilha mudou fora do app
+TTL_CACHE = 300
+# Idade máxima (s) do cache mesmo sem mudança detectada nos IDs
+IDADE_MAXIMA_CACHE = 1800
+# Vencido o TTL, o DataFrame atual continua sendo servido enquanto o novo é buscado em segundo plano
+ATUALIZACAO_EM_SEGUNDO_PLANO = str(config_armazenamento.get("atualizacao", "segundo_plano")).lower() != "bloqueante"
+# Limite (s) sem conferir o backend: passado dele, a página espera pela atualização
+OBSOLESCENCIA_MAXIMA = float(config_armazenamento.get("obsolescencia_maxima", 900))
+# Espera (s) antes de tentar de novo uma atualização em segundo plano que falhou (dobra a cada falha)
+ESPERA_INICIAL_REVALIDACAO = 5.0
+ESPERA_MAXIMA_REVALIDACAO = 300.0
+# "incremental" busca só as linhas novas; "completa" recarrega tudo a cada mudança
+MODO_SINCRONIZACAO = str(config_armazenamento.get("sincronizacao", "incremental")).lower()
+# Arquivo onde o índice de ideias parecidas é guardado entre reinícios
+CAMINHO_INDICE_DUPLICATAS = config_armazenamento.get("caminho_indice_duplicatas", "indice_duplicatas.pkl")
+# Snapshot (Arrow) da última carga, servido na hora quando o processo reinicia ("" desativa)
+CAMINHO_SNAPSHOT = config_armazenamento.get("caminho_snapshot", "ideias_snapshot.arrow")
+# Cache (SQLite) compartilhado entre as réplicas do app na mesma máquina ("" desativa)
+CAMINHO_CACHE_COMPARTILHADO = config_armazenamento.get("cache_compartilhado", "cache_compartilhado.db")
+# Ideias encerradas há mais de ARQUIVAR_APOS_DIAS dias saem da partição ativa para o arquivo
+STATUS_ARQUIVAVEIS = ("Concluída", "Rejeitada")
+ARQUIVAR_APOS_DIAS = int(config_armazenamento.get("arquivar_apos_dias", 365))
+# Ideias movidas por vez (cada lote: uma escrita no arquivo e uma exclusão na partição ativa)
+LOTE_ARQUIVAMENTO = int(config_armazenamento.get("lote_arquivamento", 500))
+# Tempo (s) até conferir se o arquivo mudou (ele só cresce, quando ideias são arquivadas)
+TTL_ARQUIVO = 3600
+
+
+class CacheIdeias:
+    """DataFrame das ideias compartilhado entre as sessões do processo.
+
+    As escritas feitas pelo app atualizam o DataFrame diretamente
+    (write-through); ele só é recarregado por inteiro quando a planilha
+    mudou por fora do app ou quando passa de IDADE_MAXIMA_CACHE.
+
+    Mantém também o índice ID -> posição da linha (`posicoes`), atualizado a
+    cada inclusão e exclusão, para achar uma ideia sem varrer o DataFrame.
+    `df` inclui as ideias excluídas (lápides), para que o índice do DataFrame
+    continue igual à posição da linha na planilha; visiveis() as omite.
+    """
+
+    def __init__(self):
+        self.df = None
+        self._visiveis = None
+        self._filtros = None
+        self._busca = None
+        self._duplicatas = None
+        self._duplicatas_alterado = False
+        self._agregados = None
+        self.posicoes = {}
+        self.versao = None
+        self.versao_compartilhada = None
+        self.conferido_em = 0.0
+        self.carregado_em = 0.0
+        self.usar_snapshot = True
+        # DataFrame vazio servido enquanto a planilha não responde (ver _sem_conexao)
+        self.provisorio = False
+        self.revalidando = False
+        self.falhas_seguidas = 0
+        self.proxima_revalidacao = 0.0
+        self.lock = threading.RLock()
+
+    def invalidar(self):
+        with self.lock:
+            self.df = None
+            self._visiveis = None
+            self._filtros = None
+            self._busca = None
+            self._duplicatas = None
+            self._agregados = None
+            self.posicoes = {}
+
+    def _trocar(self, df):
+        self.df = df
+        self._visiveis = None
+        self._filtros = None
+
+    def visiveis(self):
+        """DataFrame sem as lápides; o índice continua sendo a posição na planilha."""
+        if self._visiveis is None:
+            if 'Status' in self.df.columns:
+                self._visiveis = self.df[self.df['Status'] != STATUS_EXCLUIDA]
+            else:
+                self._visiveis = self.df
+        return self._visiveis
+
+    def filtros(self):
+        """Índice dos filtros da barra lateral, refeito só quando os dados mudam."""
+        if self._filtros is None:
+            self._filtros = IndiceFiltros(self.visiveis())
+        return self._filtros
+
+    def busca(self):
+        """Índice de busca textual; atualizado ideia a ideia depois de montado."""
+        if self._busca is None:
+            self._busca = IndiceBusca.de_dataframe(self.visiveis())
+        return self._busca
+
+    def duplicatas(self):
+        """Detector de ideias parecidas, lido do disco e posto em dia com os dados."""
+        if self._duplicatas is None:
+            self._duplicatas = DetectorDuplicatas.carregar(CAMINHO_INDICE_DUPLICATAS)
+            self._duplicatas_alterado = self._duplicatas.sincronizar(self.visiveis())
+        return self._duplicatas
+
+    def agregados(self):
+        """Agregados do painel de análises; atualizados por diferença depois de montados."""
+        if self._agregados is None:
+            self._agregados = AgregadosIdeias.de_dataframe(self.visiveis())
+        return self._agregados
+
+    def _atualizar_agregados(self, antes, depois):
+        """Troca a contribuição de uma linha nos agregados (None = linha ausente)."""
+        if self._agregados is None:
+            return
+        if antes is not None and antes.get('Status') != STATUS_EXCLUIDA:
+            self._agregados.remover(antes)
+        if depois is not None and depois.get('Status') != STATUS_EXCLUIDA:
+            self._agregados.adicionar(depois)
+
+    def _reindexar_textos(self, posicao):
+        """Atualiza os índices de busca e de duplicatas para uma linha alterada."""
+        if self._busca is None and self._duplicatas is None:
+            return
+        registro = self.df.iloc[posicao]
+        chave = _chave_id(registro['ID'])
+        if chave is None:
+            return
+        excluida = registro.get('Status') == STATUS_EXCLUIDA
+        if self._busca is not None:
+            if excluida:
+                self._busca.remover(chave)
+            else:
+                self._busca.adicionar(chave, {c: registro.get(c) for c in CAMPOS_BUSCA})
+        if self._duplicatas is not None:
+            if excluida:
+                self._duplicatas.remover(chave)
+            else:
+                self._duplicatas.adicionar(chave, texto_da_ideia(registro), registro.get('Nome da ideia', ""))
+            self._duplicatas_alterado = True
+
+    def definir(self, df):
+        self._trocar(df)
+        self.provisorio = False
+        self._busca = None
+        self._agregados = None
+        if self._duplicatas is not None:
+            # O detector é persistido: só as ideias novas ou alteradas são recalculadas
+            self._duplicatas_alterado |= self._duplicatas.sincronizar(self.visiveis())
+        self.posicoes = {}
+        self._indexar(df, 0)
+
+    def _indexar(self, df, inicio):
+        status = df['Status'] if 'Status' in df.columns else [None] * len(df)
+        for deslocamento, (valor, situacao) in enumerate(zip(df['ID'], status)):
+            chave = _chave_id(valor)
+            # Com IDs repetidos vale a primeira linha, como em df[df['ID'] == id]
+            if chave is not None and chave not in self.posicoes and situacao != STATUS_EXCLUIDA:
+                self.posicoes[chave] = inicio + deslocamento
+
+    def anexar(self, novas):
+        inicio = len(self.df)
+        self._trocar(novas if self.df.empty else concatenar(self.df, novas))
+        self._indexar(novas, inicio)
+        for posicao in range(inicio, len(self.df)):
+            self._reindexar_textos(posicao)
+            self._atualizar_agregados(None, self.df.iloc[posicao])
+
+    def marcar_excluida(self, posicao):
+        chave = _chave_id(self.df['ID'].iat[posicao])
+        linha = pd.DataFrame([{"Status": STATUS_EXCLUIDA}])
+        self.substituir_linha(posicao, linha)
+        if self.posicoes.get(chave) == posicao:
+            del self.posicoes[chave]
+
+    def compactar(self, posicoes):
+        """Remove as linhas compactadas e reconstrói o índice de posições."""
+        # reset_index mantém o índice igual à posição da linha na planilha
+        agregados = self._agregados
+        self.definir(self.df.drop(index=list(posicoes)).reset_index(drop=True))
+        # Só saem lápides, que já não entravam nos agregados
+        self._agregados = agregados
+
+    def substituir_linha(self, posicao, linha):
+        self.substituir_linhas([posicao], linha)
+
+    def substituir_linhas(self, posicoes, linhas):
+        """Troca várias linhas com uma única cópia do DataFrame (`linhas` na ordem de `posicoes`)."""
+        antes = [self.df.iloc[posicao] for posicao in posicoes]
+        df = self.df.copy()
+        for coluna in linhas.columns:
+            if coluna == 'ID' or coluna not in df.columns:
+                continue
+            valores = linhas[coluna].tolist()
+            if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+                novas = [v for v in dict.fromkeys(valores) if v not in df[coluna].cat.categories]
+                if novas:
+                    df[coluna] = df[coluna].cat.add_categories(novas)
+            elif df[coluna].dtype != linhas[coluna].dtype:
+                df[coluna] = df[coluna].astype(object)
+            for posicao, valor in zip(posicoes, valores):
+                df.at[posicao, coluna] = valor
+        self._trocar(df)
+        for posicao, linha_antes in zip(posicoes, antes):
+            self._reindexar_textos(posicao)
+            self._atualizar_agregados(linha_antes, df.iloc[posicao])
+
+
+class ArquivoIdeias(CacheIdeias):
+    """Partição de arquivo: ideias encerradas há tempo, lidas só quando pedidas.
+
+    Fica em cache por TTL_ARQUIVO (e depois enquanto o arquivo não cresce).
+    O índice do DataFrame é negativo (-1, -2, ...) para não se confundir com
+    as posições da partição ativa: as ideias arquivadas são somente leitura.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._unido = None
+
+    def unir(self, ativas):
+        """Ativas + arquivadas num só DataFrame, refeito só quando uma das partes muda."""
+        arquivadas = self.visiveis()
+        if self._unido is None or self._unido[0] is not ativas or self._unido[1] is not arquivadas:
+            self._unido = (ativas, arquivadas, concatenar(ativas, arquivadas, ignore_index=False))
+        return self._unido[2]
+
+
+@st.cache_resource
+def obter_cache():
+    """Retorna o cache de ideias único do processo."""
+    return CacheIdeias()
+
+
+@st.cache_resource
+def obter_cache_arquivo():
+    """Retorna o cache das ideias arquivadas do processo."""
+    return ArquivoIdeias()
+
+
+def _ler_dataframe(origem=None):
+    """Lê todas as ideias do backend (ou de `origem`, ex.: o arquivo) e monta o DataFrame."""
+    origem = backend if origem is None else origem
+    if origem is None:
+        return aplicar_tipos(pd.DataFrame(columns=get_column_order()))
+    return dataframe_de_registros(origem.ler_registros())
+
+
+def _ids_iguais(df, ids):
+    """Compara a coluna ID em cache com a lida do backend."""
+    if 'ID' not in df.columns or len(df) != len(ids):
+        return False
+    lidos = pd.to_numeric(pd.Series(ids, dtype=object), errors='coerce').astype(float)
+    return lidos.reset_index(drop=True).equals(df['ID'].astype(float).reset_index(drop=True))
+
+
+def _chave_id(valor):
+    """Normaliza um ID (int, float ou texto) para a chave do índice."""
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+@st.cache_resource
+def obter_gravador_snapshot():
+    """Retorna o gravador do snapshot em disco (None se desativado ou sem pyarrow)."""
+    if not CAMINHO_SNAPSHOT:
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    cache = obter_cache()
+
+    def estado():
+        with cache.lock:
+            return cache.df, cache.versao
+
+    return GravadorSnapshot(CAMINHO_SNAPSHOT, get_column_order(), estado)
+
+
+def _agendar_snapshot():
+    gravador = obter_gravador_snapshot()
+    if gravador is not None:
+        gravador.agendar()
+
+
+@st.cache_resource
+def obter_cache_compartilhado():
+    """Retorna o cache compartilhado entre réplicas (None se desativado ou sem pyarrow)."""
+    if not CAMINHO_CACHE_COMPARTILHADO or backend is None:
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return CacheCompartilhado(CAMINHO_CACHE_COMPARTILHADO, get_column_order())
+
+
+def _publicar(cache, escrita):
+    """Publica o DataFrame local no cache compartilhado.
+
+    Numa escrita, se outra réplica publicou no meio tempo, cada uma tem só a
+    sua alteração: o cache compartilhado é invalidado e todas recarregam.
+    Numa recarga basta ficar com a versão que a outra réplica publicou.
+    """
+    compartilhado = obter_cache_compartilhado()
+    if compartilhado is None:
+        return
+    try:
+        with cache.lock:
+            if cache.df is None:
+                return
+            versao = compartilhado.publicar(cache.df, cache.versao, cache.versao_compartilhada or 0)
+            if versao is None and escrita:
+                compartilhado.invalidar()
+            cache.versao_compartilhada = versao
+    except Exception as e:
+        logger.warning("Falha ao publicar no cache compartilhado: %s", e)
+
+
+def _dados_mudaram(cache, escrita=True):
+    """Avisa o snapshot em disco e as outras réplicas de que o DataFrame mudou."""
+    _agendar_snapshot()
+    _publicar(cache, escrita)
+
+
+def _recarregar(cache, agora):
+    cache.versao = backend.versao() if backend is not None else None
+    cache.definir(_ler_dataframe())
+    cache.carregado_em = cache.conferido_em = agora
+    _dados_mudaram(cache, escrita=False)
+
+
+def _revalidar(cache, completa=False):
+    """Confere se o backend mudou por fora do app e põe o cache em dia, lendo o mínimo possível.
+
+    1. Data de modificação igual à conhecida: nada a fazer.
+    2. IDs em cache são o início da coluna ID atual: só houve inclusões,
+       então busca apenas as linhas novas (modo incremental).
+    3. Qualquer outra diferença (exclusão, edição de células): recarga completa.
+
+    `completa=True` vai direto para a recarga. As leituras podem ser feitas
+    fora do lock (em segundo plano) e a troca do DataFrame é feita de uma vez
+    no final; se o app escreveu no meio tempo a troca é descartada e a próxima
+    conferência resolve.
+    """
+    with cache.lock:
+        df_base, versao_base = cache.df, cache.versao
+    if df_base is None:
+        # O cache foi descartado: a próxima leitura recarrega
+        return
+    versao = backend.versao()
+    acao, novas = "recarregar", None
+    if not completa:
+        if versao is not None and versao == versao_base:
+            acao = "nada"
+        else:
+            ids = backend.ler_ids()
+            total_em_cache = len(df_base)
+            if (MODO_SINCRONIZACAO == "incremental" and len(ids) > total_em_cache
+                    and _ids_iguais(df_base, ids[:total_em_cache])):
+                acao = "anexar"
+                novas = aplicar_tipos(pd.DataFrame(backend.ler_linhas_desde(total_em_cache),
+                                                   columns=df_base.columns))
+            elif versao is None and _ids_iguais(df_base, ids):
+                # Sem data de modificação só dá para confiar nos IDs
+                acao = "nada"
+    df = _ler_dataframe() if acao == "recarregar" else None
+    with cache.lock:
+        if cache.df is not df_base:
+            return
+        agora = time.time()
+        if acao == "anexar":
+            cache.anexar(novas)
+        elif acao == "recarregar":
+            cache.definir(df)
+            cache.carregado_em = agora
+        cache.versao = versao
+        cache.conferido_em = agora
+        if acao != "nada":
+            _dados_mudaram(cache, escrita=acao == "anexar")
+
+
+def _revalidar_em_segundo_plano(cache, completa):
+    try:
+        # Ninguém espera por esta leitura: cede a vez às chamadas das páginas no limitador
+        with baixa_prioridade():
+            _revalidar(cache, completa)
+        falhou = False
+    except Exception as e:
+        falhou = True
+        logger.warning("Falha ao atualizar os dados em segundo plano: %s", e)
+    with cache.lock:
+        cache.revalidando = False
+        if falhou:
+            cache.falhas_seguidas += 1
+            espera = min(ESPERA_MAXIMA_REVALIDACAO, ESPERA_INICIAL_REVALIDACAO * 2 ** (cache.falhas_seguidas - 1))
+            cache.proxima_revalidacao = time.time() + espera
+        else:
+            cache.falhas_seguidas = 0
+            cache.proxima_revalidacao = 0.0
+
 
+def _pode_revalidar(cache, agora):
+    """Nenhuma revalidação em andamento e fora da espera depois de uma falha."""
+    return not cache.revalidando and agora >= cache.proxima_revalidacao
 
-# Lista de colunas revertida
-def get_column_order():
-    """Retorna a lista de colunas na ordem exata da planilha."""
-    return [
-        "ID", "Nome da ideia", "Descrição da solução", "Descrição de problema",
-        "Área", "Local", "BL", "Unidade", "Dono da ideia", "Matrícula",
-        "Área do operador", "Turno do operador que deu a ideia", "Data ideia",
-        "Metodologia", "Líder", "Equipe", "Status", "Observações", "Data conclusão",
-        "Investimento", "Ganho financeiro", "Link", "Apresentou em alguma rotina?"
-    ]
 
+def _agendar_revalidacao(cache, completa=False):
+    """Dispara _revalidar() numa thread; quem lê continua recebendo o DataFrame atual."""
+    cache.revalidando = True
+    threading.Thread(target=_revalidar_em_segundo_plano, args=(cache, completa), name="revalidar-dados",
+                     daemon=True).start()
 
-@st.cache_data(ttl=300)
-def carregar_dados():
-    """Carrega os dados da planilha e retorna um DataFrame."""
-    if worksheet is None:
-        return pd.DataFrame(columns=get_column_order())
-    data = worksheet.get_all_records()
-    df = pd.DataFrame(data)
-    if df.empty:
-        df = pd.DataFrame(columns=get_column_order())
-    if 'ID' in df.columns:
-        df['ID'] = pd.to_numeric(df['ID'], errors='coerce')
-    return df
+
+def _carregar_snapshot(cache, agora):
+    """Serve o snapshot salvo em disco e agenda a revalidação. Retorna False se não há snapshot."""
+    if not cache.usar_snapshot or not CAMINHO_SNAPSHOT or backend is None:
+        return False
+    # Só na primeira carga: depois de limpar o cache a releitura vem do backend
+    cache.usar_snapshot = False
+    lido = carregar_snapshot(CAMINHO_SNAPSHOT, get_column_order(),
+                             mapear_memoria=bool(config_armazenamento.get("snapshot_mmap", True)))
+    if lido is None:
+        return False
+    df, versao, _ = lido
+    cache.definir(df)
+    cache.versao = versao
+    cache.carregado_em = cache.conferido_em = agora
+    _agendar_revalidacao(cache)
+    return True
+
+
+def _ler_compartilhado(cache, agora):
+    """Põe o cache local em dia com o das outras réplicas.
+
+    Retorna "compartilhado" se trocou o DataFrame, "invalidado" se a cópia
+    compartilhada precisa ser recarregada do backend, ou None se nada mudou.
+    """
+    compartilhado = obter_cache_compartilhado()
+    if compartilhado is None:
+        return None
+    try:
+        versao = compartilhado.versao()
+        if versao == cache.versao_compartilhada:
+            return None
+        lido = compartilhado.ler()
+    except Exception as e:
+        logger.warning("Falha ao ler o cache compartilhado: %s", e)
+        return None
+    if lido is None and versao == 0:
+        # Nada publicado ainda: segue o caminho normal (snapshot ou planilha)
+        cache.versao_compartilhada = versao
+        return None
+    if lido is None:
+        # Só uma réplica recarrega cada invalidação; as outras seguem com o que têm até a publicação
+        if cache.df is None or compartilhado.reivindicar_recarga(versao, TTL_CACHE):
+            cache.versao_compartilhada = versao
+            return "invalidado"
+        return None
+    df, versao_backend, versao = lido
+    cache.definir(df)
+    cache.versao = versao_backend
+    cache.versao_compartilhada = versao
+    cache.carregado_em = cache.conferido_em = agora
+    return "compartilhado"
+
+
+def _vez_desta_replica(tarefa, intervalo, cache, agora):
+    """Com réplicas, só uma faz cada conferência periódica; as outras reiniciam o prazo."""
+    compartilhado = obter_cache_compartilhado()
+    if compartilhado is None or compartilhado.reivindicar(tarefa, intervalo):
+        return True
+    if tarefa == "recarga_completa":
+        cache.carregado_em = agora
+    cache.conferido_em = agora
+    return False
+
+
+def _ler_arquivo(cache, arquivo, ativas, agora):
+    """Põe o cache do arquivo em dia, relendo-o só se cresceu; retorna o resultado (métricas)."""
+    if cache.df is not None and agora - cache.conferido_em <= TTL_ARQUIVO:
+        return "acerto"
+    # O arquivo só cresce: o número de IDs basta como versão
+    versao = len(arquivo.ler_ids())
+    cache.conferido_em = agora
+    if cache.df is not None and versao == cache.versao:
+        return "acerto"
+    df = _ler_dataframe(arquivo)
+    # Arquivamento interrompido entre as duas escritas: vale a cópia da partição ativa
+    df = df[~df['ID'].isin(ativas['ID'].dropna())].drop_duplicates('ID', keep='last')
+    df.index = pd.RangeIndex(-1, -len(df) - 1, -1)
+    cache.definir(df)
+    cache.versao = versao
+    return "recarga"
+
+
+def _carregar_arquivo(ativas):
+    """Cache das ideias arquivadas, lido do arquivo na primeira vez que é pedido (None se desativado)."""
+    cache = obter_cache_arquivo()
+    with cache.lock:
+        try:
+            arquivo = obter_backend_arquivo()
+            if arquivo is None:
+                return None
+            resultado = _ler_arquivo(cache, arquivo, ativas, time.time())
+        except ErroConexao:
+            # Segue com a cópia que houver (ou só com as ideias ativas)
+            _avisar_uma_vez("Sem conexão com a Planilha Google: as ideias arquivadas não puderam ser lidas.")
+            resultado = "sem_conexao"
+        obter_metricas().contar("arquivo", resultado)
+        return cache if cache.df is not None else None
+
+
+def _por_em_dia(cache, agora):
+    """Decide como servir o DataFrame nesta leitura e faz o que for preciso; retorna o resultado (métricas)."""
+    resultado = _ler_compartilhado(cache, agora)
+    if resultado == "invalidado":
+        resultado = "recarga"
+        _recarregar(cache, agora)
+    elif resultado == "compartilhado":
+        # Outra réplica publicou uma carga mais nova: nada a buscar no backend
+        pass
+    elif cache.df is None or cache.provisorio:
+        # Na partida do processo, o snapshot em disco evita esperar pela planilha
+        resultado = "snapshot" if _carregar_snapshot(cache, agora) else "recarga"
+        if resultado == "recarga":
+            _recarregar(cache, agora)
+    elif not (agora - cache.carregado_em > IDADE_MAXIMA_CACHE
+              or (agora - cache.conferido_em > TTL_CACHE and backend is not None)):
+        resultado = "acerto"
+    elif (ATUALIZACAO_EM_SEGUNDO_PLANO and backend is not None
+          and agora - cache.conferido_em <= OBSOLESCENCIA_MAXIMA):
+        # Serve o DataFrame atual na hora; o novo é buscado em segundo plano
+        resultado = "obsoleto"
+        completa = agora - cache.carregado_em > IDADE_MAXIMA_CACHE
+        if _pode_revalidar(cache, agora) and _vez_desta_replica(
+                "recarga_completa" if completa else "conferencia",
+                IDADE_MAXIMA_CACHE if completa else TTL_CACHE, cache, agora):
+            _agendar_revalidacao(cache, completa)
+    elif (agora - cache.carregado_em > IDADE_MAXIMA_CACHE
+          and _vez_desta_replica("recarga_completa", IDADE_MAXIMA_CACHE, cache, agora)):
+        resultado = "recarga"
+        _recarregar(cache, agora)
+    elif (agora - cache.conferido_em > TTL_CACHE and backend is not None
+          and _vez_desta_replica("conferencia", TTL_CACHE, cache, agora)):
+        resultado = "sincronizacao"
+        _revalidar(cache)
+    else:
+        resultado = "acerto"
+    return resultado
+
+
+def _sem_conexao(cache, erro):
+    """Sem conexão com a planilha a página segue com o que houver em cache, sem esperar.
+
+    Sem cópia nenhuma, segue com um DataFrame vazio provisório (nunca
+    publicado nem gravado no snapshot); cada leitura seguinte tenta de novo.
+    """
+    if cache.df is None:
+        cache.definir(aplicar_tipos(pd.DataFrame(columns=get_column_order())))
+        cache.provisorio = True
+    if cache.provisorio:
+        _avisar_uma_vez(f"Falha na conexão com a Planilha Google: {erro}", erro=True)
+    else:
+        _avisar_uma_vez("Sem conexão com a Planilha Google no momento: mostrando os dados em cache.")
+    return "sem_conexao"
+
+
+def carregar_dados(incluir_arquivo=False):
+    """Carrega os dados da planilha e retorna um DataFrame.
+
+    Por padrão só a partição ativa; com `incluir_arquivo` as ideias
+    arquivadas vêm junto, com índice negativo (somente leitura).
+    O DataFrame é compartilhado entre as sessões: trate-o como somente leitura.
+    """
+    cache = obter_cache()
+    with cache.lock:
+        agora = time.time()
+        try:
+            resultado = _por_em_dia(cache, agora)
+        except ErroConexao as e:
+            resultado = _sem_conexao(cache, e)
+        obter_metricas().contar("dados", resultado)
+        ativas = cache.visiveis()
+    arquivo = _carregar_arquivo(ativas) if incluir_arquivo else None
+    if arquivo is None:
+        return ativas
+    with arquivo.lock:
+        return arquivo.unir(ativas)
+
+
+def obter_indice_filtros(incluir_arquivo=False):
+    """Retorna o índice de filtros (Status, Área, Matrícula) da carga atual."""
+    cache = obter_cache()
+    with cache.lock:
+        carregar_dados()
+        filtros = cache.filtros()
+    arquivo = _carregar_arquivo(filtros.df) if incluir_arquivo else None
+    if arquivo is None:
+        return filtros
+    with arquivo.lock:
+        return IndiceFiltrosUnido(arquivo.unir(filtros.df), [filtros, arquivo.filtros()])
+
+
+def buscar_ideias(consulta, limite=None, incluir_arquivo=False):
+    """Busca textual (sem acentos) em nome, problema e solução.
+
+    Retorna [(ID, pontuação)] da ideia mais relevante para a menos relevante.
+    Com `incluir_arquivo`, junta os resultados do arquivo (cada partição
+    pontua com as próprias estatísticas).
+    """
+    cache = obter_cache()
+    with cache.lock:
+        carregar_dados()
+        resultado = cache.busca().buscar(consulta, limite)
+        ativas = cache.visiveis()
+    arquivo = _carregar_arquivo(ativas) if incluir_arquivo else None
+    if arquivo is None:
+        return resultado
+    with arquivo.lock:
+        resultado = resultado + arquivo.busca().buscar(consulta, limite)
+    return sorted(resultado, key=lambda item: item[1], reverse=True)[:limite]
+
+
+def encontrar_duplicatas(problema, solucao, limite=5):
+    """Ideias já registradas com problema/solução parecidos: [(ID, nome, similaridade)]."""
+    cache = obter_cache()
+    with cache.lock:
+        carregar_dados()
+        detector = cache.duplicatas()
+        candidatas = detector.parecidas(problema, solucao, limite=limite)
+        if cache._duplicatas_alterado:
+            try:
+                detector.salvar(CAMINHO_INDICE_DUPLICATAS)
+                cache._duplicatas_alterado = False
+            except OSError:
+                pass
+        return candidatas
+
+
+def resumo_analises(incluir_arquivo=False):
+    """Totais, ROI, contagens por dimensão, funil e lead time para o painel de análises."""
+    cache = obter_cache()
+    with cache.lock:
+        carregar_dados()
+        agregados = cache.agregados()
+        if not incluir_arquivo:
+            return agregados.resumo()
+        ativas = cache.visiveis()
+        # Os agregados do arquivo ficam prontos no cache dele: só a soma é refeita
+        arquivo = _carregar_arquivo(ativas)
+        if arquivo is None:
+            return agregados.resumo()
+        with arquivo.lock:
+            return agregados.unir(arquivo.agregados()).resumo()
+
+
+def limpar_cache():
+    """Descarta o DataFrame em cache; a próxima leitura recarrega do backend.
+
+    Vale também para as outras réplicas, pelo cache compartilhado.
+    """
+    obter_cache().invalidar()
+    obter_cache_arquivo().invalidar()
+    _invalidar_compartilhado()
+
+
+def _invalidar_compartilhado():
+    compartilhado = obter_cache_compartilhado()
+    if compartilhado is not None:
+        try:
+            compartilhado.invalidar()
+        except Exception as e:
+            logger.warning("Falha ao invalidar o cache compartilhado: %s", e)
+
+
+def _linha_como_lida(valores):
+    """Monta um DataFrame de uma linha com os tipos que a leitura completa teria."""
+    return aplicar_tipos(pd.DataFrame([backend.tipar_valores(valores)], columns=get_column_order()))
+
+
+def _atualizar_cache(funcao):
+    """Aplica uma alteração ao cache, se ele já foi carregado.
+
+    A versão do cache não muda: a data de modificação da planilha não diz se
+    só o app escreveu (e demora a refletir as escritas), então a conferência
+    seguinte (TTL) põe o cache em dia com a escrita e com o que mais tiver
+    mudado, sem nenhuma chamada extra a cada escrita.
+    """
+    cache = obter_cache()
+    with cache.lock:
+        if cache.df is not None:
+            funcao(cache)
+            _dados_mudaram(cache)
+        else:
+            # Sem cópia local para publicar: as outras réplicas relêem do backend
+            _invalidar_compartilhado()
 
 
 def salvar_ideia(nova_ideia):
     """Salva uma nova ideia na planilha."""
-    if worksheet:
-        colunas_ordenadas = get_column_order()
-        dados_para_adicionar = [nova_ideia.get(col, "") for col in colunas_ordenadas]
-        worksheet.append_row(dados_para_adicionar)
-        st.cache_data.clear()
-
-
-def excluir_ideia(indice_real_df):
-    """Exclui uma linha da planilha com base no índice REAL do DataFrame."""
-    if worksheet:
-        linha_para_excluir = int(indice_real_df) + 2
-        worksheet.delete_rows(linha_para_excluir)
-        st.cache_data.clear()
-
-
-# Função de edição revertida (atualizando apenas até a coluna W)
-def editar_ideia(indice_real_df, dados_editados):
-    """Atualiza uma linha existente na planilha."""
-    if worksheet:
-        linha_para_editar = int(indice_real_df) + 2
-        colunas_ordenadas = get_column_order()
-        valores_para_atualizar = [dados_editados.get(col, "") for col in colunas_ordenadas]
-        valores_formatados = [str(valor) for valor in valores_para_atualizar]
-        # Atualiza de A até W (as 23 colunas originais)
-        worksheet.update(f'A{linha_para_editar}:W{linha_para_editar}', [valores_formatados])
-        st.cache_data.clear()
\ No newline at end of file
+    if backend:
+        dados_para_adicionar = serializar_linha(nova_ideia)
+        backend.anexar_linha(dados_para_adicionar)
+        linha = _linha_como_lida(dados_para_adicionar)
+        _atualizar_cache(lambda cache: cache.anexar(linha))
+
+
+def _configuracao_fila():
+    """Lê a seção [fila_envio] dos secrets."""
+    try:
+        return dict(st.secrets.get("fila_envio", {}))
+    except Exception:
+        return {}
+
+
+def _anexar_ao_cache(linhas):
+    """Inclui no cache as linhas que a fila (ou a importação) acabou de gravar no backend."""
+    novas = aplicar_tipos(pd.DataFrame([backend.tipar_valores(valores) for valores in linhas],
+                                       columns=get_column_order()))
+    _atualizar_cache(lambda cache: cache.anexar(novas))
+
+
+def _enviar_lote_da_fila(linhas):
+    # A thread de envio cede a vez às chamadas das páginas no limitador
+    with baixa_prioridade():
+        backend.anexar_linhas(linhas)
+
+
+def _atribuir_ids(linhas):
+    """Dá IDs às linhas da fila que chegaram sem ID (o formulário não espera pela sequência)."""
+    coluna = get_column_order().index("ID")
+    sem_id = [linha for linha in linhas if not str(linha[coluna]).strip()]
+    if sem_id:
+        with baixa_prioridade():
+            ids = obter_alocador().reservar(len(sem_id))
+        for linha, novo_id in zip(sem_id, ids):
+            linha[coluna] = serializar_valor("ID", novo_id)
+    return linhas
+
+
+@st.cache_resource
+def obter_fila():
+    """Retorna a fila de envio do processo, com a thread de envio já iniciada."""
+    config = _configuracao_fila()
+    if backend is None or not config.get("ativa", True):
+        return None
+    return FilaEnvio(
+        config.get("caminho", "fila_envio.db"),
+        _enviar_lote_da_fila,
+        tamanho_lote=int(config.get("tamanho_lote", 50)),
+        ao_enviar=_anexar_ao_cache,
+        preparar_lote=_atribuir_ids,
+        prazo_reserva=float(config.get("prazo_reserva", 300)),
+    ).iniciar()
+
+
+def enfileirar_ideia(nova_ideia):
+    """Registra uma nova ideia sem esperar pela planilha.
+
+    A ideia vai para a fila local e é enviada em lote pela thread de envio,
+    que também lhe dá o ID se ela veio sem um: assim nenhuma chamada à API
+    (nem um erro 429) acontece no envio do formulário. Sem fila configurada,
+    grava direto com salvar_ideia().
+    """
+    fila = obter_fila()
+    if fila is None:
+        if not nova_ideia.get("ID"):
+            nova_ideia["ID"] = int(proximo_id())
+        salvar_ideia(nova_ideia)
+        return None
+    return fila.enfileirar(serializar_linha(nova_ideia))
+
+
+def _gravar_importadas(linhas):
+    # Lotes grandes de importação não devem atrasar as leituras das outras sessões
+    with baixa_prioridade():
+        backend.anexar_linhas(linhas)
+    _anexar_ao_cache(linhas)
+
+
+def importar_ideias(arquivo, nome, mapeamento, padroes=None, recomecar=False, ao_progredir=None):
+    """Importa ideias de um .xlsx/.csv em lotes (append_rows), com IDs reservados em bloco.
+
+    Uma importação interrompida continua de onde parou ao enviar o mesmo
+    arquivo; `recomecar=True` descarta o progresso salvo.
+    """
+    if backend is None:
+        return None
+    from importacao import ProgressoImportacao, assinatura_arquivo, importar
+
+    progresso = ProgressoImportacao(config_armazenamento.get("caminho_importacoes", "importacoes.db"))
+    if recomecar:
+        progresso.reiniciar(assinatura_arquivo(arquivo))
+    return importar(arquivo, nome, mapeamento, _gravar_importadas, obter_alocador().reservar, progresso,
+                    padroes=padroes, tamanho_lote=int(config_armazenamento.get("tamanho_lote_importacao", 500)),
+                    ao_progredir=ao_progredir)
+
+
+def situacao_fila():
+    """Retorna pendentes/enviados da fila de envio (None se desativada)."""
+    fila = obter_fila()
+    return fila.situacao() if fila is not None else None
+
+
+def localizar_ideia(id_ideia):
+    """Retorna (índice real, linha) da ideia com esse ID, ou (None, None)."""
+    cache = obter_cache()
+    with cache.lock:
+        carregar_dados()
+        posicao = cache.posicoes.get(_chave_id(id_ideia))
+        if posicao is None:
+            return None, None
+        return posicao, cache.df.iloc[posicao]
+
+
+def _resolver_posicao(id_ideia, posicao):
+    """Confere (lendo uma única célula) se a linha ainda contém a ideia esperada.
+
+    Se outra sessão excluiu linhas antes dela, relê só a coluna ID para achar a
+    posição atual. Retorna (posição, se o cache estava desatualizado).
+    """
+    chave = _chave_id(id_ideia)
+    if posicao is not None and _chave_id(backend.ler_id_da_linha(posicao)) == chave:
+        return posicao, False
+    for nova_posicao, valor in enumerate(backend.ler_ids()):
+        if _chave_id(valor) == chave:
+            return nova_posicao, True
+    return None, True
+
+
+def _posicao_para_escrita(indice_real_df, id_ideia):
+    """Posição conferida da ideia no backend; avisa na tela se ela não existe mais."""
+    if id_ideia is None:
+        cache = obter_cache()
+        with cache.lock:
+            if cache.df is not None and int(indice_real_df) < len(cache.df):
+                id_ideia = cache.df['ID'].iat[int(indice_real_df)]
+    posicao, desatualizado = _resolver_posicao(id_ideia, indice_real_df)
+    if desatualizado:
+        # Linhas mudaram de lugar por fora deste processo: recarrega na próxima leitura
+        limpar_cache()
+    if posicao is None:
+        st.error(f"A ideia {id_ideia} não foi encontrada na planilha; ela pode ter sido excluída.")
+    return posicao
+
+
+def excluir_ideia(indice_real_df, id_ideia=None):
+    """Exclui uma ideia com base no índice REAL do DataFrame.
+
+    A exclusão é uma lápide: grava Status = "Excluída" numa única célula, sem
+    deslocar as linhas de baixo; compactar_excluidas() remove a linha depois.
+    Antes confere se a linha ainda é a da ideia `id_ideia` (por padrão, o ID
+    que o cache tem nesse índice). Retorna True se excluiu.
+    """
+    if backend:
+        posicao = _posicao_para_escrita(indice_real_df, id_ideia)
+        if posicao is None:
+            return False
+        backend.atualizar_celula(posicao, "Status", STATUS_EXCLUIDA)
+        _atualizar_cache(lambda cache: cache.marcar_excluida(posicao))
+        return True
+    return False
+
+
+# Trava (no processo) e reserva (entre réplicas) das tarefas que excluem linhas pela posição
+_lock_manutencao = threading.Lock()
+# Validade (s) da reserva: se a réplica cair no meio da tarefa, as outras voltam a poder rodá-la
+PRAZO_MANUTENCAO = 600
+
+
+@contextmanager
+def _manutencao_exclusiva():
+    """Garante uma única compactação ou arquivamento por vez; o bloco recebe False se outro está rodando.
+
+    Excluir linhas pela posição duas vezes ao mesmo tempo apagaria as linhas
+    que subiram para o lugar das primeiras.
+    """
+    if not _lock_manutencao.acquire(blocking=False):
+        yield False
+        return
+    compartilhado = None
+    try:
+        compartilhado = obter_cache_compartilhado()
+        if compartilhado is not None and not compartilhado.reivindicar("manutencao", PRAZO_MANUTENCAO):
+            compartilhado = None
+            yield False
+            return
+        yield True
+    finally:
+        if compartilhado is not None:
+            compartilhado.liberar("manutencao")
+        _lock_manutencao.release()
+
+
+def _avisar_manutencao_em_andamento():
+    _avisar_uma_vez("Outra compactação ou arquivamento está em andamento; tente de novo em instantes.")
+
+
+def _posicoes_conferidas(esperadas, status_aceitos, gravadas=None):
+    """Das posições {posição: chave do ID} esperadas, as que ainda têm esse ID e um Status aceito.
+
+    Relê as colunas ID e Status logo antes de uma exclusão pela posição, ou
+    usa as linhas `gravadas` ({posição: valores}) que acabaram de ser lidas.
+    """
+    if gravadas is None:
+        atuais = backend.ler_colunas(["ID", "Status"])
+        ids, status = dict(enumerate(atuais["ID"])), dict(enumerate(atuais["Status"]))
+    else:
+        coluna_id, coluna_status = get_column_order().index("ID"), get_column_order().index("Status")
+        ids = {posicao: valores[coluna_id] for posicao, valores in gravadas.items()}
+        status = {posicao: valores[coluna_status] for posicao, valores in gravadas.items()}
+    return [posicao for posicao, chave in esperadas.items()
+            if posicao in ids and _chave_id(ids[posicao]) == chave and status[posicao] in status_aceitos]
+
+
+def compactar_excluidas():
+    """Remove de vez as linhas marcadas como excluídas, numa única chamada.
+
+    Retorna quantas linhas foram removidas.
+    """
+    if not backend:
+        return 0
+    with _manutencao_exclusiva() as liberada:
+        if not liberada:
+            _avisar_manutencao_em_andamento()
+            return 0
+        return _compactar_excluidas()
+
+
+def _compactar_excluidas():
+    # Lápides tiradas de uma leitura feita logo antes da exclusão, e não do cache
+    colunas = backend.ler_colunas(["ID", "Status"])
+    posicoes = [posicao for posicao, valor in enumerate(colunas["Status"]) if valor == STATUS_EXCLUIDA]
+    if not posicoes:
+        return 0
+    backend.excluir_linhas(posicoes)
+    cache = obter_cache()
+    with cache.lock:
+        em_cache = cache.df.index[cache.df['Status'] == STATUS_EXCLUIDA].tolist() if cache.df is not None else None
+        if em_cache == posicoes:
+            cache.compactar(posicoes)
+            _dados_mudaram(cache)
+        else:
+            # O cache não enxergava as mesmas lápides: relê tudo (aqui e nas outras réplicas)
+            limpar_cache()
+    return len(posicoes)
+
+
+def _posicoes_para_arquivar(df, dias):
+    """Posições das ideias encerradas (STATUS_ARQUIVAVEIS) há mais de `dias` dias.
+
+    Vale a data de conclusão ou, sem ela, a data da ideia; sem nenhuma das
+    duas a ideia fica na partição ativa.
+    """
+    if df.empty or 'Status' not in df.columns:
+        return []
+    data = df['Data conclusão'].fillna(df['Data ideia'])
+    limite = pd.Timestamp.now() - pd.Timedelta(days=dias)
+    escolhidas = df['Status'].isin(STATUS_ARQUIVAVEIS) & (data < limite).fillna(False) & df['ID'].notna()
+    return [int(posicao) for posicao in df.index[escolhidas.to_numpy()]]
+
+
+def arquivar_ideias(dias=None, ao_progredir=None):
+    """Move para o arquivo, em lotes, as ideias encerradas há mais de `dias` (padrão ARQUIVAR_APOS_DIAS).
+
+    Cada lote é anexado ao arquivo antes de sair da partição ativa, de baixo
+    para cima (excluir um lote não muda a posição dos de cima). Uma falha no
+    meio deixa a ideia nos dois lugares, nunca em nenhum: a leitura do arquivo
+    a ignora e a próxima execução termina a mudança sem anexá-la de novo.
+    `ao_progredir(movidas, total)` é chamada a cada lote. Retorna quantas
+    ideias foram arquivadas.
+    """
+    arquivo = obter_backend_arquivo()
+    if backend is None or arquivo is None:
+        return 0
+    with _manutencao_exclusiva() as liberada:
+        if not liberada:
+            _avisar_manutencao_em_andamento()
+            return 0
+        return _arquivar_ideias(arquivo, dias, ao_progredir)
+
+
+def _arquivar_ideias(arquivo, dias, ao_progredir):
+    df = _ler_dataframe()
+    posicoes = _posicoes_para_arquivar(df, ARQUIVAR_APOS_DIAS if dias is None else dias)
+    if not posicoes:
+        return 0
+    ja_arquivadas = {_chave_id(valor) for valor in arquivo.ler_ids()}
+    movidas = 0
+    with baixa_prioridade():
+        for fim in range(len(posicoes), 0, -LOTE_ARQUIVAMENTO):
+            lote = posicoes[max(0, fim - LOTE_ARQUIVAMENTO):fim]
+            esperadas = {posicao: _chave_id(df['ID'].iat[posicao]) for posicao in lote}
+            # O arquivo recebe as linhas como estão gravadas, e não do DataFrame tipado, que
+            # perde textos que não são número nem data (ex.: "a definir" em Investimento)
+            gravadas = backend.ler_linhas_gravadas(lote)
+            # As linhas não podem ter mudado de lugar (nem deixado de estar encerradas) desde a leitura
+            if len(_posicoes_conferidas(esperadas, STATUS_ARQUIVAVEIS, gravadas)) != len(lote):
+                logger.warning("Arquivamento interrompido: a partição ativa mudou durante a operação.")
+                break
+            novas = [gravadas[posicao] for posicao, chave in esperadas.items() if chave not in ja_arquivadas]
+            if novas:
+                arquivo.anexar_linhas(novas)
+                ja_arquivadas.update(esperadas.values())
+            # Confere de novo logo antes de excluir: a escrita no arquivo leva tempo
+            conferidas = _posicoes_conferidas(esperadas, STATUS_ARQUIVAVEIS)
+            if conferidas:
+                backend.excluir_linhas(conferidas)
+                movidas += len(conferidas)
+            if len(conferidas) != len(lote):
+                logger.warning("Arquivamento interrompido: a partição ativa mudou durante a operação.")
+                break
+            if ao_progredir is not None:
+                ao_progredir(movidas, len(posicoes))
+    if movidas:
+        # A partição ativa encolheu por inteiro: relê (aqui e nas outras réplicas), assim como o arquivo
+        limpar_cache()
+    return movidas
+
+
+class ConflitoEdicao(Exception):
+    """A ideia foi salva por outra pessoa depois que o formulário foi aberto.
+
+    `atual` traz a linha como está no backend ({coluna: texto}) e `alteradas`
+    as colunas que a outra pessoa mudou.
+    """
+
+    def __init__(self, id_ideia, atual, alteradas):
+        super().__init__(f"A ideia {id_ideia} foi alterada por outra pessoa enquanto você editava.")
+        self.id_ideia = id_ideia
+        self.atual = atual
+        self.alteradas = alteradas
+
+
+def _linha_para_escrita(indice_real_df, id_ideia):
+    """(posição, {coluna: texto}) atuais da ideia, lendo a linha inteira numa única chamada.
+
+    Se a linha na posição do cache não é mais a da ideia, procura pela coluna
+    ID como _posicao_para_escrita(). Retorna (None, None) se ela não existe.
+    """
+    if indice_real_df is not None:
+        atual = backend.ler_linha(int(indice_real_df))
+        if atual is not None and _chave_id(atual.get("ID")) == _chave_id(id_ideia):
+            return int(indice_real_df), registro_como_texto(atual)
+    posicao = _posicao_para_escrita(None, id_ideia)
+    if posicao is None:
+        return None, None
+    return posicao, registro_como_texto(backend.ler_linha(posicao))
+
+
+def _corrigir_no_cache(posicao, atual):
+    """Põe no cache a linha como ela está no backend, para o formulário reabrir em dia."""
+    linha = _linha_como_lida(serializar_linha(atual))
+    cache = obter_cache()
+    with cache.lock:
+        if cache.df is not None and posicao < len(cache.df):
+            cache.substituir_linha(posicao, linha)
+            _dados_mudaram(cache)
+
+
+def editar_ideia(indice_real_df, dados_editados, originais=None, forcar=False):
+    """Grava só as células alteradas de uma ideia, numa única chamada.
+
+    `originais` são os valores que o formulário mostrou (registro_como_texto);
+    sem eles, as alterações são calculadas contra a linha atual. Se a versão
+    em dados_editados["Versão"] não é mais a da planilha, outra pessoa salvou
+    a ideia no meio tempo: levanta ConflitoEdicao em vez de sobrescrever,
+    a não ser com `forcar=True`. Retorna True se atualizou.
+    """
+    if not backend:
+        return False
+    id_ideia = dados_editados.get("ID")
+    posicao, atual = _linha_para_escrita(indice_real_df, id_ideia)
+    if posicao is None:
+        return False
+    colunas = get_column_order()
+    # Datas e valores em R$ voltam ao formato de texto da planilha
+    novos = dict(zip(colunas, serializar_linha(dados_editados)))
+    base = dict(zip(colunas, serializar_linha(originais))) if originais is not None else atual
+    versao = numero_versao(atual.get(COLUNA_VERSAO))
+    esperada = dados_editados.get(COLUNA_VERSAO)
+    if not forcar and esperada is not None and numero_versao(esperada) != versao:
+        _corrigir_no_cache(posicao, atual)
+        alteradas = [c for c in colunas if c not in COLUNAS_CONTROLE and atual.get(c) != base.get(c)]
+        raise ConflitoEdicao(id_ideia, atual, alteradas)
+    alteracoes = {c: valor for c, valor in novos.items() if c not in COLUNAS_CONTROLE and valor != base.get(c)}
+    if not alteracoes:
+        return True
+    if not backend.atualizar_celulas(posicao, alteracoes, versao):
+        raise ConflitoEdicao(id_ideia, atual, [])
+    depois = {**atual, **alteracoes}
+    depois[COLUNA_VERSAO] = str(versao + 1)
+    linha = _linha_como_lida(serializar_linha(depois))
+    _atualizar_cache(lambda cache: cache.substituir_linha(posicao, linha))
+    return True
+
+
+def _celulas_alteradas(originais, editados):
+    """{ID: {coluna: texto}} das células que mudaram entre os dois DataFrames (mesmo índice)."""
+    alteracoes = {}
+    for coluna in editados.columns:
+        # Só colunas da planilha (a grade pode ter colunas calculadas, como a relevância da busca)
+        if coluna in COLUNAS_CONTROLE or coluna not in get_column_order() or coluna not in originais.columns:
+            continue
+        antes = originais[coluna].astype(object).map(lambda v, c=coluna: serializar_valor(c, v))
+        depois = editados[coluna].astype(object).map(lambda v, c=coluna: serializar_valor(c, v))
+        for indice in antes.index[antes.to_numpy() != depois.reindex(antes.index).to_numpy()]:
+            alteracoes.setdefault(_chave_id(originais.at[indice, 'ID']), {})[coluna] = depois.at[indice]
+    alteracoes.pop(None, None)
+    return alteracoes
+
+
+def salvar_edicoes_em_lote(originais, editados):
+    """Grava as células mudadas numa grade de edição com uma única chamada batch_update.
+
+    `originais` é o DataFrame mostrado na grade (com ID e Versão) e `editados`
+    o devolvido por ela. As diferenças são calculadas por ID e conferidas com
+    uma única leitura das colunas ID e Versão: ideias que outra pessoa salvou
+    depois de carregadas ficam de fora (conflitos). O cache é atualizado sem
+    recarga. Retorna {"linhas", "celulas", "conflitos", "nao_encontradas"}.
+    """
+    if backend is None:
+        return None
+    resumo = {"linhas": 0, "celulas": 0, "conflitos": [], "nao_encontradas": []}
+    alteracoes = _celulas_alteradas(originais, editados)
+    if not alteracoes:
+        return resumo
+    esperadas = {_chave_id(i): numero_versao(v) for i, v in zip(originais['ID'], originais[COLUNA_VERSAO])}
+    atuais = backend.ler_colunas(["ID", COLUNA_VERSAO])
+    posicoes = {}
+    for posicao, valor in enumerate(atuais["ID"]):
+        chave = _chave_id(valor)
+        if chave in alteracoes and chave not in posicoes:
+            posicoes[chave] = posicao
+    versoes = atuais[COLUNA_VERSAO]
+    edicoes, ids_por_posicao = [], {}
+    for chave, colunas in alteracoes.items():
+        posicao = posicoes.get(chave)
+        if posicao is None:
+            resumo["nao_encontradas"].append(chave)
+            continue
+        versao = numero_versao(versoes[posicao] if posicao < len(versoes) else "")
+        if versao != esperadas.get(chave):
+            resumo["conflitos"].append(chave)
+            continue
+        edicoes.append((posicao, colunas, versao))
+        ids_por_posicao[posicao] = chave
+    recusadas = set(backend.atualizar_celulas_em_lote(edicoes))
+    resumo["conflitos"] += [ids_por_posicao[posicao] for posicao in recusadas]
+    gravadas = [edicao for edicao in edicoes if edicao[0] not in recusadas]
+    resumo["linhas"] = len(gravadas)
+    resumo["celulas"] = sum(len(colunas) for _, colunas, _ in gravadas)
+    if gravadas:
+        _atualizar_linhas_no_cache(gravadas, ids_por_posicao)
+    return resumo
+
+
+def _atualizar_linhas_no_cache(gravadas, ids_por_posicao):
+    """Aplica ao cache as células gravadas em lote; se as posições não batem, descarta o cache."""
+    cache = obter_cache()
+    with cache.lock:
+        if cache.df is None or not all(
+                posicao < len(cache.df) and _chave_id(cache.df['ID'].iat[posicao]) == ids_por_posicao[posicao]
+                for posicao, _, _ in gravadas):
+            # Linhas mudaram de lugar por fora deste processo: recarrega (aqui e nas outras réplicas)
+            limpar_cache()
+            return
+        registros = []
+        for posicao, colunas, versao in gravadas:
+            depois = {**registro_como_texto(cache.df.iloc[posicao]), **colunas, COLUNA_VERSAO: str(versao + 1)}
+            registros.append(backend.tipar_valores(serializar_linha(depois)))
+        linhas = aplicar_tipos(pd.DataFrame(registros, columns=get_column_order()))
+        posicoes = [posicao for posicao, _, _ in gravadas]
+        _atualizar_cache(lambda cache: cache.substituir_linhas(posicoes, linhas))